@@ -0,0 +1,39 @@
+# app_gui.py
+import argparse
+import logging
+import sys
+
+from PyQt6.QtWidgets import QApplication
+
+from services.runt_logging import configurar_logging
+from views.gui_qt import crear_ventana
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Consulta RUNT con interfaz gráfica (captcha manual).")
+    parser.add_argument("--workers", type=int, default=2, help="Consultas simultáneas (navegadores).")
+    parser.add_argument("--ver-navegador", dest="headless", action="store_false", help="Mostrar los navegadores.")
+    parser.add_argument(
+        "--preparadas", type=int, default=1, help="Páginas del portal listas de antemano por worker (0 = ninguna)."
+    )
+    parser.add_argument("--blobs", default="blobs.sqlite3", help="Archivo donde se guarda el HTML de los resultados.")
+    parser.add_argument("--debug", action="store_true", help="Mensajes de depuración en consola.")
+    args = parser.parse_args()
+
+    configurar_logging(logging.DEBUG if args.debug else logging.INFO)
+
+    app = QApplication(sys.argv)
+    ventana = crear_ventana(
+        workers=args.workers,
+        headless=args.headless,
+        debug=args.debug,
+        preparadas=args.preparadas,
+        ruta_blobs=args.blobs,
+    )
+    ventana.resize(1100, 650)
+    ventana.show()
+    sys.exit(app.exec())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# benchmarks/bench_resultados.py
+# ------------------------------------------------------------
+# Compara memoria y disco por resultado:
+#   ANTES: dataclass normal con raw_html completo en cada instancia
+#          (y el HTML guardado tal cual en la BD).
+#   DESPUÉS: ResultadoRunt con __slots__ + raw_ref al AlmacenBlobs
+#          (comprimido con diccionario compartido y deduplicado).
+#
+# Uso:
+#   python -m benchmarks.bench_resultados --n 100000
+# Las cifras se extrapolan a 1 millón de resultados.
+# ------------------------------------------------------------
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import tracemalloc
+from dataclasses import dataclass
+from typing import Optional
+
+from models.runt_models import ResultadoRunt
+from services.blob_store import AlmacenBlobs
+
+
+@dataclass
+class ResultadoRuntAntes:
+    # Copia del modelo anterior, sólo para comparar
+    nombre: Optional[str] = None
+    estado_licencia: Optional[str] = None
+    tiene_multas: Optional[bool] = None
+    raw_html: Optional[str] = None
+    sin_registro: bool = False
+
+
+BOILERPLATE = "".join(
+    f'<div class="mat-row fila-{i}"><span class="etiqueta">Campo {i}</span>'
+    f'<span class="valor" _ngcontent-c{i % 7}="">{{valor}}</span></div>\n'
+    for i in range(120)
+)
+
+
+def pagina_sintetica(rng: random.Random, i: int) -> str:
+    """Página casi idéntica entre consultas: sólo cambian unos pocos datos."""
+    nombre = f"CIUDADANO {rng.randint(1, 10**6)}"
+    estado = rng.choice(["ACTIVA", "SUSPENDIDA", "CANCELADA"])
+    # ~5% de las páginas se repiten exactas (p. ej. "sin registro")
+    if rng.random() < 0.05:
+        return "<html><body>" + BOILERPLATE.replace("{valor}", "SIN REGISTRO") + "</body></html>"
+    cuerpo = BOILERPLATE.replace("{valor}", estado, 3).replace("{valor}", "-")
+    return f"<html><head><title>RUNT</title></head><body><h1>{nombre}</h1><p>Doc {i}</p>{cuerpo}</body></html>"
+
+
+def medir_memoria(construir, n: int) -> int:
+    tracemalloc.start()
+    objetos = [construir(i) for i in range(n)]
+    actual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objetos
+    return actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de memoria/disco por resultado.")
+    parser.add_argument("--n", type=int, default=100_000, help="Resultados a generar.")
+    args = parser.parse_args()
+    n = args.n
+    factor = 1_000_000 / n
+
+    rng = random.Random(1234)
+    paginas = [pagina_sintetica(rng, i) for i in range(n)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # --- Disco ANTES: HTML crudo en una tabla SQLite ---
+        ruta_antes = os.path.join(tmp, "antes.sqlite3")
+        db = sqlite3.connect(ruta_antes)
+        db.execute("CREATE TABLE resultados (id INTEGER PRIMARY KEY, raw_html TEXT)")
+        db.executemany("INSERT INTO resultados (raw_html) VALUES (?)", ((p,) for p in paginas))
+        db.commit()
+        db.close()
+        disco_antes = os.path.getsize(ruta_antes)
+
+        # --- Disco DESPUÉS: almacén de blobs ---
+        ruta_despues = os.path.join(tmp, "blobs.sqlite3")
+        almacen = AlmacenBlobs(ruta_despues)
+        refs = [almacen.guardar(p) for p in paginas]
+        stats = almacen.estadisticas()
+        almacen.close()
+        disco_despues = os.path.getsize(ruta_despues)
+
+        # --- Memoria ---
+        # ANTES: cada resultado mantiene su propia copia del HTML (como llega de Playwright)
+        mem_antes = medir_memoria(
+            lambda i: ResultadoRuntAntes(nombre="X", estado_licencia="ACTIVA", tiene_multas=False,
+                                         raw_html=paginas[i].encode("utf-8").decode("utf-8")),
+            n,
+        )
+        mem_despues = medir_memoria(
+            lambda i: ResultadoRunt(nombre="X", estado_licencia="ACTIVA", tiene_multas=False,
+                                    raw_ref=refs[i].encode("ascii").decode("ascii")),
+            n,
+        )
+
+    mb = 1024 * 1024
+    print(f"Resultados: {n:,} (blobs únicos: {stats['blobs']:,})")
+    print(f"{'':24}{'antes':>14}{'después':>14}   (por millón)")
+    print(f"{'Memoria en proceso':24}{mem_antes * factor / mb:>11.0f} MB{mem_despues * factor / mb:>11.0f} MB")
+    print(f"{'Disco':24}{disco_antes * factor / mb:>11.0f} MB{disco_despues * factor / mb:>11.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+# benchmarks/portal_local.py
+# ------------------------------------------------------------
+# Portal RUNT "de mentira" para benchmarks locales: una sola página con los
+# mismos selectores que usa services/runt_playwright.py (mat-select con
+# overlay, input de documento, captcha en div.divCaptcha, popups SweetAlert2
+# y el popup de "Hemos mejorado Autocompletar").
+#
+# Reglas (las decide el servidor, como en el portal real: el envío es un
+# POST JSON a /consulta, así queda en los HAR grabados):
+#   - El captcha correcto es CAPTCHA_CORRECTO (el resolver del benchmark lo sabe).
+#   - Documentos que empiezan por "0" responden "sin registro".
+#
+# Uso suelto:  python -m benchmarks.portal_local --puerto 8765
+# ------------------------------------------------------------
+import argparse
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+CAPTCHA_CORRECTO = "12345"
+
+PAGINA = """<!doctype html>
+<html><head><meta charset="utf-8"><title>RUNT local</title>
+<style>
+  .cdk-overlay-container { position: absolute; top: 40px; left: 10px; }
+  .mat-option-text { display: block; padding: 4px; cursor: pointer; }
+  .swal2-popup, #autocompletar { border: 1px solid #888; padding: 8px; margin: 8px; }
+  .oculto { display: none; }
+</style></head>
+<body>
+<form id="form" onsubmit="return enviar(event)">
+  <mat-select formcontrolname="tipoDocumento" tabindex="0" onclick="abrirCombo()"
+              style="display:inline-block;border:1px solid #000;padding:4px">
+    <span id="tipoSel">Tipo de Documento</span>
+  </mat-select>
+  <input formcontrolname="documento" placeholder="Nro. documento">
+  <div class="divCaptcha"><img id="captcha" alt="captcha" width="120" height="40"></div>
+  <input formcontrolname="captcha" placeholder="Digite los caracteres">
+  <button type="submit">Consultar</button>
+</form>
+<div class="cdk-overlay-container"></div>
+<div id="autocompletar">Hemos mejorado Autocompletar
+  <button type="button" onclick="this.parentNode.remove()">Cerrar</button></div>
+<div id="alerta"></div>
+<div id="resultados" class="oculto">Resultados de la consulta</div>
+<script>
+  const TIPOS = ["Cédula Ciudadanía", "Cédula de Extranjería", "Tarjeta de Identidad",
+                 "Pasaporte", "Registro Civil", "Carnet Diplomático", "Permiso por Protección Temporal"];
+  let version = 0;
+  function nuevoCaptcha() {
+    version += 1;
+    const svg = `<svg xmlns='http://www.w3.org/2000/svg' width='120' height='40'>` +
+      `<rect width='120' height='40' fill='#eee'/><text x='10' y='28' font-size='22'>__CAPTCHA__</text>` +
+      `<text x='100' y='12' font-size='8'>${version}</text></svg>`;
+    document.getElementById("captcha").src = "data:image/svg+xml;base64," + btoa(svg);
+  }
+  function abrirCombo() {
+    const overlay = document.querySelector(".cdk-overlay-container");
+    overlay.innerHTML = "<div class='mat-select-panel'>" +
+      TIPOS.map(t => `<span class='mat-option-text' role='option'>${t}</span>`).join("") + "</div>";
+    overlay.querySelectorAll(".mat-option-text").forEach(op => op.onclick = () => {
+      document.getElementById("tipoSel").textContent = op.textContent;
+      overlay.innerHTML = "";
+    });
+  }
+  function alerta(texto) {
+    const cont = document.getElementById("alerta");
+    cont.innerHTML = `<div class='swal2-popup'><div>${texto}</div>` +
+      `<button class='swal2-confirm swal2-styled' type='button'>Aceptar</button></div>`;
+    cont.querySelector(".swal2-confirm").onclick = () => { cont.innerHTML = ""; nuevoCaptcha(); };
+  }
+  function enviar(ev) {
+    ev.preventDefault();
+    const cuerpo = JSON.stringify({
+      tipo: document.getElementById("tipoSel").textContent,
+      documento: document.querySelector("input[formcontrolname='documento']").value,
+      captcha: document.querySelector("input[formcontrolname='captcha']").value,
+    });
+    fetch("consulta", {method: "POST", headers: {"Content-Type": "application/json"}, body: cuerpo})
+      .then(r => r.json())
+      .then(r => {
+        if (r.estado === "captcha_invalido") { alerta("El captcha no es valido."); return; }
+        if (r.estado === "sin_registro") {
+          alerta("No se ha encontrado la persona en estado ACTIVA o SIN REGISTRO"); return;
+        }
+        const res = document.getElementById("resultados");
+        res.textContent = `Resultados de la consulta: ${r.nombre}`;
+        res.classList.remove("oculto");
+      });
+    return false;
+  }
+  nuevoCaptcha();
+</script>
+</body></html>
+""".replace("__CAPTCHA__", CAPTCHA_CORRECTO)
+
+
+def responder_consulta(datos: dict) -> dict:
+    """Lo que contesta POST /consulta para el formulario enviado."""
+    if datos.get("captcha") != CAPTCHA_CORRECTO:
+        return {"estado": "captcha_invalido"}
+    if str(datos.get("documento", "")).startswith("0"):
+        return {"estado": "sin_registro"}
+    return {"estado": "ok", "nombre": f"PERSONA {datos['documento']}", "licencias": []}
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    def _enviar(self, cuerpo: bytes, tipo: str, estado: int = 200):
+        self.send_response(estado)
+        self.send_header("Content-Type", tipo)
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def do_GET(self):
+        self._enviar(PAGINA.encode("utf-8"), "text/html; charset=utf-8")
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length") or 0)
+        try:
+            datos = json.loads(self.rfile.read(largo) or b"{}")
+        except ValueError:
+            self._enviar(b'{"estado": "error"}', "application/json", 400)
+            return
+        self._enviar(json.dumps(responder_consulta(datos)).encode("utf-8"), "application/json")
+
+    def log_message(self, *args):
+        pass  # silencioso: el benchmark hace miles de peticiones
+
+
+def iniciar_portal_local(puerto: int = 0):
+    """Levanta el portal en un hilo. Devuelve (url, servidor); servidor.shutdown() lo detiene."""
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _Manejador)
+    threading.Thread(target=servidor.serve_forever, name="portal-local", daemon=True).start()
+    return f"http://127.0.0.1:{servidor.server_address[1]}/", servidor
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Portal RUNT local para pruebas.")
+    parser.add_argument("--puerto", type=int, default=8765)
+    args = parser.parse_args()
+    servidor = ThreadingHTTPServer(("127.0.0.1", args.puerto), _Manejador)
+    print(f"Portal local en http://127.0.0.1:{args.puerto}/ (captcha: {CAPTCHA_CORRECTO})")
+    servidor.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# benchmarks/replay_har.py
+# ------------------------------------------------------------
+# Regresión de rendimiento offline: reproduce las sesiones grabadas en
+# benchmarks/har/ y verifica que cada fase del flujo quede dentro de su
+# presupuesto de tiempo (benchmarks/har/sesiones.json).
+#
+# Reproducir todas (sale con código 1 si alguna se pasa, falla o le falta
+# su HAR):
+#   python -m benchmarks.replay_har
+# Las mismas verificaciones corren en pytest: tests/test_replay_har.py
+#
+# Grabar una sesión contra el portal local determinista (benchmarks/portal_local.py):
+#   python -m benchmarks.replay_har --grabar encontrado --local --numero 1017259440 --captchas 12345
+#
+# Grabar una sesión nueva contra el portal real (captcha manual):
+#   python -m benchmarks.replay_har --grabar sin_registro --tipo CC --numero 123
+# Las respuestas del captcha quedan en el manifiesto para poder reproducirla.
+# ------------------------------------------------------------
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.portal_local import iniciar_portal_local
+from services.gobernador_tasa import GobernadorTasa
+from services.runt_logging import configurar_logging
+from services.runt_playwright import RUNT_URL, run_runt_flow
+
+CARPETA_HAR = Path(__file__).parent / "har"
+MANIFIESTO = CARPETA_HAR / "sesiones.json"
+
+# El portal local se graba siempre en este puerto, para que la URL del HAR
+# (y la del manifiesto) sea estable. Al reproducir no se abre ningún puerto.
+PUERTO_GRABACION_LOCAL = 8765
+# Fases del flujo con presupuesto (ver _CronometroFases en runt_playwright)
+FASES = ("navegacion", "formulario", "captcha", "resultado")
+# Presupuesto de una sesión local = lo medido al grabar * margen + holgura.
+# Ajustado: una fase que se demora ~0.5 s más ya hace fallar la regresión.
+MARGEN_PRESUPUESTO = 1.25
+HOLGURA_PRESUPUESTO_S = 0.3
+
+
+def _cargar_manifiesto() -> dict:
+    return json.loads(MANIFIESTO.read_text(encoding="utf-8"))
+
+
+def _guardar_manifiesto(datos: dict):
+    MANIFIESTO.write_text(json.dumps(datos, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+
+
+def _registrar_sesion(sesion: dict):
+    datos = _cargar_manifiesto()
+    datos["sesiones"] = [s for s in datos["sesiones"] if s["nombre"] != sesion["nombre"]]
+    datos["sesiones"].append(sesion)
+    _guardar_manifiesto(datos)
+
+
+def sesiones() -> list:
+    return _cargar_manifiesto()["sesiones"]
+
+
+def grabar(nombre: str, tipo: str, numero: str):
+    respuestas = []
+
+    def resolver(image_bytes: bytes) -> str:
+        tmp = Path("captcha.png").absolute()
+        tmp.write_bytes(image_bytes)
+        print(f"🖼 CAPTCHA guardado en: {tmp}")
+        texto = input("👉 Texto del CAPTCHA: ").strip()
+        respuestas.append(texto)
+        return texto
+
+    har = f"{nombre}.har"
+    tiempos = {}
+    ok = run_runt_flow(
+        tipo=tipo,
+        numero=numero,
+        headless=False,
+        slow_mo=0,
+        resolver_captcha=resolver,
+        debug=True,
+        har_grabar=str(CARPETA_HAR / har),
+        tiempos=tiempos,
+    )
+
+    _registrar_sesion({
+        "nombre": nombre,
+        "har": har,
+        "url": RUNT_URL,
+        "tipo": tipo,
+        "numero": numero,
+        "captchas": respuestas,
+        "esperado": ok,
+        # Presupuesto inicial: el doble de lo medido en vivo (ajustar a mano)
+        "presupuesto_s": {fase: round(max(1.0, 2 * s), 1) for fase, s in tiempos.items() if fase != "captcha"},
+    })
+    print(f"✅ Sesión '{nombre}' grabada en {CARPETA_HAR / har}")
+
+
+def grabar_local(
+    nombre: str,
+    tipo: str,
+    numero: str,
+    captchas: list,
+    carpeta: Path = CARPETA_HAR,
+    puerto: int = PUERTO_GRABACION_LOCAL,
+) -> dict:
+    """
+    Graba una sesión contra benchmarks/portal_local.py con la misma ruta que
+    el portal real (run_runt_flow con har_grabar): queda la página, cada POST
+    de consulta y su respuesta. Devuelve la entrada para el manifiesto.
+    """
+    url, servidor = iniciar_portal_local(puerto)
+    # Portal local: el gobernador del equipo no aplica, usamos uno privado sin límite
+    gobernador = GobernadorTasa(
+        ruta=os.path.join(tempfile.mkdtemp(), "tasa.sqlite3"), tasa_por_min=10**6, rafaga=10**4
+    )
+    respuestas = iter(captchas)
+    archivo = f"{nombre}.har"
+    tiempos = {}
+    try:
+        ok = run_runt_flow(
+            tipo=tipo,
+            numero=numero,
+            headless=True,
+            slow_mo=0,
+            resolver_captcha=lambda _img: next(respuestas),
+            debug=True,
+            url=url,
+            har_grabar=str(Path(carpeta) / archivo),
+            gobernador=gobernador,
+            tiempos=tiempos,
+        )
+    finally:
+        servidor.shutdown()
+        servidor.server_close()
+
+    return {
+        "nombre": nombre,
+        "har": archivo,
+        "url": url,
+        "tipo": tipo,
+        "numero": numero,
+        "captchas": list(captchas),
+        "esperado": ok,
+        "presupuesto_s": {
+            fase: round(tiempos.get(fase, 0.0) * MARGEN_PRESUPUESTO + HOLGURA_PRESUPUESTO_S, 1)
+            for fase in FASES
+        },
+    }
+
+
+def verificar_sesion(sesion: dict, latencia_ms: int = 0, carpeta: Path = CARPETA_HAR):
+    """
+    Reproduce una sesión y devuelve (problemas, tiempos). Una sesión sin su
+    HAR es un problema, no se omite.
+    """
+    ruta = Path(carpeta) / sesion["har"]
+    if not ruta.exists():
+        return [f"falta el HAR {ruta.name}"], {}
+
+    respuestas = iter(sesion["captchas"])
+    tiempos = {}
+    ok = run_runt_flow(
+        tipo=sesion["tipo"],
+        numero=sesion["numero"],
+        headless=True,
+        slow_mo=0,
+        resolver_captcha=lambda _img: next(respuestas, ""),
+        debug=False,
+        url=sesion.get("url", RUNT_URL),
+        har_reproducir=str(ruta),
+        latencia_ms=latencia_ms,
+        tiempos=tiempos,
+    )
+
+    problemas = []
+    if ok != sesion["esperado"]:
+        problemas.append(f"resultado {ok} (esperado {sesion['esperado']})")
+    for fase, limite in sesion["presupuesto_s"].items():
+        medido = tiempos.get(fase, 0.0)
+        if medido > limite:
+            problemas.append(f"{fase} {medido:.2f}s > {limite:.2f}s")
+    return problemas, tiempos
+
+
+def reproducir(solo=None, latencia_ms=None) -> int:
+    datos = _cargar_manifiesto()
+    latencia = datos.get("latencia_ms", 0) if latencia_ms is None else latencia_ms
+    fallos = 0
+
+    for sesion in datos["sesiones"]:
+        if solo and sesion["nombre"] not in solo:
+            continue
+        try:
+            problemas, tiempos = verificar_sesion(sesion, latencia)
+        except Exception as e:
+            print(f"❌ {sesion['nombre']}: error en la reproducción: {e}")
+            fallos += 1
+            continue
+
+        detalle = ", ".join(f"{f}={s:.2f}s" for f, s in tiempos.items())
+        if problemas:
+            fallos += 1
+            print(f"❌ {sesion['nombre']}: {'; '.join(problemas)}  [{detalle}]")
+        else:
+            print(f"✅ {sesion['nombre']}: [{detalle}]")
+
+    return 1 if fallos else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Grabar/reproducir sesiones HAR del flujo RUNT.")
+    parser.add_argument("--grabar", metavar="NOMBRE", help="Grabar una sesión con este nombre.")
+    parser.add_argument("--local", action="store_true", help="Grabar contra el portal local determinista.")
+    parser.add_argument("--captchas", nargs="*", default=[], help="Respuestas del captcha (sólo con --local).")
+    parser.add_argument("--tipo", default="CC")
+    parser.add_argument("--numero")
+    parser.add_argument("--solo", nargs="*", help="Reproducir sólo estas sesiones.")
+    parser.add_argument("--latencia-ms", type=int, default=None, help="Latencia simulada por respuesta.")
+    args = parser.parse_args()
+
+    if args.grabar:
+        if not args.numero:
+            parser.error("--grabar requiere --numero")
+        # La grabación corre con debug=True: que se vean los mensajes del flujo
+        configurar_logging(logging.DEBUG)
+        if args.local:
+            _registrar_sesion(grabar_local(args.grabar, args.tipo, args.numero, args.captchas))
+            print(f"✅ Sesión local '{args.grabar}' grabada en {CARPETA_HAR / (args.grabar + '.har')}")
+        else:
+            grabar(args.grabar, args.tipo, args.numero)
+        return
+    configurar_logging(logging.WARNING)
+    sys.exit(reproducir(args.solo, args.latencia_ms))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/soak_navegador.py
+# ------------------------------------------------------------
+# Prueba de resistencia (soak): miles de consultas seguidas con un navegador
+# reutilizado contra el portal local, midiendo la memoria del árbol de
+# procesos del navegador (PSS). Con la política de reciclaje la memoria debe
+# quedar plana; sin ella (--sin-reciclaje) se ve cómo crece.
+#
+# Uso:
+#   python -m benchmarks.soak_navegador --consultas 2000
+#   python -m benchmarks.soak_navegador --consultas 2000 --sin-reciclaje
+# ------------------------------------------------------------
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+from benchmarks.portal_local import CAPTCHA_CORRECTO, iniciar_portal_local
+from services.gestor_navegador import GestorNavegador, PoliticaReciclaje
+from services.gobernador_tasa import GobernadorTasa
+from services.runt_metrics import METRICAS
+from services.runt_playwright import run_runt_flow
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak de memoria del navegador reutilizado.")
+    parser.add_argument("--consultas", type=int, default=2000)
+    parser.add_argument("--muestra-cada", type=int, default=50, help="Consultas entre mediciones de memoria.")
+    parser.add_argument("--max-rss-mb", type=float, default=600)
+    parser.add_argument("--sin-reciclaje", action="store_true", help="Desactivar la política (línea base).")
+    args = parser.parse_args()
+
+    if args.sin_reciclaje:
+        politica = PoliticaReciclaje(
+            max_consultas_contexto=10**9,
+            max_edad_contexto_s=float("inf"),
+            max_consultas_navegador=10**9,
+            max_edad_navegador_s=float("inf"),
+            max_rss_mb=None,
+        )
+    else:
+        politica = PoliticaReciclaje(max_rss_mb=args.max_rss_mb)
+
+    url, servidor = iniciar_portal_local()
+    gestor = GestorNavegador(headless=True, politica=politica)
+    # Portal local: el gobernador del equipo no aplica, usamos uno privado sin límite
+    gobernador = GobernadorTasa(
+        ruta=os.path.join(tempfile.mkdtemp(), "tasa.sqlite3"), tasa_por_min=10**6, rafaga=10**4
+    )
+
+    muestras = []
+    inicio = time.monotonic()
+    try:
+        for i in range(1, args.consultas + 1):
+            numero = f"{i:010d}" if i % 5 else f"0{i:09d}"  # 1 de cada 5 "sin registro"
+            run_runt_flow(
+                tipo="CC",
+                numero=numero,
+                headless=True,
+                slow_mo=0,
+                resolver_captcha=lambda _img: CAPTCHA_CORRECTO,
+                debug=False,
+                url=url,
+                gobernador=gobernador,
+                gestor=gestor,
+            )
+            if i % args.muestra_cada == 0:
+                memoria = gestor.memoria_mb()
+                muestras.append(memoria or 0.0)
+                print(f"{i:6d} consultas | Memoria navegador (PSS) {memoria or 0:7.1f} MB | "
+                      f"{(time.monotonic() - inicio) / i:5.2f} s/consulta", flush=True)
+    finally:
+        gestor.cerrar()
+        servidor.shutdown()
+
+    if len(muestras) >= 4:
+        cuarto = len(muestras) // 4
+        primero = statistics.mean(muestras[:cuarto])
+        ultimo = statistics.mean(muestras[-cuarto:])
+        print(f"\nPSS primer cuarto: {primero:.1f} MB | último cuarto: {ultimo:.1f} MB | "
+              f"máx: {max(muestras):.1f} MB")
+    resumen = METRICAS.resumen()["contadores"]
+    print(f"Reciclajes: navegador={resumen.get('navegador.reciclajes', 0):.0f} "
+          f"contexto={resumen.get('navegador.contexto.reciclajes', 0):.0f} "
+          f"lanzamientos={resumen.get('navegador.lanzamientos', 0):.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+# controllers/bandeja_captcha.py
+
+import itertools
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional
+
+from services.runt_metrics import METRICAS
+
+# Tipo para la función que resuelve el captcha
+ResolverCaptcha = Callable[[bytes], str]
+
+
+class CaptchaCancelado(RuntimeError):
+    """El operador descartó el captcha o se cerró la bandeja."""
+
+
+@dataclass
+class CaptchaPendiente:
+    id: int
+    query_id: str
+    etiqueta: str
+    imagen: bytes
+    # 0 = más urgente (carril interactivo); la bandeja ordena por (prioridad, orden)
+    prioridad: int = 1
+    orden: int = 0
+    creado: float = field(default_factory=time.monotonic)
+    respuesta: Optional[str] = None
+    cancelado: bool = False
+    _evento: threading.Event = field(default_factory=threading.Event, repr=False)
+
+
+class BandejaCaptcha:
+    """
+    Bandeja de captchas pendientes compartida por todos los workers.
+
+    Cada worker llama al resolver (bloqueante) que le da resolver_para();
+    el captcha queda en la bandeja hasta que el operador lo responde desde
+    la vista. al_cambiar se invoca (desde el hilo del worker) cada vez que
+    la bandeja cambia: la GUI lo usa para emitir una señal Qt.
+    """
+
+    def __init__(self, timeout_s: float = 300, al_cambiar: Optional[Callable[[], None]] = None):
+        self.timeout_s = timeout_s
+        self.al_cambiar = al_cambiar
+        self._lock = threading.Lock()
+        self._pendientes: List[CaptchaPendiente] = []
+        self._ids = itertools.count(1)
+        self._cerrada = False
+
+    def _notificar(self):
+        if self.al_cambiar is not None:
+            self.al_cambiar()
+
+    def resolver_para(self, query_id: str, etiqueta: str = "", prioridad: int = 1) -> "ResolverBandeja":
+        """Devuelve un resolver_captcha compatible con RuntController para esa consulta."""
+        return ResolverBandeja(self, query_id, etiqueta, prioridad)
+
+    def solicitar(
+        self,
+        query_id: str,
+        etiqueta: str,
+        imagen: bytes,
+        prioridad: int = 1,
+        cancelada: Optional[Callable[[], bool]] = None,
+    ) -> str:
+        """
+        Deja el captcha en la bandeja y bloquea hasta que el operador lo
+        responda. 'cancelada' se consulta con el lock tomado: si ya devuelve
+        True, el captcha no llega a entrar a la bandeja.
+        """
+        item = CaptchaPendiente(
+            id=next(self._ids), query_id=query_id, etiqueta=etiqueta, imagen=imagen, prioridad=prioridad
+        )
+        item.orden = item.id
+        with self._lock:
+            if self._cerrada:
+                raise CaptchaCancelado("La bandeja de captchas está cerrada.")
+            if cancelada is not None and cancelada():
+                raise CaptchaCancelado(f"La consulta {query_id} se canceló antes de pedir el captcha.")
+            self._pendientes.append(item)
+            self._ordenar()
+        self._notificar()
+
+        respondido = item._evento.wait(self.timeout_s)
+        with self._lock:
+            if item in self._pendientes:
+                self._pendientes.remove(item)
+        self._notificar()
+        METRICAS.observar("captcha.espera_operador", time.monotonic() - item.creado)
+        METRICAS.observar(f"captcha.espera_operador.p{item.prioridad}", time.monotonic() - item.creado)
+
+        if not respondido:
+            raise CaptchaCancelado(f"Nadie resolvió el captcha de {query_id} en {self.timeout_s:.0f}s.")
+        if item.cancelado or item.respuesta is None:
+            raise CaptchaCancelado(f"Captcha de {query_id} descartado por el operador.")
+        return item.respuesta
+
+    # ------------------------------------------------------------
+    # Lado del operador (vista)
+    # ------------------------------------------------------------
+    def _ordenar(self):
+        # Llamar con self._lock tomado
+        self._pendientes.sort(key=lambda i: (i.prioridad, i.orden))
+
+    def pendientes(self) -> List[CaptchaPendiente]:
+        with self._lock:
+            return list(self._pendientes)
+
+    def siguiente(self) -> Optional[CaptchaPendiente]:
+        with self._lock:
+            return self._pendientes[0] if self._pendientes else None
+
+    def responder(self, captcha_id: int, texto: str):
+        self._cerrar_item(captcha_id, respuesta=texto)
+
+    def descartar(self, captcha_id: int):
+        self._cerrar_item(captcha_id, cancelado=True)
+
+    def descartar_consulta(self, query_id: str):
+        """Descarta lo pendiente de una consulta (p. ej. porque su flujo ya falló)."""
+        with self._lock:
+            ids = [i.id for i in self._pendientes if i.query_id == query_id]
+        for captcha_id in ids:
+            self._cerrar_item(captcha_id, cancelado=True)
+
+    def posponer(self, captcha_id: int):
+        """Manda el captcha al final de su prioridad (el operador no lo lee bien)."""
+        with self._lock:
+            for item in self._pendientes:
+                if item.id == captcha_id:
+                    item.orden = next(self._ids)
+                    break
+            self._ordenar()
+        self._notificar()
+
+    def cerrar(self):
+        """Cancela todo lo pendiente y rechaza captchas nuevos."""
+        with self._lock:
+            self._cerrada = True
+            pendientes = list(self._pendientes)
+        for item in pendientes:
+            item.cancelado = True
+            item._evento.set()
+
+    def _cerrar_item(self, captcha_id: int, respuesta: Optional[str] = None, cancelado: bool = False):
+        with self._lock:
+            item = next((i for i in self._pendientes if i.id == captcha_id), None)
+            if item is None:
+                return
+            self._pendientes.remove(item)
+        item.respuesta = respuesta
+        item.cancelado = cancelado
+        item._evento.set()
+        self._notificar()
+
+
+class ResolverBandeja:
+    """
+    resolver_captcha de una consulta que pasa por la bandeja. cancelar()
+    retira su captcha pendiente (o evita que entre, si aún no llegó) y
+    desbloquea al hilo que lo espera con CaptchaCancelado.
+    """
+
+    def __init__(self, bandeja: BandejaCaptcha, query_id: str, etiqueta: str = "", prioridad: int = 1):
+        self.bandeja = bandeja
+        self.query_id = query_id
+        self.etiqueta = etiqueta
+        self.prioridad = prioridad
+        self.cancelado = False
+
+    def __call__(self, image_bytes: bytes) -> str:
+        return self.bandeja.solicitar(
+            self.query_id, self.etiqueta, image_bytes, self.prioridad, cancelada=lambda: self.cancelado
+        )
+
+    def cancelar(self):
+        self.cancelado = True
+        self.bandeja.descartar_consulta(self.query_id)
@@ -0,0 +1,308 @@
+# controllers/cola_consultas.py
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, List, Optional
+
+from controllers.bandeja_captcha import BandejaCaptcha
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+from services.runt_logging import logger_consulta
+from services.runt_metrics import METRICAS
+
+# Ventana (segundos) para calcular el throughput reciente
+VENTANA_THROUGHPUT_S = 60.0
+# Sin trabajo por este tiempo, el worker hace mantenimiento (reponer páginas preparadas)
+INTERVALO_MANTENIMIENTO_S = 0.5
+
+# Carriles de prioridad, de mayor a menor. El índice es la prioridad numérica
+# que también usan la bandeja de captchas y el gobernador de tasa (0 = primero).
+CARRILES = ("interactiva", "normal", "masiva")
+PRIORIDAD = {carril: i for i, carril in enumerate(CARRILES)}
+
+# Objetivo (SLO) de latencia p95 por carril, en segundos (None = sin objetivo)
+SLO_P95_S = {"interactiva": 90.0, "normal": 600.0, "masiva": None}
+
+# Anti-inanición: si lo más viejo de un carril lleva esperando más que esto,
+# se atiende antes que los carriles superiores, salvo el interactivo (que
+# nunca cede su turno). Por eso no hay límite para "normal".
+MAX_ESPERA_S = {"masiva": 1800.0}
+# Tras una promoción, al menos estas tomas van por orden normal antes de la
+# siguiente: un atraso grande no se apodera de todos los workers.
+TOMAS_ENTRE_PROMOCIONES = 3
+
+
+@dataclass
+class TrabajoConsulta:
+    id: int
+    params: ConsultaRuntParams
+    carril: str = "normal"
+    estado: str = "pendiente"  # pendiente | en_curso | ok | sin_registro | error
+    resultado: Optional[ResultadoRunt] = None
+    error: Optional[str] = None
+    encolado: float = field(default_factory=time.monotonic)
+    inicio: Optional[float] = None
+    fin: Optional[float] = None
+
+    @property
+    def query_id(self) -> str:
+        return f"q{self.id}"
+
+    @property
+    def etiqueta(self) -> str:
+        return f"{self.params.tipo_documento} {self.params.numero_documento}"
+
+    def duracion(self) -> Optional[float]:
+        if self.inicio is None:
+            return None
+        return (self.fin or time.monotonic()) - self.encolado
+
+
+class ColaCarriles:
+    """
+    Cola bloqueante con un deque por carril. tomar() entrega lo del carril
+    más prioritario. Si un carril inferior tiene trabajo esperando más de
+    MAX_ESPERA_S, ese trabajo se adelanta, pero nunca a una consulta
+    interactiva y como mucho una vez cada TOMAS_ENTRE_PROMOCIONES + 1 tomas.
+    """
+
+    def __init__(
+        self,
+        max_espera_s: Optional[Dict[str, float]] = None,
+        tomas_entre_promociones: int = TOMAS_ENTRE_PROMOCIONES,
+    ):
+        self.max_espera_s = dict(MAX_ESPERA_S if max_espera_s is None else max_espera_s)
+        self.tomas_entre_promociones = tomas_entre_promociones
+        self._carriles: Dict[str, Deque[TrabajoConsulta]] = {c: deque() for c in CARRILES}
+        # Tomas normales desde la última promoción (arranca habilitada)
+        self._desde_promocion = tomas_entre_promociones
+        self._fines = 0
+        self._cond = threading.Condition()
+
+    def poner(self, trabajo: TrabajoConsulta):
+        with self._cond:
+            self._carriles[trabajo.carril].append(trabajo)
+            self._cond.notify()
+
+    def poner_fin(self):
+        """Pide a un worker que termine (equivale al None de queue.Queue)."""
+        with self._cond:
+            self._fines += 1
+            self._cond.notify()
+
+    def tomar(self, timeout: Optional[float] = None) -> Optional[TrabajoConsulta]:
+        """Como queue.Queue.get(): con timeout lanza queue.Empty si no llegó nada."""
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while True:
+                if self._fines:
+                    self._fines -= 1
+                    return None
+                carril = self._elegir_carril(time.monotonic())
+                if carril is not None:
+                    return self._carriles[carril].popleft()
+                if limite is None:
+                    self._cond.wait()
+                else:
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise queue.Empty
+                    self._cond.wait(restante)
+
+    def _elegir_carril(self, ahora: float) -> Optional[str]:
+        # Llamar con self._cond tomado
+        superior = next((c for c in CARRILES if self._carriles[c]), None)
+        if superior is None:
+            return None
+
+        if superior != CARRILES[0] and self._desde_promocion >= self.tomas_entre_promociones:
+            for carril in CARRILES[PRIORIDAD[superior] + 1:]:
+                cola = self._carriles[carril]
+                limite = self.max_espera_s.get(carril)
+                if cola and limite is not None and ahora - cola[0].encolado > limite:
+                    METRICAS.incrementar(f"cola.promociones.{carril}")
+                    self._desde_promocion = 0
+                    return carril
+
+        self._desde_promocion += 1
+        return superior
+
+    def hay_trabajo(self) -> bool:
+        """True si hay algo que tomar (una consulta o un pedido de fin)."""
+        with self._cond:
+            return bool(self._fines) or any(self._carriles.values())
+
+    def tamanos(self) -> Dict[str, int]:
+        with self._cond:
+            return {c: len(q) for c, q in self._carriles.items()}
+
+    def qsize(self) -> int:
+        return sum(self.tamanos().values())
+
+
+class ColaConsultas:
+    """
+    Cola de consultas con un pool acotado de workers (hilos).
+
+    Cada worker toma un trabajo, llama al RuntController (que abre su propio
+    Playwright en ese hilo) y los captchas se resuelven vía la BandejaCaptcha.
+    Nada de esto corre en el hilo de la interfaz.
+
+    Los trabajos van por carriles (interactiva / normal / masiva): una consulta
+    interactiva toma el siguiente worker libre, su captcha va primero en la
+    bandeja y su turno en el gobernador de tasa también tiene prioridad.
+    """
+
+    def __init__(
+        self,
+        controller,
+        bandeja: BandejaCaptcha,
+        workers: int = 2,
+        al_cambiar: Optional[Callable[[TrabajoConsulta], None]] = None,
+        debug: bool = False,
+    ):
+        self.controller = controller
+        self.bandeja = bandeja
+        self.num_workers = workers
+        self.al_cambiar = al_cambiar
+        self.debug = debug
+
+        self._cola = ColaCarriles()
+        self._lock = threading.Lock()
+        self._trabajos: List[TrabajoConsulta] = []
+        self._ids = itertools.count(1)
+        self._hilos: List[threading.Thread] = []
+        self._en_curso = 0
+        self._terminados: Deque[float] = deque()
+        self._log = logger_consulta("cola", debug=debug)
+
+    # ------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------
+    def iniciar(self):
+        for i in range(self.num_workers):
+            hilo = threading.Thread(target=self._worker, name=f"runt-worker-{i + 1}", daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def detener(self, esperar: bool = True):
+        """Cancela captchas pendientes y pide a los workers que terminen."""
+        self.bandeja.cerrar()
+        for _ in self._hilos:
+            self._cola.poner_fin()
+        if esperar:
+            for hilo in self._hilos:
+                hilo.join(timeout=30)
+        self._hilos = []
+
+    # ------------------------------------------------------------
+    # Encolar y consultar
+    # ------------------------------------------------------------
+    def encolar(self, params: ConsultaRuntParams, carril: str = "normal") -> TrabajoConsulta:
+        if carril not in PRIORIDAD:
+            raise ValueError(f"Carril desconocido: {carril!r}. Usa uno de {CARRILES}.")
+        trabajo = TrabajoConsulta(id=next(self._ids), params=params, carril=carril)
+        with self._lock:
+            self._trabajos.append(trabajo)
+        self._cola.poner(trabajo)
+        self._notificar(trabajo)
+        return trabajo
+
+    def trabajos(self) -> List[TrabajoConsulta]:
+        with self._lock:
+            return list(self._trabajos)
+
+    def profundidad(self) -> int:
+        return self._cola.qsize()
+
+    def estadisticas(self) -> Dict[str, Optional[float]]:
+        ahora = time.monotonic()
+        with self._lock:
+            while self._terminados and ahora - self._terminados[0] > VENTANA_THROUGHPUT_S:
+                self._terminados.popleft()
+            recientes = len(self._terminados)
+            en_curso = self._en_curso
+        return {
+            "profundidad": self.profundidad(),
+            "en_curso": en_curso,
+            "captchas_pendientes": len(self.bandeja.pendientes()),
+            "por_minuto": recientes * 60.0 / VENTANA_THROUGHPUT_S,
+            "latencia_p50": METRICAS.percentil("cola.latencia", 50),
+            "latencia_p95": METRICAS.percentil("cola.latencia", 95),
+        }
+
+    def estadisticas_carriles(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """Profundidad, latencias y cumplimiento del SLO por carril."""
+        tamanos = self._cola.tamanos()
+        salida = {}
+        for carril in CARRILES:
+            p95 = METRICAS.percentil(f"cola.latencia.{carril}", 95)
+            slo = SLO_P95_S.get(carril)
+            salida[carril] = {
+                "profundidad": tamanos[carril],
+                "latencia_p50": METRICAS.percentil(f"cola.latencia.{carril}", 50),
+                "latencia_p95": p95,
+                "slo_p95": slo,
+                "cumple_slo": None if slo is None or p95 is None else p95 <= slo,
+            }
+        return salida
+
+    # ------------------------------------------------------------
+    # Worker
+    # ------------------------------------------------------------
+    def _notificar(self, trabajo: TrabajoConsulta):
+        if self.al_cambiar is not None:
+            self.al_cambiar(trabajo)
+
+    def _worker(self):
+        try:
+            while True:
+                try:
+                    trabajo = self._cola.tomar(timeout=INTERVALO_MANTENIMIENTO_S)
+                except queue.Empty:
+                    # Ocioso: el controller prepara páginas en el navegador de este hilo,
+                    # y la suelta a medias si entra una consulta mientras tanto
+                    self.controller.mantener_hilo(hay_trabajo=self._cola.hay_trabajo)
+                    continue
+                if trabajo is None:
+                    return
+                self._ejecutar(trabajo)
+        finally:
+            # El navegador reutilizado de este hilo sólo se puede cerrar desde aquí
+            self.controller.liberar_hilo()
+
+    def _ejecutar(self, trabajo: TrabajoConsulta):
+        with self._lock:
+            self._en_curso += 1
+        trabajo.estado = "en_curso"
+        trabajo.inicio = time.monotonic()
+        self._notificar(trabajo)
+
+        try:
+            resultado = self.controller.consultar_ciudadano(
+                params=trabajo.params,
+                resolver_captcha=self.bandeja.resolver_para(
+                    trabajo.query_id, trabajo.etiqueta, prioridad=PRIORIDAD[trabajo.carril]
+                ),
+                debug=self.debug,
+                query_id=trabajo.query_id,
+                prioridad=PRIORIDAD[trabajo.carril],
+            )
+            trabajo.resultado = resultado
+            trabajo.estado = "sin_registro" if resultado.sin_registro else "ok"
+        except Exception as e:
+            trabajo.error = str(e)
+            trabajo.estado = "error"
+            self._log.warning("⚠ Consulta %s (%s) falló: %s", trabajo.query_id, trabajo.etiqueta, e)
+            METRICAS.incrementar("cola.errores")
+        finally:
+            trabajo.fin = time.monotonic()
+            METRICAS.observar("cola.latencia", trabajo.fin - trabajo.encolado)
+            METRICAS.observar(f"cola.latencia.{trabajo.carril}", trabajo.fin - trabajo.encolado)
+            with self._lock:
+                self._en_curso -= 1
+                self._terminados.append(trabajo.fin)
+            self._notificar(trabajo)
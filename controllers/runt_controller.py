@@ -1,44 +1,133 @@
 # controllers/runt_controller.py
 
+import threading
 from typing import Callable, Optional
 from models.runt_models import ConsultaRuntParams, ResultadoRunt
-from services.runt_playwright import run_runt_flow
+from services.runt_playwright import RUNT_URL, run_runt_flow
+from services.runt_logging import logger_consulta
+from services.gestor_navegador import GestorNavegador, PoliticaReciclaje
+from services.reserva_paginas import ReservaPaginas
+from services.blob_store import AlmacenBlobs
 
 # Tipo para la función que resuelve el captcha
 ResolverCaptcha = Callable[[bytes], str]
 
 class RuntController:
-    def __init__(self):
+    def __init__(
+        self,
+        headless: bool = False,
+        slow_mo: int = 300,
+        hold_after: bool = True,
+        reutilizar_navegador: bool = False,
+        politica: Optional[PoliticaReciclaje] = None,
+        paginas_preparadas: int = 0,
+        almacen: Optional[AlmacenBlobs] = None,
+        url: str = RUNT_URL,
+        gobernador=None,
+    ):
         # Aquí luego podremos inyectar repositorios de BD, etc.
-        pass
+        # hold_after=True mantiene el navegador abierto hasta que demos ENTER (modo consola);
+        # la GUI y los barridos lo desactivan porque corren sin terminal.
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.hold_after = hold_after
+        # Con reutilizar_navegador cada hilo mantiene su propio navegador vivo
+        # entre consultas (Playwright síncrono no se comparte entre hilos).
+        self.reutilizar_navegador = reutilizar_navegador
+        self.politica = politica
+        # Páginas ya navegadas que cada hilo mantiene listas (requiere reutilizar_navegador)
+        self.paginas_preparadas = paginas_preparadas if reutilizar_navegador else 0
+        # Con almacén, el HTML de cada resultado se guarda allí (deduplicado y
+        # comprimido) y ResultadoRunt sólo lleva raw_ref; raw_html lo carga a demanda
+        self.almacen = almacen
+        if almacen is not None:
+            ResultadoRunt.almacen = almacen
+        # url/gobernador: para apuntar a un portal de pruebas (benchmarks/portal_local.py)
+        self.url = url
+        self.gobernador = gobernador
+        self._local = threading.local()
+
+    def _gestor_del_hilo(self) -> Optional[GestorNavegador]:
+        if not self.reutilizar_navegador:
+            return None
+        gestor = getattr(self._local, "gestor", None)
+        if gestor is None:
+            gestor = GestorNavegador(headless=self.headless, slow_mo=self.slow_mo, politica=self.politica)
+            self._local.gestor = gestor
+        return gestor
+
+    def _reserva_del_hilo(self) -> Optional[ReservaPaginas]:
+        if self.paginas_preparadas <= 0:
+            return None
+        reserva = getattr(self._local, "reserva", None)
+        if reserva is None:
+            reserva = ReservaPaginas(
+                self._gestor_del_hilo(), cantidad=self.paginas_preparadas, url=self.url, gobernador=self.gobernador
+            )
+            self._local.reserva = reserva
+        return reserva
+
+    def mantener_hilo(self, hay_trabajo: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Trabajo de fondo del hilo actual mientras no hay consultas: prepara
+        o refresca una página de la reserva. Devuelve True si hizo algo.
+        hay_trabajo: la cola avisa por aquí si llegó una consulta (la
+        preparación se interrumpe entre etapas).
+        """
+        reserva = self._reserva_del_hilo()
+        return reserva.reponer(hay_trabajo) if reserva is not None else False
+
+    def liberar_hilo(self):
+        """Cierra el navegador del hilo actual (llamar desde ese mismo hilo al terminar)."""
+        reserva = getattr(self._local, "reserva", None)
+        if reserva is not None:
+            reserva.vaciar()
+            self._local.reserva = None
+        gestor = getattr(self._local, "gestor", None)
+        if gestor is not None:
+            gestor.cerrar()
+            self._local.gestor = None
 
     def consultar_ciudadano(
         self,
         params: ConsultaRuntParams,
         resolver_captcha: Optional[ResolverCaptcha] = None,
-        debug: bool = True,
+        debug: bool = False,
+        query_id: Optional[str] = None,
+        prioridad: int = 1,
     ) -> ResultadoRunt:
         """
         Orquesta la consulta: recibe params de la vista, llama al servicio,
         y devuelve un modelo ResultadoRunt.
+        prioridad: 0 = interactiva (pasa primero en el gobernador de tasa),
+        1 = normal, 2 = masiva.
         """
+        log = logger_consulta(query_id, debug=debug)
+
         # Ejecutamos el flujo Playwright
+        html = {}
         ok = run_runt_flow(
             tipo=params.tipo_documento,
             numero=params.numero_documento,
-            headless=False,
-            slow_mo=300,
+            headless=self.headless,
+            slow_mo=self.slow_mo,
             resolver_captcha=resolver_captcha,
             debug=debug,
-            hold_after=True,  #  mantenemos el navegador abierto hasta que demos ENTER
+            hold_after=self.hold_after,
+            query_id=log.extra["query_id"],
+            gestor=self._gestor_del_hilo(),
+            prioridad=prioridad,
+            reserva=self._reserva_del_hilo(),
+            url=self.url,
+            gobernador=self.gobernador,
+            html_resultado=html if self.almacen is not None else None,
         )
+        raw_ref = self.almacen.guardar(html["html"]) if html.get("html") else None
 
         if not ok:
-            if debug:
-                print("⚠ Resultado: documento sin registro o persona no activa en RUNT.")
-            # Luego puedes reflejar esto en el modelo; por ahora devolvemos vacío.
-            return ResultadoRunt(raw_html=None)
+            log.info("⚠ Resultado: documento sin registro o persona no activa en RUNT.")
+            return ResultadoRunt(sin_registro=True, raw_ref=raw_ref)
 
-        # Por ahora devolvemos un resultado "vacío".
+        # Por ahora devolvemos un resultado sin parsear (el HTML queda en el almacén).
         # Luego aquí metemos los datos scrapeados.
-        return ResultadoRunt()
+        return ResultadoRunt(raw_ref=raw_ref)
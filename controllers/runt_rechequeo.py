@@ -0,0 +1,253 @@
+# controllers/runt_rechequeo.py
+
+import heapq
+import time
+from dataclasses import dataclass, field
+from datetime import date
+from typing import Callable, Dict, List, Optional, Tuple
+
+from controllers.bandeja_captcha import ResolverCaptcha
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+
+DIA_S = 24 * 3600
+
+# Tiempo de vida (en segundos) de un resultado según lo que respondió el RUNT.
+# Un "sin registro" casi nunca cambia; un ciudadano con multas cambia seguido.
+TTL_POR_RESULTADO = {
+    "sin_registro": 90 * DIA_S,
+    "activo": 30 * DIA_S,
+    "con_multas": 7 * DIA_S,
+}
+TTL_MINIMO_S = DIA_S
+# Si una consulta falla, la reintentamos pronto pero no de inmediato.
+# También es el "préstamo" de un documento entregado por siguientes(): si
+# nadie reporta su resultado en ese plazo, vuelve a vencer solo.
+REINTENTO_FALLO_S = 6 * 3600
+
+
+def clasificar_resultado(resultado: ResultadoRunt) -> str:
+    """
+    Reduce un ResultadoRunt a la categoría que usamos para decidir
+    cada cuánto hay que volver a consultarlo.
+    """
+    if resultado.sin_registro:
+        return "sin_registro"
+    if resultado.tiene_multas:
+        return "con_multas"
+    return "activo"
+
+
+def _firma_resultado(resultado: ResultadoRunt) -> Tuple:
+    # Lo que consideramos "cambio" entre dos consultas del mismo documento
+    return (
+        resultado.sin_registro,
+        resultado.estado_licencia,
+        resultado.tiene_multas,
+    )
+
+
+@dataclass
+class EstadoDocumento:
+    tipo_documento: str
+    numero_documento: str
+    ultimo_chequeo: Optional[float] = None
+    categoria: Optional[str] = None
+    firma: Optional[Tuple] = None
+    chequeos: int = 0
+    cambios: int = 0
+    # Cuándo vuelve a salir en siguientes(): el vencimiento del resultado,
+    # el reintento tras un fallo o el fin del préstamo. No dice si está fresco.
+    vence_en: float = 0.0
+    version: int = 0
+
+    def ttl(self) -> float:
+        """
+        TTL efectivo: el base de la categoría, acortado según la frecuencia
+        de cambio observada (estimador de Laplace para no castigar con 1 dato).
+        Sin cambios observados se acerca al base, nunca lo supera.
+        """
+        base = TTL_POR_RESULTADO.get(self.categoria or "", 0.0)
+        tasa_cambio = self.cambios / (self.chequeos + 1)
+        return max(TTL_MINIMO_S, base * (1.0 - tasa_cambio))
+
+    def fresco(self, ahora: float) -> bool:
+        """El último resultado sigue siendo confiable (sólo depende del chequeo, no del préstamo)."""
+        return self.ultimo_chequeo is not None and self.ultimo_chequeo + self.ttl() > ahora
+
+
+@dataclass
+class ReporteFrescura:
+    total: int
+    frescos: int
+    vencidos: int
+    nunca_consultados: int
+    presupuesto_restante: int
+    fraccion_fresca: float = field(init=False)
+
+    def __post_init__(self):
+        self.fraccion_fresca = (self.frescos / self.total) if self.total else 1.0
+
+
+class ProgramadorRechequeo:
+    """
+    Mantiene una cola de prioridad de documentos ordenada por la fecha en que
+    su último resultado deja de ser confiable, y entrega al RuntController
+    sólo los más vencidos, respetando un presupuesto diario de consultas
+    (cada consulta cuesta un captcha resuelto por un operador).
+    """
+
+    def __init__(self, presupuesto_diario: int = 500, reloj: Callable[[], float] = time.time):
+        self.presupuesto_diario = presupuesto_diario
+        self._reloj = reloj
+        self._docs: Dict[Tuple[str, str], EstadoDocumento] = {}
+        # heap de (vence_en, version, clave); las entradas viejas se descartan al sacarlas
+        self._heap: List[Tuple[float, int, Tuple[str, str]]] = []
+        self._dia_presupuesto: Optional[date] = None
+        self._consumido_hoy = 0
+
+    # ------------------------------------------------------------
+    # Alta de documentos y registro de resultados
+    # ------------------------------------------------------------
+    def agregar(
+        self,
+        tipo: str,
+        numero: str,
+        ultimo_chequeo: Optional[float] = None,
+        ultimo_resultado: Optional[ResultadoRunt] = None,
+    ):
+        """
+        Registra un documento en la población. Si ya tenemos un resultado
+        guardado (por ejemplo de la BD), se pasa aquí para no reconsultarlo.
+        """
+        clave = (tipo.upper().strip(), numero.strip())
+        if clave in self._docs:
+            return
+        estado = EstadoDocumento(tipo_documento=clave[0], numero_documento=clave[1])
+        self._docs[clave] = estado
+        if ultimo_resultado is not None and ultimo_chequeo is not None:
+            self._aplicar_resultado(estado, ultimo_resultado, ultimo_chequeo)
+        else:
+            # Nunca consultado: vence "ya" y va primero
+            estado.vence_en = 0.0
+        self._encolar(estado)
+
+    def registrar_resultado(self, tipo: str, numero: str, resultado: ResultadoRunt):
+        clave = (tipo.upper().strip(), numero.strip())
+        estado = self._docs.get(clave)
+        if estado is None:
+            self.agregar(tipo, numero, self._reloj(), resultado)
+            return
+        self._aplicar_resultado(estado, resultado, self._reloj())
+        self._encolar(estado)
+
+    def registrar_fallo(self, tipo: str, numero: str):
+        clave = (tipo.upper().strip(), numero.strip())
+        estado = self._docs.get(clave)
+        if estado is None:
+            return
+        estado.vence_en = self._reloj() + REINTENTO_FALLO_S
+        self._encolar(estado)
+
+    def _aplicar_resultado(self, estado: EstadoDocumento, resultado: ResultadoRunt, cuando: float):
+        firma = _firma_resultado(resultado)
+        if estado.firma is not None and firma != estado.firma:
+            estado.cambios += 1
+        estado.firma = firma
+        estado.categoria = clasificar_resultado(resultado)
+        estado.chequeos += 1
+        estado.ultimo_chequeo = cuando
+        estado.vence_en = cuando + estado.ttl()
+
+    def _encolar(self, estado: EstadoDocumento):
+        estado.version += 1
+        clave = (estado.tipo_documento, estado.numero_documento)
+        heapq.heappush(self._heap, (estado.vence_en, estado.version, clave))
+
+    # ------------------------------------------------------------
+    # Presupuesto y selección
+    # ------------------------------------------------------------
+    def presupuesto_restante(self) -> int:
+        hoy = date.fromtimestamp(self._reloj())
+        if self._dia_presupuesto != hoy:
+            self._dia_presupuesto = hoy
+            self._consumido_hoy = 0
+        return max(0, self.presupuesto_diario - self._consumido_hoy)
+
+    def siguientes(self, n: int) -> List[ConsultaRuntParams]:
+        """
+        Saca hasta n documentos vencidos (los más vencidos primero),
+        sin pasarse del presupuesto del día. Cada documento entregado
+        cuenta contra el presupuesto aunque la consulta luego falle.
+
+        Los entregados quedan "prestados": se reprograman a
+        ahora + REINTENTO_FALLO_S, así un trabajo que nunca reporta (caída,
+        trabajo perdido en la cola) vuelve a salir solo más tarde.
+        """
+        ahora = self._reloj()
+        cupo = min(n, self.presupuesto_restante())
+        lote: List[ConsultaRuntParams] = []
+
+        while self._heap and len(lote) < cupo:
+            vence_en, version, clave = self._heap[0]
+            estado = self._docs[clave]
+            if version != estado.version:
+                heapq.heappop(self._heap)  # entrada obsoleta
+                continue
+            if vence_en > ahora:
+                break  # lo que queda está fresco
+            heapq.heappop(self._heap)
+            lote.append(ConsultaRuntParams(tipo_documento=clave[0], numero_documento=clave[1]))
+
+        for params in lote:
+            estado = self._docs[(params.tipo_documento, params.numero_documento)]
+            estado.vence_en = ahora + REINTENTO_FALLO_S
+            self._encolar(estado)
+
+        self._consumido_hoy += len(lote)
+        return lote
+
+    def ejecutar(
+        self,
+        controller,
+        resolver_captcha: Optional[ResolverCaptcha] = None,
+        n: Optional[int] = None,
+        debug: bool = False,
+    ) -> ReporteFrescura:
+        """
+        Reconsulta con el controller los documentos más valiosos hasta agotar
+        el presupuesto (o n). Devuelve el reporte de frescura al terminar.
+        """
+        lote = self.siguientes(n if n is not None else self.presupuesto_restante())
+        for params in lote:
+            try:
+                resultado = controller.consultar_ciudadano(
+                    params=params,
+                    resolver_captcha=resolver_captcha,
+                    debug=debug,
+                    prioridad=2,  # barrido de fondo: carril masivo
+                )
+            except Exception:
+                self.registrar_fallo(params.tipo_documento, params.numero_documento)
+                continue
+            self.registrar_resultado(params.tipo_documento, params.numero_documento, resultado)
+        return self.reporte_frescura()
+
+    # ------------------------------------------------------------
+    # Reporte
+    # ------------------------------------------------------------
+    def reporte_frescura(self) -> ReporteFrescura:
+        ahora = self._reloj()
+        frescos = nunca = 0
+        for estado in self._docs.values():
+            if estado.ultimo_chequeo is None:
+                nunca += 1
+            elif estado.fresco(ahora):
+                frescos += 1
+        total = len(self._docs)
+        return ReporteFrescura(
+            total=total,
+            frescos=frescos,
+            vencidos=total - frescos,
+            nunca_consultados=nunca,
+            presupuesto_restante=self.presupuesto_restante(),
+        )
@@ -1,16 +1,63 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import ClassVar, Optional
 
 @dataclass
 class ConsultaRuntParams:
     tipo_documento: str
     numero_documento: str
 
-@dataclass
+@dataclass(slots=True, init=False)
 class ResultadoRunt:
     # Luego llenaremos esto con el scrapeo
     nombre: Optional[str] = None
     estado_licencia: Optional[str] = None
     tiene_multas: Optional[bool] = None
-    raw_html: Optional[str] = None
-    sin_registro: bool = False
\ No newline at end of file
+    # Referencia (hash) al HTML crudo en el almacén de blobs; el HTML no vive aquí
+    raw_ref: Optional[str] = None
+    sin_registro: bool = False
+    # Sólo si se pasó raw_html y no hay almacén configurado
+    _raw_html: Optional[str] = field(default=None, repr=False, compare=False)
+
+    # Almacén compartido (services.blob_store.AlmacenBlobs) para cargar raw_html a demanda.
+    # Lo configura RuntController al recibir un almacén.
+    almacen: ClassVar[Optional[object]] = None
+
+    def __init__(
+        self,
+        nombre: Optional[str] = None,
+        estado_licencia: Optional[str] = None,
+        tiene_multas: Optional[bool] = None,
+        raw_html: Optional[str] = None,
+        sin_registro: bool = False,
+        raw_ref: Optional[str] = None,
+    ):
+        # Mismo orden de argumentos que antes del almacén: ResultadoRunt(raw_html=...) sigue sirviendo
+        self.nombre = nombre
+        self.estado_licencia = estado_licencia
+        self.tiene_multas = tiene_multas
+        self.sin_registro = sin_registro
+        self.raw_ref = raw_ref
+        self._raw_html = None
+        if raw_html is not None:
+            self.raw_html = raw_html
+
+    @property
+    def raw_html(self) -> Optional[str]:
+        """Carga el HTML crudo desde el almacén sólo cuando alguien lo pide."""
+        if self._raw_html is not None:
+            return self._raw_html
+        if self.raw_ref is None or ResultadoRunt.almacen is None:
+            return None
+        return ResultadoRunt.almacen.leer(self.raw_ref)
+
+    @raw_html.setter
+    def raw_html(self, html: Optional[str]):
+        """Con almacén el HTML se guarda allí y sólo queda la referencia."""
+        if html is None:
+            self.raw_ref = None
+            self._raw_html = None
+        elif ResultadoRunt.almacen is not None:
+            self.raw_ref = ResultadoRunt.almacen.guardar(html)
+            self._raw_html = None
+        else:
+            self._raw_html = html
@@ -0,0 +1,193 @@
+# services/blob_store.py
+# ------------------------------------------------------------
+# Almacén de HTML crudo direccionado por contenido.
+#
+# - Clave = sha256 del contenido: dos páginas idénticas se guardan una vez.
+# - Compresión zlib con diccionario compartido (zdict): las páginas del RUNT
+#   son casi todas el mismo boilerplate, así que un diccionario entrenado con
+#   unas cuantas muestras reduce muchísimo cada blob.
+# - Todo vive en un solo archivo SQLite (biblioteca estándar, sin servidores).
+# ------------------------------------------------------------
+import hashlib
+import sqlite3
+import threading
+import zlib
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+# zlib sólo aprovecha los últimos 32 KB del diccionario
+TAM_MAX_DICCIONARIO = 32 * 1024
+
+
+def entrenar_diccionario(muestras: Iterable[str], tam_max: int = TAM_MAX_DICCIONARIO) -> bytes:
+    """
+    Construye un diccionario zlib con las líneas que más se repiten entre las
+    muestras. Las más frecuentes van al final, que es donde zlib las encuentra
+    con distancias más cortas.
+    """
+    frecuencia: Counter = Counter()
+    for texto in muestras:
+        # Contamos cada línea una vez por muestra: nos interesa lo común a todas
+        frecuencia.update(set(texto.encode("utf-8").splitlines(keepends=True)))
+
+    comunes = [linea for linea, n in frecuencia.most_common() if n > 1]
+    partes: List[bytes] = []
+    total = 0
+    for linea in comunes:
+        if total + len(linea) > tam_max:
+            break
+        partes.append(linea)
+        total += len(linea)
+    partes.reverse()
+    return b"".join(partes)
+
+
+class AlmacenBlobs:
+    """
+    Guarda textos comprimidos y deduplicados. Es seguro usarlo desde varios hilos.
+
+    Uso:
+        almacen = AlmacenBlobs("blobs.sqlite3")
+        ref = almacen.guardar(html)
+        html = almacen.leer(ref)
+    """
+
+    def __init__(self, ruta: str = "blobs.sqlite3", auto_diccionario: int = 32, cache: int = 64):
+        self._db = sqlite3.connect(ruta, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS diccionarios (
+                id    TEXT PRIMARY KEY,
+                datos BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS blobs (
+                hash     TEXT PRIMARY KEY,
+                dict_id  TEXT,
+                tam      INTEGER NOT NULL,
+                datos    BLOB NOT NULL
+            );
+            """
+        )
+        self._diccionarios: Dict[str, bytes] = dict(
+            self._db.execute("SELECT id, datos FROM diccionarios")
+        )
+        # Usamos el diccionario más reciente (el último insertado)
+        fila = self._db.execute("SELECT id FROM diccionarios ORDER BY rowid DESC LIMIT 1").fetchone()
+        self._dict_actual: Optional[str] = fila[0] if fila else None
+
+        # Con auto_diccionario > 0 entrenamos solos tras juntar esas muestras
+        self._auto_diccionario = auto_diccionario
+        self._muestras: List[str] = []
+
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        self._tam_cache = cache
+
+    # ------------------------------------------------------------
+    # Diccionario compartido
+    # ------------------------------------------------------------
+    def usar_diccionario(self, datos: bytes) -> str:
+        """Registra un diccionario y lo usa para los blobs nuevos. Devuelve su id."""
+        with self._lock:
+            return self._registrar_diccionario(datos)
+
+    def _registrar_diccionario(self, datos: bytes) -> str:
+        # Llamar con self._lock tomado
+        dict_id = hashlib.sha256(datos).hexdigest()[:16]
+        self._db.execute(
+            "INSERT OR IGNORE INTO diccionarios (id, datos) VALUES (?, ?)",
+            (dict_id, datos),
+        )
+        self._db.commit()
+        self._diccionarios[dict_id] = datos
+        self._dict_actual = dict_id
+        return dict_id
+
+    def _diccionario(self, dict_id: str) -> bytes:
+        """
+        Diccionario por id. Si no está en memoria lo buscamos en la BD: otro
+        proceso (u otra instancia) sobre el mismo archivo pudo entrenarlo.
+        """
+        with self._lock:
+            datos = self._diccionarios.get(dict_id)
+            if datos is None:
+                fila = self._db.execute(
+                    "SELECT datos FROM diccionarios WHERE id = ?", (dict_id,)
+                ).fetchone()
+                if fila is None:
+                    raise KeyError(f"Diccionario {dict_id!r} no está en el almacén.")
+                datos = self._diccionarios[dict_id] = fila[0]
+            return datos
+
+    # ------------------------------------------------------------
+    # Escritura / lectura
+    # ------------------------------------------------------------
+    def guardar(self, texto: str) -> str:
+        crudo = texto.encode("utf-8")
+        ref = hashlib.sha256(crudo).hexdigest()
+
+        # Revisar si existe, juntar la muestra y entrenar van juntos bajo el
+        # lock: dos hilos no entrenan dos veces ni se pierden muestras
+        with self._lock:
+            existe = self._db.execute("SELECT 1 FROM blobs WHERE hash = ?", (ref,)).fetchone()
+            if existe:
+                return ref  # deduplicado
+
+            if self._dict_actual is None and self._auto_diccionario:
+                self._muestras.append(texto)
+                if len(self._muestras) >= self._auto_diccionario:
+                    self._registrar_diccionario(entrenar_diccionario(self._muestras))
+                    self._muestras = []
+
+            dict_id = self._dict_actual
+            zdict = self._diccionarios[dict_id] if dict_id is not None else None
+
+        # Comprimir es lo caro: fuera del lock
+        if zdict is not None:
+            comp = zlib.compressobj(level=9, zdict=zdict)
+        else:
+            comp = zlib.compressobj(level=9)
+        datos = comp.compress(crudo) + comp.flush()
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO blobs (hash, dict_id, tam, datos) VALUES (?, ?, ?, ?)",
+                (ref, dict_id, len(crudo), datos),
+            )
+            self._db.commit()
+        return ref
+
+    def leer(self, ref: str) -> Optional[str]:
+        with self._lock:
+            if ref in self._cache:
+                self._cache.move_to_end(ref)
+                return self._cache[ref]
+            fila = self._db.execute(
+                "SELECT dict_id, datos FROM blobs WHERE hash = ?", (ref,)
+            ).fetchone()
+        if fila is None:
+            return None
+
+        dict_id, datos = fila
+        if dict_id is not None:
+            decomp = zlib.decompressobj(zdict=self._diccionario(dict_id))
+        else:
+            decomp = zlib.decompressobj()
+        texto = (decomp.decompress(datos) + decomp.flush()).decode("utf-8")
+
+        with self._lock:
+            self._cache[ref] = texto
+            if len(self._cache) > self._tam_cache:
+                self._cache.popitem(last=False)
+        return texto
+
+    def estadisticas(self) -> Dict[str, int]:
+        with self._lock:
+            n, crudo, comprimido = self._db.execute(
+                "SELECT COUNT(*), COALESCE(SUM(tam), 0), COALESCE(SUM(LENGTH(datos)), 0) FROM blobs"
+            ).fetchone()
+        return {"blobs": n, "bytes_crudos": crudo, "bytes_comprimidos": comprimido}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
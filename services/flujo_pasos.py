@@ -0,0 +1,160 @@
+# services/flujo_pasos.py
+# ------------------------------------------------------------
+# Motor de flujos declarativos: un flujo es un grafo de pasos con nombre y
+# dependencias. El motor ejecuta cada paso apenas sus dependencias terminan
+# y mide cuánto tarda cada uno.
+#
+# Ojo con Playwright síncrono: la página NO se puede tocar desde otro hilo.
+# Por eso cada paso declara si es "de página" (corre en el hilo que llamó a
+# ejecutar(), uno a la vez) o "de fondo" (corre en un pool de hilos, p. ej.
+# esperar a que el operador escriba el captcha). Lo que se solapa es el
+# trabajo de página con la espera de los pasos de fondo.
+#
+# Si el flujo falla mientras un paso de fondo sigue corriendo, el motor no
+# lo espera: llama a su 'cancelar' (si lo tiene) para que suelte lo que esté
+# esperando, p. ej. retirar el captcha de la bandeja del operador.
+# ------------------------------------------------------------
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from services.runt_metrics import METRICAS
+
+
+@dataclass
+class Paso:
+    nombre: str
+    # Recibe el dict de resultados de los pasos ya terminados; lo que devuelve
+    # queda guardado en resultados[nombre].
+    funcion: Callable[[Dict[str, Any]], Any]
+    depende_de: Tuple[str, ...] = ()
+    en_pagina: bool = True
+    # Sólo pasos de fondo: se llama (desde el hilo de ejecutar) si el flujo
+    # falla mientras el paso sigue en curso
+    cancelar: Optional[Callable[[], None]] = None
+
+
+class GrafoFlujo:
+    def __init__(self, pasos: Iterable[Paso], hilos_fondo: int = 2):
+        self.pasos: List[Paso] = list(pasos)
+        self.hilos_fondo = hilos_fondo
+        self._por_nombre: Dict[str, Paso] = {}
+        for paso in self.pasos:
+            if paso.nombre in self._por_nombre:
+                raise ValueError(f"Paso duplicado en el flujo: {paso.nombre!r}")
+            self._por_nombre[paso.nombre] = paso
+        for paso in self.pasos:
+            for dep in paso.depende_de:
+                if dep not in self._por_nombre:
+                    raise ValueError(f"El paso {paso.nombre!r} depende de {dep!r}, que no existe.")
+        self._validar_sin_ciclos()
+
+    def _validar_sin_ciclos(self):
+        visitando, listos = set(), set()
+
+        def visitar(nombre: str):
+            if nombre in listos:
+                return
+            if nombre in visitando:
+                raise ValueError(f"Ciclo de dependencias en el flujo que pasa por {nombre!r}.")
+            visitando.add(nombre)
+            for dep in self._por_nombre[nombre].depende_de:
+                visitar(dep)
+            visitando.discard(nombre)
+            listos.add(nombre)
+
+        for paso in self.pasos:
+            visitar(paso.nombre)
+
+    def ejecutar(
+        self,
+        resultados: Optional[Dict[str, Any]] = None,
+        hechos: Iterable[str] = (),
+        tiempos: Optional[Dict[str, float]] = None,
+        log=None,
+    ) -> Dict[str, Any]:
+        """
+        Ejecuta el grafo. 'hechos' son pasos que se dan por terminados (p. ej.
+        porque la página ya venía preparada). Los segundos de cada paso se
+        suman en 'tiempos' y en METRICAS como flujo.paso.<nombre>.
+        Si un paso falla, se propaga su excepción; antes se cancelan los
+        pasos de fondo que sigan en curso (ver Paso.cancelar).
+        """
+        resultados = resultados if resultados is not None else {}
+        tiempos = tiempos if tiempos is not None else {}
+        completados = set(hechos)
+        pendientes = [p for p in self.pasos if p.nombre not in completados]
+        en_fondo: Dict[Future, str] = {}
+
+        def registrar(nombre: str, duracion: float):
+            tiempos[nombre] = tiempos.get(nombre, 0.0) + duracion
+            METRICAS.observar(f"flujo.paso.{nombre}", duracion)
+            if log is not None:
+                log.debug("⏱ Paso '%s' terminó en %.3fs", nombre, duracion)
+
+        def medido(paso: Paso):
+            inicio = time.perf_counter()
+            valor = paso.funcion(resultados)
+            return valor, time.perf_counter() - inicio
+
+        pool = ThreadPoolExecutor(max_workers=self.hilos_fondo, thread_name_prefix="flujo-paso")
+        try:
+            while pendientes or en_fondo:
+                listos = [p for p in pendientes if all(d in completados for d in p.depende_de)]
+
+                # 1) Lanzamos primero todo lo de fondo que ya se puede
+                for paso in [p for p in listos if not p.en_pagina]:
+                    pendientes.remove(paso)
+                    en_fondo[pool.submit(medido, paso)] = paso.nombre
+
+                # 2) Un paso de página en este hilo; luego volvemos a mirar qué se liberó
+                de_pagina = [p for p in listos if p.en_pagina]
+                if de_pagina:
+                    paso = de_pagina[0]
+                    pendientes.remove(paso)
+                    resultados[paso.nombre], duracion = medido(paso)
+                    registrar(paso.nombre, duracion)
+                    completados.add(paso.nombre)
+                    self._recoger(en_fondo, resultados, completados, registrar, bloquear=False)
+                    continue
+
+                if not en_fondo:
+                    # No debería pasar: el grafo se validó sin ciclos
+                    faltan = ", ".join(p.nombre for p in pendientes)
+                    raise RuntimeError(f"El flujo quedó bloqueado; pasos sin ejecutar: {faltan}")
+
+                # 3) Sólo queda esperar a algún paso de fondo
+                self._recoger(en_fondo, resultados, completados, registrar, bloquear=True)
+        except BaseException:
+            self._cancelar_fondo(en_fondo, log)
+            raise
+        finally:
+            # Si algo falló no esperamos a los pasos de fondo colgados (p. ej. un captcha)
+            pool.shutdown(wait=not en_fondo, cancel_futures=True)
+
+        return resultados
+
+    def _cancelar_fondo(self, en_fondo: Dict[Future, str], log):
+        for futuro, nombre in en_fondo.items():
+            paso = self._por_nombre[nombre]
+            if futuro.done() or paso.cancelar is None:
+                continue
+            try:
+                paso.cancelar()
+                METRICAS.incrementar(f"flujo.cancelados.{nombre}")
+            except Exception as e:
+                if log is not None:
+                    log.warning("⚠ No se pudo cancelar el paso '%s': %s", nombre, e)
+
+    @staticmethod
+    def _recoger(en_fondo, resultados, completados, registrar, bloquear: bool):
+        if not en_fondo:
+            return
+        terminados, _ = wait(list(en_fondo), timeout=None if bloquear else 0, return_when=FIRST_COMPLETED)
+        for futuro in terminados:
+            nombre = en_fondo.pop(futuro)
+            valor, duracion = futuro.result()  # propaga la excepción del paso
+            resultados[nombre] = valor
+            registrar(nombre, duracion)
+            completados.add(nombre)
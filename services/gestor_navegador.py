@@ -0,0 +1,280 @@
+# services/gestor_navegador.py
+# ------------------------------------------------------------
+# Navegador reutilizable entre consultas, con política de reciclaje.
+#
+# Abrir Chromium por cada consulta es lento; dejarlo vivo para siempre hace
+# que la memoria crezca hasta que el equipo hace swap. El gestor mantiene un
+# navegador + contexto y los recicla ENTRE consultas cuando:
+#   - el contexto atendió demasiadas consultas o es muy viejo,
+#   - el navegador atendió demasiadas consultas o es muy viejo,
+#   - la memoria del árbol de procesos supera el umbral.
+#
+# La memoria se mide como PSS (/proc/<pid>/smaps_rollup, Linux 4.14+): las
+# páginas compartidas entre los procesos de Chromium se reparten en vez de
+# contarse una vez por proceso, como haría sumar RSS. Si no hay smaps_rollup
+# se usa la RSS; sin /proc ese criterio se omite.
+#
+# Playwright síncrono no se comparte entre hilos: usar un gestor por hilo.
+# Las páginas pre-armadas (services/reserva_paginas.py) viven en este mismo
+# contexto; 'generacion' cambia cada vez que el contexto se cierra.
+# ------------------------------------------------------------
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+from playwright.sync_api import sync_playwright
+
+from services.runt_logging import logger_consulta
+from services.runt_metrics import METRICAS
+
+# Evita que dos hilos arranquen Playwright a la vez: así, si hay que deducir
+# el driver por los hijos nuevos (ver _pid_driver), sabemos de qué gestor es.
+_lock_arranque = threading.Lock()
+
+
+@dataclass
+class PoliticaReciclaje:
+    max_consultas_contexto: int = 50
+    max_edad_contexto_s: float = 30 * 60
+    max_consultas_navegador: int = 500
+    max_edad_navegador_s: float = 4 * 3600
+    # Umbral de memoria (PSS; RSS si no hay smaps_rollup) del árbol de
+    # procesos del navegador, driver incluido
+    max_rss_mb: Optional[float] = 1500
+
+
+# ------------------------------------------------------------
+# Memoria vía /proc
+# ------------------------------------------------------------
+def _hijos_por_padre() -> Dict[int, List[int]]:
+    hijos: Dict[int, List[int]] = {}
+    for entrada in os.listdir("/proc"):
+        if not entrada.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entrada}/stat", "rb") as f:
+                stat = f.read()
+        except OSError:
+            continue  # el proceso terminó mientras leíamos
+        # El nombre del proceso va entre paréntesis y puede tener espacios
+        campos = stat[stat.rfind(b")") + 2:].split()
+        hijos.setdefault(int(campos[1]), []).append(int(entrada))
+    return hijos
+
+
+def _descendientes(pid: int) -> Set[int]:
+    hijos = _hijos_por_padre()
+    vistos, pendientes = set(), [pid]
+    while pendientes:
+        actual = pendientes.pop()
+        if actual in vistos:
+            continue
+        vistos.add(actual)
+        pendientes.extend(hijos.get(actual, []))
+    return vistos
+
+
+def _memoria_proceso_bytes(pid: int) -> Optional[int]:
+    """PSS del proceso; su RSS si el kernel no tiene smaps_rollup. None si ya terminó."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for linea in f:
+                if linea.startswith("Pss:"):
+                    return int(linea.split()[1]) * 1024  # viene en kB
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return None
+
+
+def memoria_arbol_mb(pid: int) -> Optional[float]:
+    """
+    Memoria (MB) de pid y todos sus descendientes, sin contar dos veces las
+    páginas compartidas (PSS). None si no hay /proc.
+    """
+    if not os.path.isdir("/proc"):
+        return None
+    total = 0
+    for p in _descendientes(pid):
+        total += _memoria_proceso_bytes(p) or 0
+    return total / (1024 * 1024)
+
+
+def _hijos_directos(pid: int) -> Set[int]:
+    if not os.path.isdir("/proc"):
+        return set()
+    return set(_hijos_por_padre().get(pid, []))
+
+
+def _pid_driver(pw, nuevos: Set[int]) -> Optional[int]:
+    """
+    Pid del driver de Playwright (raíz del árbol de Chromium).
+
+    Se lee del proceso que lanzó Playwright (su transporte por pipes guarda el
+    subprocess). Esa ruta es interna y puede cambiar entre versiones; si no
+    está, se usa el único hijo nuevo que apareció al arrancar. Con varios no
+    adivinamos (otro código pudo lanzar procesos a la vez): sin pid, el
+    criterio de memoria simplemente se omite.
+    """
+    try:
+        return int(pw._impl_obj._connection._transport._proc.pid)
+    except (AttributeError, TypeError, ValueError):
+        pass
+    return next(iter(nuevos)) if len(nuevos) == 1 else None
+
+
+# ------------------------------------------------------------
+# Gestor
+# ------------------------------------------------------------
+class GestorNavegador:
+    def __init__(
+        self,
+        headless: bool = True,
+        slow_mo: int = 0,
+        politica: Optional[PoliticaReciclaje] = None,
+        debug: bool = False,
+    ):
+        self.headless = headless
+        self.slow_mo = slow_mo
+        self.politica = politica or PoliticaReciclaje()
+        self._log = logger_consulta("navegador", debug=debug)
+
+        self._pw = None
+        self._pid_driver: Optional[int] = None
+        self._browser = None
+        self._context = None
+        self._navegador_desde = 0.0
+        self._contexto_desde = 0.0
+        self._consultas_navegador = 0
+        self._consultas_contexto = 0
+        # Páginas entregadas por pagina() que aún no se sueltan
+        self._en_uso = 0
+        self.generacion = 0
+
+    # ------------------------------------------------------------
+    # Arranque / cierre
+    # ------------------------------------------------------------
+    def _asegurar_playwright(self):
+        if self._pw is not None:
+            return
+        with _lock_arranque:
+            antes = _hijos_directos(os.getpid())
+            self._pw = sync_playwright().start()
+            nuevos = _hijos_directos(os.getpid()) - antes
+        self._pid_driver = _pid_driver(self._pw, nuevos)
+
+    def _asegurar_navegador(self):
+        self._asegurar_playwright()
+        if self._browser is None:
+            self._browser = self._pw.chromium.launch(headless=self.headless, slow_mo=self.slow_mo)
+            self._navegador_desde = time.monotonic()
+            self._consultas_navegador = 0
+            METRICAS.incrementar("navegador.lanzamientos")
+        if self._context is None:
+            self._context = self._browser.new_context()
+            self._contexto_desde = time.monotonic()
+            self._consultas_contexto = 0
+
+    def _cerrar_contexto(self):
+        if self._context is not None:
+            try:
+                self._context.close()
+            except Exception:
+                pass
+            self._context = None
+            self.generacion += 1
+
+    def _cerrar_navegador(self):
+        self._cerrar_contexto()
+        if self._browser is not None:
+            try:
+                self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+
+    def cerrar(self):
+        self._cerrar_navegador()
+        if self._pw is not None:
+            self._pw.stop()
+            self._pw = None
+            self._pid_driver = None
+
+    # ------------------------------------------------------------
+    # Uso
+    # ------------------------------------------------------------
+    def nueva_pagina(self):
+        """Abre una página en el contexto vivo sin contarla como consulta (p. ej. para preparar)."""
+        self._asegurar_navegador()
+        return self._context.new_page()
+
+    @contextmanager
+    def pagina(self, existente=None):
+        """
+        Entrega una página nueva en el contexto vivo (o 'existente', una ya
+        preparada con nueva_pagina()). Al salir se cierra la página y, ya sin
+        trabajo en curso, se aplica la política de reciclaje.
+        """
+        page = existente if existente is not None else self.nueva_pagina()
+        self._en_uso += 1
+        try:
+            yield page
+        finally:
+            self._en_uso -= 1
+            try:
+                page.close()
+            except Exception:
+                pass
+            self._consultas_contexto += 1
+            self._consultas_navegador += 1
+            self.revisar()
+
+    def memoria_mb(self) -> Optional[float]:
+        if self._pid_driver is None:
+            return None
+        return memoria_arbol_mb(self._pid_driver)
+
+    def revisar(self):
+        """
+        Recicla contexto/navegador si algún umbral se superó. Con una página
+        de pagina() todavía en uso no hace nada: se revisa al soltar la última.
+        """
+        if self._browser is None or self._en_uso:
+            return
+        pol = self.politica
+        ahora = time.monotonic()
+
+        memoria = self.memoria_mb()
+        if memoria is not None:
+            METRICAS.observar("navegador.memoria_mb", memoria)
+
+        motivo_navegador = None
+        if self._consultas_navegador >= pol.max_consultas_navegador:
+            motivo_navegador = f"{self._consultas_navegador} consultas"
+        elif ahora - self._navegador_desde >= pol.max_edad_navegador_s:
+            motivo_navegador = "edad"
+        elif pol.max_rss_mb is not None and memoria is not None and memoria >= pol.max_rss_mb:
+            motivo_navegador = f"memoria {memoria:.0f} MB"
+
+        if motivo_navegador:
+            self._log.info("♻ Reciclando navegador (%s).", motivo_navegador)
+            METRICAS.incrementar("navegador.reciclajes")
+            self._cerrar_navegador()
+            return
+
+        motivo_contexto = None
+        if self._consultas_contexto >= pol.max_consultas_contexto:
+            motivo_contexto = f"{self._consultas_contexto} consultas"
+        elif ahora - self._contexto_desde >= pol.max_edad_contexto_s:
+            motivo_contexto = "edad"
+
+        if motivo_contexto:
+            self._log.debug("♻ Reciclando contexto (%s).", motivo_contexto)
+            METRICAS.incrementar("navegador.contexto.reciclajes")
+            self._cerrar_contexto()
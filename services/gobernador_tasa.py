@@ -0,0 +1,222 @@
+# services/gobernador_tasa.py
+# ------------------------------------------------------------
+# Gobernador de tasa compartido por TODOS los procesos del equipo
+# (consolas, GUI, barridos): una sola cubeta de tokens en un archivo SQLite.
+#
+# - tasa: tokens por segundo que se reponen; rafaga: máximo acumulable.
+# - Reparto justo: cada petición saca un turno y sólo la cabeza de la fila
+#   puede tomar un token, así un proceso muy activo no acapara la cubeta.
+# - Prioridad: la fila se ordena por prioridad (0 = consulta interactiva) y
+#   luego por llegada; cada ENVEJECIMIENTO_S de espera un turno sube un nivel,
+#   así los barridos masivos nunca se quedan sin turno. El envejecimiento sólo
+#   reordena los turnos no interactivos entre sí: ninguno pasa a uno de
+#   prioridad 0.
+# - Turnos de procesos que murieron se purgan por latido vencido.
+# - SQLite con BEGIN IMMEDIATE hace de cerrojo entre procesos.
+#
+# Configuración por variables de entorno (o parámetros):
+#   RUNT_GOBERNADOR_DB   ruta del archivo (por defecto en la carpeta temporal)
+#   RUNT_TASA_POR_MIN    peticiones por minuto (por defecto 20)
+#   RUNT_RAFAGA          ráfaga máxima (por defecto 3)
+# ------------------------------------------------------------
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional
+
+from services.runt_metrics import METRICAS
+
+TASA_POR_MIN_DEFECTO = 20.0
+RAFAGA_DEFECTO = 3.0
+# Un turno sin latido por este tiempo se considera abandonado
+TTL_TURNO_S = 30.0
+# Cada cuánto revisa un proceso que no está en la cabeza de la fila
+SONDEO_MAX_S = 0.25
+# Segundos de espera que valen un nivel de prioridad (anti-inanición)
+ENVEJECIMIENTO_S = 60.0
+PRIORIDAD_DEFECTO = 1
+
+
+def ruta_por_defecto() -> str:
+    return os.environ.get(
+        "RUNT_GOBERNADOR_DB",
+        os.path.join(tempfile.gettempdir(), "turn_dispenser_tasa.sqlite3"),
+    )
+
+
+class GobernadorTasa:
+    def __init__(
+        self,
+        ruta: Optional[str] = None,
+        tasa_por_min: Optional[float] = None,
+        rafaga: Optional[float] = None,
+        nombre: str = "runt",
+    ):
+        self.ruta = ruta or ruta_por_defecto()
+        self.nombre = nombre
+        self._local = threading.local()
+
+        tasa_por_min = tasa_por_min or float(os.environ.get("RUNT_TASA_POR_MIN", TASA_POR_MIN_DEFECTO))
+        rafaga = rafaga or float(os.environ.get("RUNT_RAFAGA", RAFAGA_DEFECTO))
+        if tasa_por_min <= 0 or rafaga < 1:
+            raise ValueError("La tasa debe ser > 0 y la ráfaga >= 1.")
+
+        db = self._db()
+        db.execute("BEGIN IMMEDIATE")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cubeta (
+                nombre      TEXT PRIMARY KEY,
+                tokens      REAL NOT NULL,
+                actualizado REAL NOT NULL,
+                tasa        REAL NOT NULL,
+                rafaga      REAL NOT NULL
+            )
+            """
+        )
+        columnas = {fila[1] for fila in db.execute("PRAGMA table_info(turnos)")}
+        if columnas and "prioridad" not in columnas:
+            # Fila de una versión anterior: los turnos son efímeros, se puede recrear
+            db.execute("DROP TABLE turnos")
+        db.execute(
+            """
+            CREATE TABLE IF NOT EXISTS turnos (
+                id        INTEGER PRIMARY KEY AUTOINCREMENT,
+                nombre    TEXT NOT NULL,
+                pid       INTEGER NOT NULL,
+                latido    REAL NOT NULL,
+                creado    REAL NOT NULL,
+                prioridad INTEGER NOT NULL
+            )
+            """
+        )
+        # La última configuración gana: todos los procesos leen tasa/ráfaga de la BD
+        db.execute(
+            """
+            INSERT INTO cubeta (nombre, tokens, actualizado, tasa, rafaga) VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(nombre) DO UPDATE SET tasa = excluded.tasa, rafaga = excluded.rafaga
+            """,
+            (nombre, rafaga, time.time(), tasa_por_min / 60.0, rafaga),
+        )
+        db.execute("COMMIT")
+
+    def _db(self) -> sqlite3.Connection:
+        # Una conexión por hilo (sqlite3 no comparte conexiones entre hilos)
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.ruta, timeout=30, isolation_level=None)
+            db.execute("PRAGMA journal_mode=WAL")
+            self._local.db = db
+        return db
+
+    def adquirir(
+        self,
+        motivo: str = "peticion",
+        timeout_s: Optional[float] = None,
+        prioridad: int = PRIORIDAD_DEFECTO,
+    ) -> float:
+        """
+        Bloquea hasta obtener un token. Devuelve los segundos esperados
+        (también quedan en METRICAS como gobernador.espera_s[.motivo] y
+        gobernador.espera_s.p<prioridad>). prioridad: 0 pasa primero.
+        """
+        db = self._db()
+        inicio = time.time()
+
+        db.execute("BEGIN IMMEDIATE")
+        turno = db.execute(
+            "INSERT INTO turnos (nombre, pid, latido, creado, prioridad) VALUES (?, ?, ?, ?, ?)",
+            (self.nombre, os.getpid(), inicio, inicio, prioridad),
+        ).lastrowid
+        db.execute("COMMIT")
+
+        try:
+            while True:
+                ahora = time.time()
+                db.execute("BEGIN IMMEDIATE")
+                try:
+                    espera = self._intentar(db, turno, ahora, inicio, prioridad)
+                finally:
+                    db.execute("COMMIT")
+
+                if espera == 0:
+                    break
+                if timeout_s is not None and ahora - inicio + espera > timeout_s:
+                    raise TimeoutError(f"El gobernador de tasa no dio turno en {timeout_s:.0f}s ({motivo}).")
+                time.sleep(espera)
+        except BaseException:
+            db.execute("DELETE FROM turnos WHERE id = ?", (turno,))
+            raise
+
+        esperado = time.time() - inicio
+        METRICAS.observar("gobernador.espera_s", esperado)
+        METRICAS.observar(f"gobernador.espera_s.{motivo}", esperado)
+        METRICAS.observar(f"gobernador.espera_s.p{prioridad}", esperado)
+        METRICAS.incrementar("gobernador.adquisiciones")
+        return esperado
+
+    def _intentar(
+        self, db: sqlite3.Connection, turno: int, ahora: float, creado: float, prioridad: int
+    ) -> float:
+        """
+        Dentro de una transacción: si somos la cabeza de la fila y hay token,
+        lo tomamos y devolvemos 0. Si no, devolvemos cuánto dormir.
+        """
+        # Nuestro turno nunca se purga aquí: estamos vivos, sólo nos tocó dormir
+        db.execute(
+            "DELETE FROM turnos WHERE nombre = ? AND latido < ? AND id != ?",
+            (self.nombre, ahora - TTL_TURNO_S, turno),
+        )
+        if db.execute("UPDATE turnos SET latido = ? WHERE id = ?", (ahora, turno)).rowcount == 0:
+            # Otro proceso lo purgó (p. ej. este estuvo suspendido más que el TTL):
+            # lo volvemos a poner con el mismo id y antigüedad
+            METRICAS.incrementar("gobernador.turnos_repuestos")
+            db.execute(
+                "INSERT INTO turnos (id, nombre, pid, latido, creado, prioridad) VALUES (?, ?, ?, ?, ?, ?)",
+                (turno, self.nombre, os.getpid(), ahora, creado, prioridad),
+            )
+
+        (cabeza,) = db.execute(
+            """
+            SELECT id FROM turnos WHERE nombre = ?
+            ORDER BY prioridad > 0, prioridad - (? - creado) / ?, id LIMIT 1
+            """,
+            (self.nombre, ahora, ENVEJECIMIENTO_S),
+        ).fetchone()
+        tokens, actualizado, tasa, rafaga = db.execute(
+            "SELECT tokens, actualizado, tasa, rafaga FROM cubeta WHERE nombre = ?", (self.nombre,)
+        ).fetchone()
+        tokens = min(rafaga, tokens + max(0.0, ahora - actualizado) * tasa)
+
+        if cabeza == turno and tokens >= 1:
+            db.execute(
+                "UPDATE cubeta SET tokens = ?, actualizado = ? WHERE nombre = ?",
+                (tokens - 1, ahora, self.nombre),
+            )
+            db.execute("DELETE FROM turnos WHERE id = ?", (turno,))
+            return 0.0
+
+        db.execute(
+            "UPDATE cubeta SET tokens = ?, actualizado = ? WHERE nombre = ?",
+            (tokens, ahora, self.nombre),
+        )
+        if cabeza == turno:
+            # Dormimos hasta el próximo token, pero sin dejar vencer el latido
+            return min((1 - tokens) / tasa, TTL_TURNO_S / 3)
+        # No es nuestro turno: revisamos pronto (nuestro latido nos mantiene en la fila)
+        return min(SONDEO_MAX_S, 1 / tasa)
+
+
+_compartido: Optional[GobernadorTasa] = None
+_lock = threading.Lock()
+
+
+def obtener_gobernador() -> GobernadorTasa:
+    """Gobernador del proceso con la configuración por defecto / de entorno."""
+    global _compartido
+    with _lock:
+        if _compartido is None:
+            _compartido = GobernadorTasa()
+        return _compartido
@@ -0,0 +1,96 @@
+# services/har_replay.py
+# ------------------------------------------------------------
+# Reproducción offline de sesiones grabadas en HAR.
+#
+# Grabar: run_runt_flow(..., har_grabar="sesion.har") usa la grabación
+#         nativa de Playwright (record_har_path) con el contenido embebido.
+# Reproducir: ReproductorHar intercepta TODAS las peticiones del contexto y
+#         responde desde el archivo; lo que no esté grabado se aborta, así
+#         nunca se toca el portal real.
+#
+# Latencia simulada: se aplica dentro del handler de la ruta. Con la API
+# síncrona de Playwright eso serializa las respuestas (como una conexión
+# lenta de un solo canal), suficiente para detectar esperas de más.
+# ------------------------------------------------------------
+import base64
+import json
+import time
+from collections import defaultdict, deque
+from typing import Deque, Dict, Optional, Tuple
+
+# Encabezados que ya no aplican porque servimos el cuerpo decodificado
+_ENCABEZADOS_OMITIDOS = {"content-encoding", "content-length", "transfer-encoding"}
+
+
+def _sin_fragmento(url: str) -> str:
+    # El navegador no envía el #fragmento; el HAR a veces lo guarda
+    return url.split("#", 1)[0]
+
+
+class ReproductorHar:
+    def __init__(self, ruta_har: str, latencia_ms: int = 0, kbps: Optional[int] = None):
+        with open(ruta_har, encoding="utf-8") as f:
+            har = json.load(f)
+
+        self.latencia_ms = latencia_ms
+        self.kbps = kbps
+        self.servidas = 0
+        self.no_encontradas = 0
+
+        # Peticiones repetidas (p. ej. el captcha) se sirven en el orden grabado;
+        # la última respuesta se reutiliza si se piden más veces.
+        self._por_cuerpo: Dict[Tuple[str, str, str], Deque[dict]] = defaultdict(deque)
+        self._por_url: Dict[Tuple[str, str], Deque[dict]] = defaultdict(deque)
+        for entrada in har["log"]["entries"]:
+            req = entrada["request"]
+            metodo = req["method"].upper()
+            url = _sin_fragmento(req["url"])
+            cuerpo = (req.get("postData") or {}).get("text", "")
+            self._por_cuerpo[(metodo, url, cuerpo)].append(entrada["response"])
+            self._por_url[(metodo, url)].append(entrada["response"])
+
+    def instalar(self, context):
+        """Engancha el reproductor a un BrowserContext de Playwright."""
+        context.route("**/*", self._manejar)
+
+    def _siguiente(self, cola: Deque[dict]) -> dict:
+        return cola.popleft() if len(cola) > 1 else cola[0]
+
+    def _buscar(self, request) -> Optional[dict]:
+        metodo = request.method.upper()
+        url = _sin_fragmento(request.url)
+        cola = self._por_cuerpo.get((metodo, url, request.post_data or ""))
+        if cola:
+            return self._siguiente(cola)
+        cola = self._por_url.get((metodo, url))
+        if cola:
+            return self._siguiente(cola)
+        return None
+
+    def _manejar(self, route):
+        respuesta = self._buscar(route.request)
+        if respuesta is None:
+            self.no_encontradas += 1
+            route.abort()
+            return
+
+        contenido = respuesta.get("content") or {}
+        texto = contenido.get("text") or ""
+        if contenido.get("encoding") == "base64":
+            cuerpo = base64.b64decode(texto)
+        else:
+            cuerpo = texto.encode("utf-8")
+
+        espera_s = self.latencia_ms / 1000
+        if self.kbps:
+            espera_s += len(cuerpo) * 8 / (self.kbps * 1000)
+        if espera_s > 0:
+            time.sleep(espera_s)
+
+        encabezados = {
+            h["name"]: h["value"]
+            for h in respuesta.get("headers", [])
+            if h["name"].lower() not in _ENCABEZADOS_OMITIDOS and not h["name"].startswith(":")
+        }
+        self.servidas += 1
+        route.fulfill(status=respuesta.get("status", 200), headers=encabezados, body=cuerpo)
@@ -0,0 +1,246 @@
+# services/reserva_paginas.py
+# ------------------------------------------------------------
+# Reserva de páginas "pre-armadas" en el navegador reutilizado de un hilo.
+#
+# Cada página de la reserva ya navegó al portal, tiene el popup de
+# Autocompletar cerrado, el tipo de documento más pedido seleccionado y el
+# captcha visible. Una consulta que toma una de estas páginas arranca
+# directamente en "escribir número y resolver captcha".
+#
+# - reponer() hace UNA unidad de trabajo (preparar o refrescar una página) y
+#   se llama desde el hilo dueño del gestor cuando está ocioso (Playwright
+#   síncrono no se comparte entre hilos: no hay hilo de fondo propio).
+# - Las páginas se refrescan antes de max_edad_s, para que no se venza la
+#   sesión del portal ni el captcha mientras esperan.
+# - Si el gestor recicla el contexto, las páginas preparadas mueren con él
+#   y se descartan solas (se compara la generación del contexto).
+# - Preparar también pide turno al gobernador de tasa, con la prioridad más
+#   baja: lo especulativo nunca le quita turno a una consulta real. Esa espera
+#   es corta (TIMEOUT_TURNO_S): si no hay turno se deja para después y el
+#   worker vuelve a atender la cola en vez de quedarse bloqueado.
+# - Preparar se puede interrumpir: reponer(hay_trabajo) consulta la cola
+#   entre etapas (turno, página, navegación, popup, tipo) y, si llegó una
+#   consulta, suelta la página a medias y el worker la atiende de inmediato.
+#   Las esperas de la preparación también son más cortas que las del flujo.
+# ------------------------------------------------------------
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Any, Callable, Deque, Optional
+
+from services.gobernador_tasa import obtener_gobernador
+from services.runt_logging import logger_consulta
+from services.runt_metrics import METRICAS
+from services.runt_playwright import RUNT_URL, PreparacionInterrumpida, preparar_formulario
+
+# Edad máxima de una página preparada (sesión del portal / vigencia del captcha)
+MAX_EDAD_S = 240.0
+# Se refresca al pasar esta fracción de la edad máxima
+MARGEN_REFRESCO = 0.8
+# Tras un error preparando, esperamos antes de reintentar (no quemar turnos)
+PAUSA_TRAS_ERROR_S = 30.0
+# Prioridad en el gobernador de tasa (2 = la del carril masivo)
+PRIORIDAD_PREPARACION = 2
+# Máximo que un worker ocioso espera turno para preparar (no debe demorar
+# la siguiente consulta real) y pausa si no lo consiguió
+TIMEOUT_TURNO_S = 1.0
+PAUSA_SIN_TURNO_S = 5.0
+# Esperas de la navegación al preparar (las de una consulta real son 60 s y 10 s):
+# cuanto más cortas, antes se llega al siguiente punto de interrupción
+TIMEOUT_NAVEGACION_MS = 15000
+ESPERA_RED_MS = 2000
+
+
+@dataclass
+class PaginaPreparada:
+    page: Any
+    formulario: Any  # FormularioRunt con los locators ya resueltos
+    tipo: str
+    url: str
+    preparada_en: float
+    generacion: int  # generación del contexto del gestor al prepararla
+
+
+class ReservaPaginas:
+    def __init__(
+        self,
+        gestor,
+        cantidad: int = 1,
+        url: str = RUNT_URL,
+        max_edad_s: float = MAX_EDAD_S,
+        tipo_defecto: str = "CC",
+        gobernador=None,
+        debug: bool = False,
+    ):
+        self.gestor = gestor
+        self.cantidad = cantidad
+        self.url = url
+        self.max_edad_s = max_edad_s
+        self.tipo_defecto = tipo_defecto
+        self.gobernador = gobernador if gobernador is not None else obtener_gobernador()
+        self._log = logger_consulta("reserva", debug=debug)
+        self._stock: Deque[PaginaPreparada] = deque()
+        self._pedidos: Counter = Counter()
+        self._pausa_hasta = 0.0
+
+    # ------------------------------------------------------------
+    # Consumo
+    # ------------------------------------------------------------
+    def tomar(self, tipo: str, url: str = RUNT_URL) -> Optional[PaginaPreparada]:
+        """
+        Entrega una página preparada (de preferencia con el mismo tipo ya
+        seleccionado) o None si no hay ninguna vigente para esa URL.
+        """
+        tipo = tipo.upper().strip()
+        self._pedidos[tipo] += 1
+        self._descartar_vencidas()
+
+        if url == self.url and self._stock:
+            elegida = next((p for p in self._stock if p.tipo == tipo), self._stock[0])
+            self._stock.remove(elegida)
+            METRICAS.incrementar("reserva.aciertos")
+            METRICAS.observar("reserva.edad_s", time.monotonic() - elegida.preparada_en)
+            return elegida
+
+        METRICAS.incrementar("reserva.fallos")
+        return None
+
+    def disponibles(self) -> int:
+        self._descartar_vencidas()
+        return len(self._stock)
+
+    def tipo_frecuente(self) -> str:
+        if not self._pedidos:
+            return self.tipo_defecto
+        return self._pedidos.most_common(1)[0][0]
+
+    # ------------------------------------------------------------
+    # Reposición (llamar desde el hilo del gestor, entre consultas)
+    # ------------------------------------------------------------
+    def reponer(self, hay_trabajo: Optional[Callable[[], bool]] = None) -> bool:
+        """
+        Prepara o refresca UNA página si hace falta. Devuelve True si hizo
+        algo (el llamador puede volver a llamar mientras siga ocioso).
+        hay_trabajo: si devuelve True entre etapas, la preparación se abandona
+        para que el worker atienda la consulta que llegó.
+        """
+        if hay_trabajo is not None and hay_trabajo():
+            return False
+        ahora = time.monotonic()
+        if self.cantidad <= 0 or ahora < self._pausa_hasta:
+            return False
+        self._descartar_vencidas()
+
+        # 1) Refrescar la que esté por vencer (la más vieja va primero en el deque)
+        if self._stock and ahora - self._stock[0].preparada_en >= self.max_edad_s * MARGEN_REFRESCO:
+            vieja = self._stock.popleft()
+            METRICAS.incrementar("reserva.refrescos")
+            self._preparar(vieja, hay_trabajo)
+            return True
+
+        # 2) Completar el stock
+        if len(self._stock) < self.cantidad:
+            self._preparar(hay_trabajo=hay_trabajo)
+            return True
+        return False
+
+    def _preparar(self, vieja: Optional[PaginaPreparada] = None, hay_trabajo=None):
+        tipo = self.tipo_frecuente()
+        inicio = time.perf_counter()
+        try:
+            self.gobernador.adquirir("preparacion", timeout_s=TIMEOUT_TURNO_S, prioridad=PRIORIDAD_PREPARACION)
+        except TimeoutError:
+            # Hay consultas reales esperando turno: lo especulativo cede
+            METRICAS.incrementar("reserva.sin_turno")
+            self._pausa_hasta = time.monotonic() + PAUSA_SIN_TURNO_S
+            if vieja is not None:
+                # La que íbamos a refrescar sigue vigente hasta max_edad_s
+                self._stock.appendleft(vieja)
+            return
+        except Exception as e:
+            self._fallo(e, vieja.page if vieja is not None else None)
+            return
+
+        if hay_trabajo is not None and hay_trabajo():
+            # Llegó una consulta mientras esperábamos turno: aún no tocamos nada
+            METRICAS.incrementar("reserva.interrumpidas")
+            if vieja is not None:
+                self._stock.appendleft(vieja)
+            return
+
+        page = vieja.page if vieja is not None else None
+        try:
+            if page is None:
+                page = self.gestor.nueva_pagina()
+            formulario = preparar_formulario(
+                page,
+                tipo=tipo,
+                url=self.url,
+                log=self._log,
+                timeout_ms=TIMEOUT_NAVEGACION_MS,
+                espera_red_ms=ESPERA_RED_MS,
+                interrumpir=hay_trabajo,
+            )
+        except PreparacionInterrumpida as e:
+            # No es un error: sin pausa, se vuelve a intentar en el próximo rato ocioso
+            METRICAS.incrementar("reserva.interrumpidas")
+            self._log.debug("⏸ Preparación %s: hay una consulta esperando.", e)
+            if page is not None:
+                self._cerrar(page)
+            return
+        except Exception as e:
+            self._fallo(e, page)
+            return
+
+        METRICAS.observar("reserva.preparacion_s", time.perf_counter() - inicio)
+        self._stock.append(
+            PaginaPreparada(
+                page=page,
+                formulario=formulario,
+                tipo=tipo,
+                url=self.url,
+                preparada_en=time.monotonic(),
+                generacion=self.gestor.generacion,
+            )
+        )
+        self._log.debug("📦 Página preparada (tipo %s); en reserva: %d.", tipo, len(self._stock))
+
+    def _fallo(self, error: Exception, page):
+        self._log.warning("⚠ No se pudo preparar una página de reserva: %s", error)
+        METRICAS.incrementar("reserva.errores")
+        self._pausa_hasta = time.monotonic() + PAUSA_TRAS_ERROR_S
+        if page is not None:
+            self._cerrar(page)
+
+    # ------------------------------------------------------------
+    # Limpieza
+    # ------------------------------------------------------------
+    def _vigente(self, p: PaginaPreparada, ahora: float) -> bool:
+        return (
+            p.generacion == self.gestor.generacion
+            and ahora - p.preparada_en < self.max_edad_s
+            and not p.page.is_closed()
+        )
+
+    def _descartar_vencidas(self):
+        ahora = time.monotonic()
+        vigentes = deque()
+        for p in self._stock:
+            if self._vigente(p, ahora):
+                vigentes.append(p)
+            else:
+                METRICAS.incrementar("reserva.descartes")
+                self._cerrar(p.page)
+        self._stock = vigentes
+
+    @staticmethod
+    def _cerrar(page):
+        try:
+            page.close()
+        except Exception:
+            pass
+
+    def vaciar(self):
+        """Cierra todas las páginas preparadas (antes de cerrar el gestor)."""
+        while self._stock:
+            self._cerrar(self._stock.popleft().page)
@@ -0,0 +1,197 @@
+# services/runt_export.py
+# ------------------------------------------------------------
+# Exportación de resultados a Parquet (formato columnar) para análisis.
+#
+# - Escribe por bloques (row groups) de tamaño acotado: la memoria no crece
+#   con el tamaño del barrido.
+# - Cada bloque queda en su propio archivo part-<fecha>-<pid>-<id>.parquet
+#   (nombre único: varios exportadores pueden escribir en el mismo dataset
+#   sin pisarse), así que el dataset se puede leer mientras el barrido corre.
+# - Partición opcional estilo Hive (tipo_documento=CC/, fecha=2025-01-31/).
+#
+# Requiere pyarrow (pandas lo usa igual para to_parquet/read_parquet).
+# ------------------------------------------------------------
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - depende del entorno
+    pa = None
+    pc = None
+    ds = None
+    pq = None
+
+PARTICIONES_VALIDAS = ("tipo_documento", "fecha")
+
+
+def _requiere_pyarrow():
+    if pa is None:
+        raise RuntimeError(
+            "La exportación a Parquet requiere pyarrow. Instálalo con: pip install pyarrow"
+        )
+
+
+def esquema_resultados():
+    """
+    Esquema estable del dataset. No cambiar el orden ni los tipos sin
+    migrar los archivos ya escritos.
+    """
+    _requiere_pyarrow()
+    return pa.schema([
+        ("tipo_documento", pa.string()),
+        ("numero_documento", pa.string()),
+        ("consultado_en", pa.timestamp("ms", tz="UTC")),
+        ("fecha", pa.string()),
+        ("nombre", pa.string()),
+        ("estado_licencia", pa.string()),
+        ("tiene_multas", pa.bool_()),
+        ("sin_registro", pa.bool_()),
+        ("raw_ref", pa.string()),
+    ])
+
+
+class ExportadorParquet:
+    """
+    Acumula ResultadoRunt en memoria hasta filas_por_grupo y los vuelca a un
+    archivo Parquet nuevo. Es seguro llamarlo desde varios hilos.
+
+    Uso:
+        with ExportadorParquet("salida/resultados", particion="tipo_documento") as exp:
+            exp.agregar(params, resultado)
+    """
+
+    def __init__(
+        self,
+        ruta: str,
+        filas_por_grupo: int = 5000,
+        particion: Optional[str] = None,
+        compresion: str = "zstd",
+    ):
+        _requiere_pyarrow()
+        if particion is not None and particion not in PARTICIONES_VALIDAS:
+            raise ValueError(f"Partición no soportada: {particion!r}. Usa una de {PARTICIONES_VALIDAS}.")
+
+        self.ruta = Path(ruta)
+        self.ruta.mkdir(parents=True, exist_ok=True)
+        self.filas_por_grupo = filas_por_grupo
+        self.particion = particion
+        self.compresion = compresion
+        self._esquema = esquema_resultados()
+        self._buffer: Dict[str, List] = {nombre: [] for nombre in self._esquema.names}
+        self._lock = threading.Lock()
+
+    def agregar(
+        self,
+        params: ConsultaRuntParams,
+        resultado: ResultadoRunt,
+        consultado_en: Optional[datetime] = None,
+    ):
+        cuando = consultado_en or datetime.now(timezone.utc)
+        fila = {
+            "tipo_documento": params.tipo_documento.upper().strip(),
+            "numero_documento": params.numero_documento.strip(),
+            "consultado_en": cuando,
+            "fecha": cuando.date().isoformat(),
+            "nombre": resultado.nombre,
+            "estado_licencia": resultado.estado_licencia,
+            "tiene_multas": resultado.tiene_multas,
+            "sin_registro": resultado.sin_registro,
+            "raw_ref": resultado.raw_ref,
+        }
+        with self._lock:
+            for nombre, valor in fila.items():
+                self._buffer[nombre].append(valor)
+            if len(self._buffer["tipo_documento"]) >= self.filas_por_grupo:
+                self._volcar()
+
+    def flush(self):
+        with self._lock:
+            self._volcar()
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _volcar(self):
+        # Llamar con self._lock tomado
+        if not self._buffer["tipo_documento"]:
+            return
+        tabla = pa.Table.from_pydict(self._buffer, schema=self._esquema)
+        self._buffer = {nombre: [] for nombre in self._esquema.names}
+
+        if self.particion is None:
+            self._escribir(tabla, self.ruta)
+            return
+
+        # Un archivo por valor de partición dentro del bloque
+        columna = tabla.column(self.particion)
+        for valor in columna.unique().to_pylist():
+            mascara = pc.equal(columna, valor)
+            subtabla = tabla.filter(mascara).drop_columns([self.particion])
+            self._escribir(subtabla, self.ruta / f"{self.particion}={valor}")
+
+    def _escribir(self, tabla, carpeta: Path):
+        carpeta.mkdir(parents=True, exist_ok=True)
+        # Nombre único (nunca un contador): no pisa archivos de otras ejecuciones
+        # ni de otro exportador escribiendo en el mismo dataset
+        marca = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        destino = carpeta / f"part-{marca}-{os.getpid()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Escribimos a un temporal oculto y renombramos: un lector concurrente
+        # nunca ve un archivo a medio escribir (pyarrow ignora los que empiezan por '.').
+        temporal = carpeta / f".{destino.name}.tmp"
+        pq.write_table(
+            tabla,
+            temporal,
+            row_group_size=self.filas_por_grupo,
+            compression=self.compresion,
+        )
+        temporal.replace(destino)
+
+
+def leer_resultados(
+    ruta: str,
+    columnas: Optional[Sequence[str]] = None,
+    filtro=None,
+):
+    """
+    Lee el dataset como DataFrame de pandas. Sólo se leen del disco las
+    columnas pedidas (Parquet es columnar). El HTML crudo no está en el
+    dataset: raw_ref apunta al almacén de blobs (services/blob_store.py).
+
+    filtro: expresión de pyarrow.dataset, p. ej. ds.field("tipo_documento") == "CC"
+
+    El esquema y la partición se pasan explícitos: las columnas salen con el
+    mismo orden y tipos (fecha como texto, no inferida) esté o no
+    particionado el dataset.
+    """
+    _requiere_pyarrow()
+    esquema = esquema_resultados()
+    particion = ds.partitioning(
+        pa.schema([esquema.field(nombre) for nombre in PARTICIONES_VALIDAS]),
+        flavor="hive",
+    )
+    dataset = ds.dataset(
+        ruta,
+        format="parquet",
+        schema=esquema,
+        partitioning=particion,
+        exclude_invalid_files=True,
+    )
+    if columnas is not None:
+        columnas = list(columnas)
+    return dataset.to_table(columns=columnas, filter=filtro).to_pandas()
@@ -0,0 +1,121 @@
+# services/runt_logging.py
+# ------------------------------------------------------------
+# Logging estructurado para el flujo RUNT.
+#
+# - Formato perezoso: log.debug("texto %s", valor) no formatea nada si el
+#   nivel está desactivado.
+# - Los registros se encolan y un hilo aparte (QueueListener) los formatea y
+#   escribe: los workers nunca se bloquean escribiendo en stdout.
+# - Cada registro lleva query_id, fase e intento para poder filtrar.
+# ------------------------------------------------------------
+import atexit
+import itertools
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from typing import Optional
+
+LOGGER_NOMBRE = "turn_dispenser"
+FORMATO = "%(asctime)s %(levelname)-7s [q=%(query_id)s fase=%(fase)s intento=%(intento)s] %(message)s"
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_lock = threading.Lock()
+_ids = itertools.count(1)
+
+
+class _CamposPorDefecto(logging.Filter):
+    """Rellena los campos estructurados en registros que no vienen de LoggerConsulta."""
+
+    def filter(self, record):
+        for campo, defecto in (("query_id", "-"), ("fase", "-"), ("intento", 0)):
+            if not hasattr(record, campo):
+                setattr(record, campo, defecto)
+        return True
+
+
+class _QueueHandlerDiferido(logging.handlers.QueueHandler):
+    """
+    QueueHandler que deja el formateo del mensaje al hilo del listener.
+    (El estándar formatea en el hilo que loguea; aquí eso es justo lo que
+    queremos sacar del camino caliente.)
+    """
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Las excepciones sí hay que renderizarlas aquí: el traceback no viaja bien
+            return super().prepare(record)
+        return record
+
+
+def configurar_logging(nivel: int = logging.INFO, stream=None) -> logging.Logger:
+    """
+    Instala (una sola vez) la cola + el hilo escritor. Llamar desde la vista
+    o el script de entrada, no desde los servicios.
+    """
+    global _listener
+    logger = logging.getLogger(LOGGER_NOMBRE)
+    logger.setLevel(nivel)
+
+    with _lock:
+        if _listener is not None:
+            return logger
+
+        salida = logging.StreamHandler(stream or sys.stdout)
+        salida.setFormatter(logging.Formatter(FORMATO, datefmt="%H:%M:%S"))
+        salida.addFilter(_CamposPorDefecto())
+
+        cola: "queue.SimpleQueue" = queue.SimpleQueue()
+        logger.addHandler(_QueueHandlerDiferido(cola))
+        logger.propagate = False
+
+        _listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+        _listener.start()
+        atexit.register(detener_logging)
+
+    return logger
+
+
+def detener_logging():
+    """Vacía la cola y detiene el hilo escritor."""
+    global _listener
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+
+
+class LoggerConsulta(logging.LoggerAdapter):
+    """
+    Adaptador por consulta: agrega query_id / fase / intento a cada registro.
+    Con verbose=False descarta DEBUG sin tocar el nivel global (útil cuando
+    varias consultas corren a la vez con distintos flags de debug).
+    """
+
+    def __init__(self, logger: logging.Logger, query_id: str, verbose: bool = True):
+        super().__init__(logger, {"query_id": query_id, "fase": "-", "intento": 0})
+        self.verbose = verbose
+
+    def process(self, msg, kwargs):
+        # El LoggerAdapter estándar pisa el extra del llamador; aquí lo combinamos
+        kwargs["extra"] = {**self.extra, **kwargs.get("extra", {})}
+        return msg, kwargs
+
+    def isEnabledFor(self, level):
+        if level < logging.INFO and not self.verbose:
+            return False
+        return self.logger.isEnabledFor(level)
+
+    def fase(self, nombre: str):
+        self.extra["fase"] = nombre
+
+    def intento(self, numero: int):
+        self.extra["intento"] = numero
+
+
+def logger_consulta(query_id: Optional[str] = None, debug: bool = True) -> LoggerConsulta:
+    """Crea el logger de una consulta. Si no se da query_id se genera uno correlativo."""
+    if query_id is None:
+        query_id = f"q{next(_ids)}"
+    return LoggerConsulta(logging.getLogger(LOGGER_NOMBRE), query_id, verbose=debug)
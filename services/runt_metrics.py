@@ -0,0 +1,90 @@
+# services/runt_metrics.py
+# ------------------------------------------------------------
+# Métricas en memoria del proceso: contadores y observaciones (tiempos).
+#
+# Sin dependencias externas: las vistas (GUI/consola) y los benchmarks leen
+# METRICAS.resumen() cuando lo necesitan. Seguro para varios hilos.
+# ------------------------------------------------------------
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Optional
+
+# Cuántas observaciones recientes guardamos por métrica para los percentiles
+VENTANA_OBSERVACIONES = 2048
+
+
+class Metricas:
+    def __init__(self, ventana: int = VENTANA_OBSERVACIONES):
+        self._lock = threading.Lock()
+        self._ventana = ventana
+        self._contadores: Dict[str, float] = defaultdict(float)
+        self._obs: Dict[str, Deque[float]] = {}
+        self._obs_total: Dict[str, int] = defaultdict(int)
+        self._obs_suma: Dict[str, float] = defaultdict(float)
+
+    def incrementar(self, nombre: str, n: float = 1):
+        with self._lock:
+            self._contadores[nombre] += n
+
+    def observar(self, nombre: str, valor: float):
+        with self._lock:
+            serie = self._obs.get(nombre)
+            if serie is None:
+                serie = self._obs[nombre] = deque(maxlen=self._ventana)
+            serie.append(valor)
+            self._obs_total[nombre] += 1
+            self._obs_suma[nombre] += valor
+
+    @contextmanager
+    def medir(self, nombre: str):
+        """Observa en 'nombre' los segundos que tarda el bloque."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(nombre, time.perf_counter() - inicio)
+
+    def contador(self, nombre: str) -> float:
+        with self._lock:
+            return self._contadores.get(nombre, 0)
+
+    def percentil(self, nombre: str, p: float) -> Optional[float]:
+        """Percentil p (0-100) sobre la ventana reciente; None si no hay datos."""
+        with self._lock:
+            serie = sorted(self._obs.get(nombre, ()))
+        if not serie:
+            return None
+        idx = min(len(serie) - 1, max(0, round(p / 100 * (len(serie) - 1))))
+        return serie[idx]
+
+    def resumen(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            nombres = list(self._obs)
+            resumen = {
+                "contadores": dict(self._contadores),
+                "observaciones": {},
+            }
+            totales = dict(self._obs_total)
+            sumas = dict(self._obs_suma)
+        for nombre in nombres:
+            total = totales[nombre]
+            resumen["observaciones"][nombre] = {
+                "n": total,
+                "media": sumas[nombre] / total if total else 0.0,
+                "p50": self.percentil(nombre, 50),
+                "p95": self.percentil(nombre, 95),
+            }
+        return resumen
+
+    def reiniciar(self):
+        with self._lock:
+            self._contadores.clear()
+            self._obs.clear()
+            self._obs_total.clear()
+            self._obs_suma.clear()
+
+
+# Instancia compartida por todo el proceso
+METRICAS = Metricas()
@@ -24,9 +24,27 @@
 from playwright.sync_api import sync_playwright, TimeoutError as PWTimeoutError
 # Buscar o validar patrones de texto (biblioteca estándar)
 import re
+# Huella (hash) de la imagen del captcha (estándar)
+import hashlib
 # Manejar rutas y archivos fácilmente (estándar)
 from pathlib import Path
 
+# Medir tiempos sin bloquear (estándar)
+import time
+# Abrir/cerrar navegador como bloque with (estándar)
+from contextlib import contextmanager
+
+# Logging estructurado (query_id / fase / intento) con escritura en segundo plano
+from services.runt_logging import logger_consulta
+# Métricas del proceso (tiempos por fase, contadores)
+from services.runt_metrics import METRICAS
+# Reproducción offline de sesiones grabadas (HAR)
+from services.har_replay import ReproductorHar
+# Motor de pasos con dependencias (solapa la espera del operador con la página)
+from services.flujo_pasos import GrafoFlujo, Paso
+# Límite de peticiones al portal compartido entre procesos del equipo
+from services.gobernador_tasa import obtener_gobernador
+
 # URL principal del módulo de consulta ciudadana del RUNT
 RUNT_URL = "https://portalpublico.runt.gov.co/#/consulta-ciudadano-documento/consulta/consulta-ciudadano-documento"
 
@@ -55,16 +73,81 @@ def pick_first_working_locator(page, locator_candidates, description="elemento")
     raise RuntimeError(f"No se encontró {description}. Ajusta los selectores según el HTML real.")
 
 
+# ------------------------------------------------------------
+# PAGE OBJECT: locators del formulario resueltos una sola vez
+# ------------------------------------------------------------
+class FormularioRunt:
+    """
+    Cachea, por página cargada, el locator que funcionó para cada elemento
+    del formulario (combo, número, imagen e input del captcha, botón).
+
+    En los reintentos de captcha ya no se recorre la lista de candidatos con
+    sus esperas de visibilidad: basta verificar que el elemento resuelto
+    sigue conectado al DOM. Sólo si Angular lo reemplazó se vuelve a buscar.
+    Crear uno nuevo tras cada page.goto().
+
+    También recuerda la huella del último captcha capturado (el que se le
+    entregó al resolver), para no volver a entregarlo tras un rechazo ni
+    enviar una respuesta si el portal ya lo reemplazó.
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self._cache = {}  # nombre -> (locator, element_handle)
+        self.huella_captcha = None  # huella del captcha entregado al resolver
+        self.src_captcha = None     # su atributo src (para esperar uno distinto)
+
+    def localizar(self, nombre: str, candidatos, descripcion: str):
+        cacheado = self._cache.get(nombre)
+        if cacheado is not None:
+            loc, handle = cacheado
+            try:
+                if handle.evaluate("e => e.isConnected"):
+                    METRICAS.incrementar("formulario.cache.aciertos")
+                    return loc
+            except Exception:
+                pass  # el handle murió con el DOM anterior
+            self.invalidar(nombre)
+            METRICAS.incrementar("formulario.cache.invalidaciones")
+
+        loc = pick_first_working_locator(self.page, candidatos, descripcion)
+        try:
+            handle = loc.element_handle(timeout=2000)
+        except Exception:
+            # Sin handle no podemos verificar, así que no cacheamos
+            return loc
+        self._cache[nombre] = (loc, handle)
+        return loc
+
+    def invalidar(self, nombre=None):
+        """Olvida un elemento (o todos, si nombre es None)."""
+        nombres = [nombre] if nombre is not None else list(self._cache)
+        for n in nombres:
+            cacheado = self._cache.pop(n, None)
+            if cacheado is not None:
+                try:
+                    cacheado[1].dispose()
+                except Exception:
+                    pass
+
+
+def _localizar(page, formulario, nombre, candidatos, descripcion):
+    # Con page object reutilizamos; sin él, búsqueda completa como siempre
+    if formulario is not None:
+        return formulario.localizar(nombre, candidatos, descripcion)
+    return pick_first_working_locator(page, candidatos, descripcion)
+
+
 # ------------------------------------------------------------
 # FUNCIÓN 2: seleccionar tipo de documento
 # ------------------------------------------------------------
-def select_tipo_documento(page, codigo: str, debug: bool = True):
+def select_tipo_documento(page, codigo: str, debug: bool = True, log=None, formulario=None):
     """
     Selecciona el tipo de documento en el mat-select de la página.
     La vista nos pasa un código corto (CC, CE, TI, PPT, etc.)
     y aquí lo mapeamos al texto visible real del mat-option.
     """
-    import re
+    log = log or logger_consulta(debug=debug)
 
     # Mapa de códigos -> texto visible EXACTO en el combo
     mapa_tipos = {
@@ -93,24 +176,21 @@ def select_tipo_documento(page, codigo: str, debug: bool = True):
         lambda p: p.get_by_role("combobox", name=re.compile(r"Tipo\s*de\s*Documento", re.I)),
         lambda p: p.get_by_label(re.compile(r"Tipo\s*de\s*Documento", re.I)),
     ]
-    select_loc = pick_first_working_locator(page, select_candidates, "combo de 'Tipo de documento'")
+    select_loc = _localizar(page, formulario, "tipo", select_candidates, "combo de 'Tipo de documento'")
 
     # 2) Abre el combo
-    if debug:
-        print(f"🖱️ Abriendo el combo de tipo de documento (código={codigo})…")
+    log.debug("🖱️ Abriendo el combo de tipo de documento (código=%s)…", codigo)
     select_loc.click()
 
     # 3) Espera el overlay
     try:
         page.wait_for_selector(".cdk-overlay-container .mat-select-panel", timeout=8000)
     except Exception:
-        if debug:
-            print("⚠ No apareció el panel del combo. Reintentando clic…")
+        log.warning("⚠ No apareció el panel del combo. Reintentando clic…")
         select_loc.click()
         page.wait_for_selector(".cdk-overlay-container .mat-select-panel", timeout=8000)
 
-    if debug:
-        print(f"📜 Buscando opción para código '{codigo}' → '{visible}'")
+    log.debug("📜 Buscando opción para código '%s' → '%s'", codigo, visible)
 
     # 4) Opciones dentro del overlay
     opciones_texto = page.locator(".cdk-overlay-container .mat-option-text")
@@ -118,14 +198,12 @@ def select_tipo_documento(page, codigo: str, debug: bool = True):
     # 5) Click en la opción cuyo texto coincida
     try:
         opciones_texto.filter(has_text=patron).first.click(timeout=8000)
-        if debug:
-            print(f"✅ Opción '{visible}' seleccionada para código '{codigo}'.")
+        log.debug("✅ Opción '%s' seleccionada para código '%s'.", visible, codigo)
     except Exception as e:
         # Fallback por rol
         try:
             page.get_by_role("option", name=patron).first.click(timeout=8000)
-            if debug:
-                print(f"✅ Opción '{visible}' seleccionada (fallback role=option).")
+            log.debug("✅ Opción '%s' seleccionada (fallback role=option).", visible)
         except Exception as e2:
             raise RuntimeError(
                 f"No se pudo seleccionar el tipo de documento '{codigo}' ('{visible}'). "
@@ -134,13 +212,13 @@ def select_tipo_documento(page, codigo: str, debug: bool = True):
 
 
 
-def fill_numero_documento(page, numero: str, debug: bool = True):
+def fill_numero_documento(page, numero: str, debug: bool = True, log=None, formulario=None):
     """
     Llena el número de documento en el input correspondiente.
     Ajusta los selectores si la página cambia.
     """
-    if debug:
-        print("⌨️ Buscando campo de número de documento…")
+    log = log or logger_consulta(debug=debug)
+    log.debug("⌨️ Buscando campo de número de documento…")
 
     input_candidates = [
         # 1) Lo que vemos en el HTML real
@@ -156,27 +234,26 @@ def fill_numero_documento(page, numero: str, debug: bool = True):
         lambda p: p.get_by_role("textbox").nth(1),
     ]
 
-    input_loc = pick_first_working_locator(page, input_candidates, "campo 'Número de documento'")
+    input_loc = _localizar(page, formulario, "numero", input_candidates, "campo 'Número de documento'")
     input_loc.fill(numero)
-    if debug:
-        print(f"✅ Número de documento '{numero}' llenado.")
+    log.debug("✅ Número de documento '%s' llenado.", numero)
 
 
-def dismiss_autocomplete_popup(page, debug: bool = True):
+def dismiss_autocomplete_popup(page, debug: bool = True, log=None):
     """
     Intenta cerrar el popup rosado de 'Hemos mejorado Autocompletar'
     si está presente, para que no estorbe al captcha ni a otros elementos.
 
     Si no se encuentra nada, simplemente sigue sin lanzar error.
     """
+    log = log or logger_consulta(debug=debug)
     try:
         # Buscamos el texto principal del popup
         popup = page.get_by_text(re.compile(r"Hemos mejorado\s+Autocompletar", re.I))
         # Si no está visible, no hacemos nada
         popup.wait_for(state="visible", timeout=3000)
 
-        if debug:
-            print("🩷 Popup de 'Autocompletar' detectado. Intentando cerrarlo…")
+        log.debug("🩷 Popup de 'Autocompletar' detectado. Intentando cerrarlo…")
 
         # Intentamos primero el botón de cerrar (la X)
         close_candidates = [
@@ -198,87 +275,207 @@ def dismiss_autocomplete_popup(page, debug: bool = True):
 
         if btn_close is not None:
             btn_close.click()
-            if debug:
-                print("✅ Popup de 'Autocompletar' cerrado.")
+            log.debug("✅ Popup de 'Autocompletar' cerrado.")
             page.wait_for_timeout(300)  # pequeño respiro
         else:
-            if debug:
-                print("ℹ No se encontró botón claro para cerrar el popup, se continúa.")
+            log.debug("ℹ No se encontró botón claro para cerrar el popup, se continúa.")
 
     except PWTimeoutError:
         # No apareció el popup; todo bien
-        if debug:
-            print("ℹ No se detectó popup de 'Autocompletar'.")
+        log.debug("ℹ No se detectó popup de 'Autocompletar'.")
     except Exception as e:
-        if debug:
-            print(f"⚠ Error intentando cerrar popup de autocompletar: {e}")
+        log.warning("⚠ Error intentando cerrar popup de autocompletar: %s", e)
+
+
+# Selectores de la imagen del captcha, ajustados a la estructura que vimos
+CAPTCHA_IMG_CANDIDATOS = [
+    "div.divCaptcha img",
+    "img[alt*='captcha' i]",
+    "img[title*='captcha' i]",
+    "img[src^='data:image'][src*='captcha']",
+    lambda p: p.get_by_role("img", name=re.compile(r"captcha", re.I)),
+]
+
+
+# True cuando la imagen ya no es la de 'viejo': Angular la reemplazó (el
+# nodo se desconectó) o cambió su src y la nueva terminó de cargar.
+_JS_CAPTCHA_NUEVO = """
+([img, viejo]) => !img.isConnected ||
+    ((img.currentSrc || img.src || "") !== viejo && img.complete && img.naturalWidth > 0)
+"""
 
 
-def try_capture_and_solve_captcha(page, resolver_captcha=None, debug: bool = True, timeout_ms: int = 45000):
+def huella_captcha(page, formulario=None, imagen: bytes = None, timeout_ms: int = 45000):
     """
-    - Busca la imagen del CAPTCHA.
-    - La captura en bytes (screenshot).
-    - Si se proporciona resolver_captcha(image_bytes) -> texto,
-      llama a esa función (GUI o consola).
-    - Si no se pasa resolver_captcha, por compatibilidad guarda
-      captcha.png y pide input().
+    Devuelve (huella, src) de la imagen de captcha que está en pantalla.
+    Si el src es un data: URI (trae la imagen adentro) la huella es su hash,
+    sin tomar screenshot; si no, es el hash del screenshot ('imagen' si ya
+    se tomó).
     """
+    captcha_img = _localizar(page, formulario, "captcha_img", CAPTCHA_IMG_CANDIDATOS, "imagen de CAPTCHA")
+    src = captcha_img.evaluate("e => e.currentSrc || e.src || ''")
+    if src.startswith("data:"):
+        return "src:" + hashlib.sha1(src.encode("utf-8")).hexdigest(), src
+    if imagen is None:
+        imagen = captcha_img.screenshot(timeout=timeout_ms)
+    return "png:" + hashlib.sha1(imagen).hexdigest(), src
 
-    if debug:
-        print("🧩 Buscando imagen de CAPTCHA…")
 
-    # Selectores ajustados a la estructura que vimos
-    captcha_img_candidates = [
-        "div.divCaptcha img",
-        "img[alt*='captcha' i]",
-        "img[title*='captcha' i]",
-        "img[src^='data:image'][src*='captcha']",
-        lambda p: p.get_by_role("img", name=re.compile(r"captcha", re.I)),
-    ]
+def esperar_captcha_nuevo(page, formulario, timeout_ms: int = 8000, debug: bool = True, log=None) -> bool:
+    """
+    Espera (por evento, sin sleeps fijos) a que la imagen del captcha deje de
+    ser la que se capturó la última vez. Devuelve False si no cambió a tiempo.
+    """
+    log = log or logger_consulta(debug=debug)
+    if formulario is None or formulario.huella_captcha is None:
+        # Sin huella previa no hay con qué comparar: comportamiento original
+        page.wait_for_timeout(800)
+        return True
 
-    captcha_img = pick_first_working_locator(page, captcha_img_candidates, "imagen de CAPTCHA")
+    inicio = time.perf_counter()
+    nuevo = False
+    captcha_img = _localizar(page, formulario, "captcha_img", CAPTCHA_IMG_CANDIDATOS, "imagen de CAPTCHA")
+    try:
+        if formulario.huella_captcha.startswith("src:"):
+            handle = captcha_img.element_handle(timeout=2000)
+            page.wait_for_function(_JS_CAPTCHA_NUEVO, arg=[handle, formulario.src_captcha], timeout=timeout_ms)
+            nuevo = True
+        else:
+            # src fijo (la URL no cambia): sólo el contenido lo delata
+            limite = inicio + timeout_ms / 1000
+            while time.perf_counter() < limite:
+                if huella_captcha(page, formulario)[0] != formulario.huella_captcha:
+                    nuevo = True
+                    break
+                page.wait_for_timeout(200)
+    except PWTimeoutError:
+        pass
+
+    METRICAS.observar("captcha.espera_regeneracion", time.perf_counter() - inicio)
+    if nuevo:
+        log.debug("🆕 Captcha nuevo listo en %.2fs.", time.perf_counter() - inicio)
+    else:
+        log.warning("⚠ El captcha no cambió en %d ms.", timeout_ms)
+    return nuevo
+
+
+def captcha_vigente(page, formulario, debug: bool = True, log=None) -> bool:
+    """
+    ¿El captcha en pantalla sigue siendo el que se le entregó al resolver?
+    Se verifica justo antes de enviar: si el portal lo reemplazó mientras el
+    operador escribía, la respuesta ya no sirve y no se debe enviar.
+    """
+    if formulario is None or formulario.huella_captcha is None:
+        return True
+    try:
+        huella, _src = huella_captcha(page, formulario)
+    except Exception:
+        return True  # si no podemos verificar, dejamos que el portal decida
+    return huella == formulario.huella_captcha
+
+
+def capturar_captcha(page, debug: bool = True, timeout_ms: int = 45000, log=None, formulario=None) -> bytes:
+    """
+    Busca la imagen del CAPTCHA y la devuelve como bytes (screenshot).
+
+    Con 'formulario' se toma la huella de la imagen: si todavía es la misma
+    que se entregó antes (el portal aún no la regeneró tras un rechazo), se
+    espera a la nueva en vez de pedirle al operador que resuelva la vieja.
+    """
+    log = log or logger_consulta(debug=debug)
+    log.debug("🧩 Buscando imagen de CAPTCHA…")
+
+    captcha_img = _localizar(page, formulario, "captcha_img", CAPTCHA_IMG_CANDIDATOS, "imagen de CAPTCHA")
 
     # Intentamos capturar el screenshot con timeout controlado
     try:
-        image_bytes = captcha_img.screenshot(timeout=timeout_ms)  # bytes en memoria
+        imagen = captcha_img.screenshot(timeout=timeout_ms)  # bytes en memoria
     except PWTimeoutError:
         # Aquí puedes decidir reintentar o fallar duro. Por ahora, fallamos con mensaje claro.
         raise RuntimeError(
             "No se pudo capturar la imagen del CAPTCHA a tiempo. "
             "La página puede estar lenta o el componente cambió."
         )
+    if formulario is None:
+        return imagen
+
+    huella, src = huella_captcha(page, formulario, imagen=imagen, timeout_ms=timeout_ms)
+    if huella == formulario.huella_captcha:
+        METRICAS.incrementar("captcha.capturas_obsoletas")
+        log.info("🕰 La imagen del CAPTCHA aún es la anterior; esperando la nueva…")
+        if not esperar_captcha_nuevo(page, formulario, log=log):
+            raise RuntimeError("El portal no generó un CAPTCHA nuevo; no se entrega la imagen vieja.")
+        return capturar_captcha(page, timeout_ms=timeout_ms, log=log, formulario=formulario)
+
+    formulario.huella_captcha, formulario.src_captcha = huella, src
+    return imagen
 
-    # -------- Resolver el texto del captcha --------
+
+def resolver_texto_captcha(image_bytes: bytes, resolver_captcha=None, debug: bool = True, log=None) -> str:
+    """
+    Obtiene el texto del captcha. No toca la página, así que se puede
+    ejecutar en otro hilo mientras se llena el formulario.
+    - Si se proporciona resolver_captcha(image_bytes) -> texto,
+      llama a esa función (GUI o consola).
+    - Si no se pasa resolver_captcha, por compatibilidad guarda
+      captcha.png y pide input().
+    """
+    log = log or logger_consulta(debug=debug)
     if resolver_captcha is not None:
         captcha_text = resolver_captcha(image_bytes)
     else:
         # Modo “legacy” consola: guardar PNG y pedir input aquí mismo
         tmp_path = Path("captcha.png").absolute()
         tmp_path.write_bytes(image_bytes)
-        if debug:
-            print(f"🖼 CAPTCHA guardado en: {tmp_path}")
+        log.info("🖼 CAPTCHA guardado en: %s", tmp_path)
         captcha_text = input("👉 Texto del CAPTCHA: ").strip()
 
-    if debug:
-        print(f"🔐 CAPTCHA ingresado: '{captcha_text}'")
+    log.debug("🔐 CAPTCHA ingresado: '%s'", captcha_text)
+    return captcha_text
+
 
-    # -------- Escribir el captcha en el input correspondiente --------
+def escribir_captcha(page, captcha_text: str, debug: bool = True, log=None, formulario=None):
+    """
+    Escribe el texto del captcha en el input correspondiente.
+    """
     captcha_input_candidates = [
         "input[formcontrolname='captcha']",
         "input[name='captcha']",
         lambda p: p.get_by_placeholder(re.compile(r"Digite.*caracteres", re.I)),
         lambda p: p.get_by_label(re.compile(r"captcha", re.I)),
     ]
-    captcha_input = pick_first_working_locator(page, captcha_input_candidates, "campo de texto del CAPTCHA")
+    captcha_input = _localizar(
+        page, formulario, "captcha_input", captcha_input_candidates, "campo de texto del CAPTCHA"
+    )
     captcha_input.fill(captcha_text)
 
 
-def check_and_handle_captcha_error(page, debug: bool = True) -> bool:
+def try_capture_and_solve_captcha(
+    page,
+    resolver_captcha=None,
+    debug: bool = True,
+    timeout_ms: int = 45000,
+    log=None,
+    formulario=None,
+):
+    """
+    Captura el captcha, obtiene el texto y lo escribe, en secuencia.
+    (run_runt_flow usa los tres pasos por separado dentro del grafo.)
+    """
+    log = log or logger_consulta(debug=debug)
+    image_bytes = capturar_captcha(page, timeout_ms=timeout_ms, log=log, formulario=formulario)
+    captcha_text = resolver_texto_captcha(image_bytes, resolver_captcha, log=log)
+    escribir_captcha(page, captcha_text, log=log, formulario=formulario)
+
+
+def check_and_handle_captcha_error(page, debug: bool = True, log=None, formulario=None) -> bool:
     """
     Detecta el popup de SweetAlert2 con el mensaje 'El captcha no es valido.'
     y, si existe, hace clic en el botón 'Aceptar'.
     Devuelve True si encontró y manejó el error, False si no había error de captcha.
+    Con 'formulario', en vez de una pausa fija espera a que aparezca un captcha nuevo.
     """
+    log = log or logger_consulta(debug=debug)
 
     # Popup principal de SweetAlert2
     popup = page.locator("div.swal2-popup")
@@ -296,38 +493,33 @@ def check_and_handle_captcha_error(page, debug: bool = True) -> bool:
     except Exception:
         popup_text = ""
 
-    if debug:
-        print(f"🪧 Texto del popup SweetAlert2: {popup_text!r}")
+    log.debug("🪧 Texto del popup SweetAlert2: %r", popup_text)
 
     # ¿Es el popup específico del captcha?
     if not re.search(r"El\s+captcha\s+no\s+es\s+v[aá]lido", popup_text, re.I):
         # Es otro mensaje cualquiera, no de captcha
         return False
 
-    if debug:
-        print("❌ CAPTCHA incorrecto: popup 'El captcha no es valido.' detectado.")
+    log.info("❌ CAPTCHA incorrecto: popup 'El captcha no es valido.' detectado.")
 
     # Intentar hacer clic en el botón Aceptar
     try:
         # Según tu HTML: <button class="swal2-confirm swal2-styled">Aceptar</button>
         popup.locator("button.swal2-confirm").click()
-        if debug:
-            print("🧹 Botón 'Aceptar' (swal2-confirm) clickeado.")
+        log.debug("🧹 Botón 'Aceptar' (swal2-confirm) clickeado.")
     except Exception:
         # Fallback: buscar cualquier botón con texto Aceptar
         try:
             page.get_by_role("button", name=re.compile(r"Aceptar", re.I)).first.click()
-            if debug:
-                print("🧹 Botón 'Aceptar' clickeado (fallback get_by_role).")
+            log.debug("🧹 Botón 'Aceptar' clickeado (fallback get_by_role).")
         except Exception:
-            if debug:
-                print("⚠ No se pudo hacer clic automáticamente en 'Aceptar'.")
+            log.warning("⚠ No se pudo hacer clic automáticamente en 'Aceptar'.")
 
     # Dejar que se cierre el popup y se regenere el captcha
-    page.wait_for_timeout(800)
+    esperar_captcha_nuevo(page, formulario, log=log)
     return True
 
-def check_and_handle_person_not_found(page, debug: bool = True) -> bool:
+def check_and_handle_person_not_found(page, debug: bool = True, log=None) -> bool:
     """
     Detecta el popup de SweetAlert2 con el mensaje
     'No se ha encontrado la persona en estado ACTIVA o SIN REGISTRO'
@@ -336,6 +528,7 @@ def check_and_handle_person_not_found(page, debug: bool = True) -> bool:
     Devuelve True si encontró y manejó ese caso (documento inexistente / sin registro),
     False si no apareció ese mensaje.
     """
+    log = log or logger_consulta(debug=debug)
 
     # Popup principal de SweetAlert2
     popup = page.locator("div.swal2-popup")
@@ -353,11 +546,9 @@ def check_and_handle_person_not_found(page, debug: bool = True) -> bool:
     except Exception:
         popup_text = ""
 
-    if debug:
-        print(f"🪧 Texto del popup SweetAlert2: {popup_text!r}")
+    log.debug("🪧 Texto del popup SweetAlert2: %r", popup_text)
 
     # ¿Es el popup específico de persona no encontrada?
-    import re
     patron_no_encontrada = re.compile(
         r"No\s+se\s+ha\s+encontrado\s+la\s+persona\s+en\s+estado\s+ACTIVA\s+o\s+SIN\s+REGISTRO",
         re.I,
@@ -367,34 +558,30 @@ def check_and_handle_person_not_found(page, debug: bool = True) -> bool:
         # Es otro mensaje diferente → no lo tratamos aquí
         return False
 
-    if debug:
-        print("ℹ️ RUNT indica: 'No se ha encontrado la persona en estado ACTIVA o SIN REGISTRO'.")
+    log.info("ℹ️ RUNT indica: 'No se ha encontrado la persona en estado ACTIVA o SIN REGISTRO'.")
 
     # Intentar hacer clic en el botón Aceptar
     try:
         popup.locator("button.swal2-confirm").click()
-        if debug:
-            print("🧹 Botón 'Aceptar' (swal2-confirm) clickeado para cerrar el popup de 'sin registro'.")
+        log.debug("🧹 Botón 'Aceptar' (swal2-confirm) clickeado para cerrar el popup de 'sin registro'.")
     except Exception:
         try:
             page.get_by_role("button", name=re.compile(r"Aceptar", re.I)).first.click()
-            if debug:
-                print("🧹 Botón 'Aceptar' clickeado (fallback get_by_role).")
+            log.debug("🧹 Botón 'Aceptar' clickeado (fallback get_by_role).")
         except Exception:
-            if debug:
-                print("⚠ No se pudo hacer clic automáticamente en 'Aceptar' (sin registro).")
+            log.warning("⚠ No se pudo hacer clic automáticamente en 'Aceptar' (sin registro).")
 
     page.wait_for_timeout(800)
     return True
 
 
 
-def click_consultar(page, debug: bool = True):
+def click_consultar(page, debug: bool = True, log=None, formulario=None):
     """
     Hace clic en el botón 'Consultar' o similar para enviar el formulario.
     """
-    if debug:
-        print("🔘 Buscando botón 'Consultar'…")
+    log = log or logger_consulta(debug=debug)
+    log.debug("🔘 Buscando botón 'Consultar'…")
 
     button_candidates = [
         "button[type='submit']",
@@ -402,11 +589,180 @@ def click_consultar(page, debug: bool = True):
         lambda p: p.get_by_role("button", name=re.compile(r"consultar", re.I)),
     ]
 
-    btn = pick_first_working_locator(page, button_candidates, "botón 'Consultar'")
+    btn = _localizar(page, formulario, "consultar", button_candidates, "botón 'Consultar'")
     btn.click()
-    if debug:
-        print("✅ Clic en botón 'Consultar' enviado.")
+    log.debug("✅ Clic en botón 'Consultar' enviado.")
+
+
+
+# Pasos del grafo que sólo hay que hacer una vez por carga de página
+PASOS_FORMULARIO = ("seleccionar_tipo", "llenar_numero", "cerrar_popup")
+
+# Envíos de captcha por consulta (por si algo sale mal y no detectamos bien el error)
+LIMITE_INTENTOS_CAPTCHA = 20
+# Respuestas descartadas sin enviar porque el portal ya había cambiado el captcha
+LIMITE_CAPTCHAS_DESCARTADOS = 10
+
+
+class PreparacionInterrumpida(Exception):
+    """preparar_formulario() se detuvo entre etapas porque llegó trabajo real."""
+
+
+def preparar_formulario(
+    page,
+    tipo=None,
+    url: str = RUNT_URL,
+    debug: bool = True,
+    log=None,
+    timeout_ms: int = 60000,
+    espera_red_ms: int = 10000,
+    interrumpir=None,
+):
+    """
+    Deja una página lista para digitar: navegada al portal, popup de
+    Autocompletar cerrado, 'tipo' seleccionado (si se pasa) y captcha visible.
+    Devuelve el FormularioRunt con los locators ya resueltos.
+    (Lo usa services/reserva_paginas.py para tener páginas listas de antemano.)
+
+    interrumpir: función sin argumentos que se consulta entre etapas; si
+    devuelve True se lanza PreparacionInterrumpida (la página queda a medias).
+    """
+    log = log or logger_consulta(debug=debug)
+
+    def seguir(etapa: str):
+        if interrumpir is not None and interrumpir():
+            raise PreparacionInterrumpida(f"interrumpida tras '{etapa}'")
+
+    page.goto(url, timeout=timeout_ms)
+    seguir("navegacion")
+    try:
+        page.wait_for_load_state("networkidle", timeout=espera_red_ms)
+    except PWTimeoutError:
+        pass
+    seguir("carga")
+
+    formulario = FormularioRunt(page)
+    dismiss_autocomplete_popup(page, log=log)
+    seguir("popup")
+    if tipo:
+        select_tipo_documento(page, tipo, log=log, formulario=formulario)
+        seguir("tipo")
+    _localizar(page, formulario, "captcha_img", CAPTCHA_IMG_CANDIDATOS, "imagen de CAPTCHA")
+    return formulario
+
+
+def _resolver_de_fondo(resolver_captcha) -> bool:
+    """
+    Sólo los resolvers que se pueden cancelar (p. ej. ResolverBandeja) corren
+    en un hilo de fondo. Uno interactivo (input() de la consola, o el modo
+    legacy sin resolver) se queda en el hilo que llamó: leer la terminal desde
+    otro hilo deja el prompt colgado si el flujo falla.
+    """
+    return callable(getattr(resolver_captcha, "cancelar", None))
+
+
+def construir_grafo_consulta(page, tipo: str, numero: str, resolver_captcha=None, log=None, formulario=None):
+    """
+    Arma el grafo de la consulta por documento sobre una página ya cargada.
 
+    Primero se selecciona el tipo, se llena el número y se cierra el popup de
+    Autocompletar (tapa el captcha si sigue abierto). Luego se captura el
+    captcha y se entrega al operador; con un resolver de fondo (ver
+    _resolver_de_fondo) la espera corre en otro hilo y el motor puede
+    cancelarla. Escribir el captcha espera a la respuesta.
+    El envío (Consultar) queda fuera: lo maneja el bucle de reintentos.
+
+    Para reintentar sólo el captcha: grafo.ejecutar(hechos=PASOS_FORMULARIO).
+
+    Si un paso de página falla mientras el operador tiene el captcha, se llama
+    a resolver_captcha.cancelar() (si el resolver lo tiene, como el de
+    BandejaCaptcha): el captcha no se queda huérfano en la bandeja.
+    """
+    return GrafoFlujo([
+        Paso("seleccionar_tipo", lambda r: select_tipo_documento(page, tipo, log=log, formulario=formulario)),
+        Paso(
+            "llenar_numero",
+            lambda r: fill_numero_documento(page, numero, log=log, formulario=formulario),
+            depende_de=("seleccionar_tipo",),
+        ),
+        Paso("cerrar_popup", lambda r: dismiss_autocomplete_popup(page, log=log), depende_de=("llenar_numero",)),
+        Paso(
+            "capturar_captcha",
+            lambda r: capturar_captcha(page, log=log, formulario=formulario),
+            depende_de=("cerrar_popup",),
+        ),
+        Paso(
+            "resolver_captcha",
+            lambda r: resolver_texto_captcha(r["capturar_captcha"], resolver_captcha, log=log),
+            depende_de=("capturar_captcha",),
+            en_pagina=not _resolver_de_fondo(resolver_captcha),
+            cancelar=getattr(resolver_captcha, "cancelar", None),
+        ),
+        Paso(
+            "escribir_captcha",
+            lambda r: escribir_captcha(page, r["resolver_captcha"], log=log, formulario=formulario),
+            depende_de=("resolver_captcha",),
+        ),
+    ])
+
+
+class _CronometroFases:
+    """
+    Marca la fase actual en el logger y acumula cuánto dura cada una
+    (en el dict 'tiempos' del llamador y en METRICAS como flujo.fase.<nombre>).
+    """
+
+    def __init__(self, log, tiempos=None):
+        self.log = log
+        self.tiempos = tiempos if tiempos is not None else {}
+        self._fase = None
+        self._inicio = 0.0
+
+    def fase(self, nombre: str):
+        self.terminar()
+        self._fase = nombre
+        self._inicio = time.perf_counter()
+        self.log.fase(nombre)
+
+    def terminar(self):
+        if self._fase is None:
+            return
+        duracion = time.perf_counter() - self._inicio
+        self.tiempos[self._fase] = self.tiempos.get(self._fase, 0.0) + duracion
+        METRICAS.observar(f"flujo.fase.{self._fase}", duracion)
+        self._fase = None
+
+
+@contextmanager
+def _abrir_pagina(gestor, headless, slow_mo, har_grabar=None, har_reproducir=None, latencia_ms=0, existente=None):
+    """
+    Entrega la página para una consulta:
+      - con gestor (services/gestor_navegador.py): página nueva en el navegador
+        reutilizado (o 'existente', una preparada de la reserva); el gestor
+        decide si reciclarlo al terminar.
+      - sin gestor: navegador propio que se cierra al salir (comportamiento original).
+    """
+    if gestor is not None:
+        if har_grabar or har_reproducir:
+            raise ValueError("La grabación/reproducción HAR necesita un navegador propio (sin gestor).")
+        with gestor.pagina(existente) as page:
+            yield page
+        return
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=headless, slow_mo=slow_mo)
+        if har_grabar:
+            context = browser.new_context(record_har_path=har_grabar, record_har_content="embed")
+        else:
+            context = browser.new_context()
+        if har_reproducir:
+            ReproductorHar(har_reproducir, latencia_ms=latencia_ms).instalar(context)
+        try:
+            yield context.new_page()
+        finally:
+            # Cerrar el contexto primero: ahí es cuando Playwright escribe el HAR
+            context.close()
+            browser.close()
 
 
 # ------------------------------------------------------------
@@ -420,6 +776,17 @@ def run_runt_flow(
     resolver_captcha=None,
     debug: bool = True,
     hold_after: bool = False,
+    query_id=None,
+    url: str = RUNT_URL,
+    tiempos=None,
+    har_grabar=None,
+    har_reproducir=None,
+    latencia_ms: int = 0,
+    gobernador=None,
+    gestor=None,
+    prioridad: int = 1,
+    reserva=None,
+    html_resultado=None,
 ):
     """
     Ejecuta todo el flujo:
@@ -431,99 +798,168 @@ def run_runt_flow(
       - Envía formulario
       - Detecta si no hay registro
       - (Más adelante) lee el panel de resultados
-    """
-    import re
-
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=headless, slow_mo=slow_mo)
-        context = browser.new_context()
-        page = context.new_page()
 
-        if debug:
-            print("🌐 Abriendo portal del RUNT…")
-        page.goto(RUNT_URL, timeout=60000)
+    Los mensajes salen por el logger 'turn_dispenser' (ver services/runt_logging.py)
+    con el query_id dado o uno generado.
+
+    Si se pasa un dict en 'tiempos', se llena con los segundos de cada fase
+    (navegacion, formulario, captcha, resultado). Si se pasa un dict en
+    'html_resultado', queda en html_resultado["html"] el HTML de la página de
+    resultado (RuntController lo guarda en el almacén de blobs).
+
+    Grabación / reproducción offline:
+      - har_grabar="sesion.har": guarda todo el tráfico de la sesión real.
+      - har_reproducir="sesion.har": sirve la página SOLO desde el archivo
+        (latencia_ms simula la red). Ver services/har_replay.py.
+
+    Antes de cada navegación y cada envío se pide turno al gobernador de tasa
+    del equipo (services/gobernador_tasa.py), para que todas las consolas,
+    GUIs y barridos juntos no superen lo que tolera el portal; 'prioridad'
+    (0 = interactiva) adelanta el turno frente a los barridos. En modo
+    reproducción no se usa: no hay portal real.
+
+    Con 'gestor' (GestorNavegador) se reutiliza un navegador vivo en vez de
+    abrir uno por consulta. Con 'reserva' (ReservaPaginas del mismo gestor)
+    se arranca en una página ya navegada y preparada, si hay una vigente:
+    se salta la navegación, el popup y, si coincide, el tipo de documento.
+    """
+    log = logger_consulta(query_id, debug=debug)
+    crono = _CronometroFases(log, tiempos)
+    if gobernador is None and not har_reproducir:
+        gobernador = obtener_gobernador()
+
+    def pedir_turno(motivo: str):
+        if gobernador is None:
+            return
+        espera = gobernador.adquirir(motivo, prioridad=prioridad)
+        if espera > 0.05:
+            log.debug("🚦 Esperamos %.2fs al gobernador de tasa (%s).", espera, motivo)
+
+    preparada = None
+    if reserva is not None and gestor is not None:
+        preparada = reserva.tomar(tipo, url)
+
+    with _abrir_pagina(
+        gestor, headless, slow_mo, har_grabar, har_reproducir, latencia_ms,
+        existente=preparada.page if preparada is not None else None,
+    ) as page:
+        if preparada is None:
+            crono.fase("navegacion")
+            log.info("🌐 Abriendo portal del RUNT…")
+            pedir_turno("navegacion")
+            page.goto(url, timeout=60000)
 
-        try:
-            page.wait_for_load_state("networkidle", timeout=10000)
-        except PWTimeoutError:
-            pass
+            try:
+                page.wait_for_load_state("networkidle", timeout=10000)
+            except PWTimeoutError:
+                pass
 
-        # ----------------------------- 
-        # Llenar tipo + número
-        # -----------------------------
-        if debug:
-            print(f"📝 Seleccionando tipo='{tipo}' y llenando número='{numero}'…")
-        select_tipo_documento(page, tipo, debug=debug)
-        fill_numero_documento(page, numero, debug=debug)
+            # Los locators del formulario se resuelven una vez por carga de página
+            formulario = FormularioRunt(page)
+            hechos = ()
+        else:
+            log.info(
+                "📦 Usando página preparada hace %.0fs (tipo %s).",
+                time.monotonic() - preparada.preparada_en, preparada.tipo,
+            )
+            formulario = preparada.formulario
+            hechos = ("cerrar_popup",)
+            if preparada.tipo == tipo.upper().strip():
+                hechos += ("seleccionar_tipo",)
+
+        # -----------------------------------------------------------
+        # Llenar tipo + número + primer captcha (grafo: construir_grafo_consulta)
+        # -----------------------------------------------------------
+        grafo = construir_grafo_consulta(
+            page, tipo, numero, resolver_captcha=resolver_captcha, log=log, formulario=formulario
+        )
 
-        # Intentar cerrar el popup rosado de “Hemos mejorado Autocompletar”
-        dismiss_autocomplete_popup(page, debug=debug)
+        crono.fase("formulario")
+        log.debug("📝 Seleccionando tipo='%s' y llenando número='%s'…", tipo, numero)
+        grafo.ejecutar(hechos=hechos, tiempos=crono.tiempos, log=log)
 
         # ----------------------------------------------------
         # BUCLE DE CAPTCHA: seguimos hasta que NO haya error
         # ----------------------------------------------------
-        intentos = 0
-        LIMITE_SEGURIDAD = 20  # por si algo sale mal y no detectamos bien el error
+        intentos = 0     # respuestas enviadas al portal
+        descartados = 0  # respuestas que no se enviaron: el captcha ya había cambiado
+        recapturar = False  # el captcha del primer intento ya quedó escrito por el grafo
+        crono.fase("captcha")
 
         while True:
-            intentos += 1
-            if debug:
-                print(f"🔁 Intento de CAPTCHA #{intentos}…")
+            log.intento(intentos + 1)
 
-            if intentos > LIMITE_SEGURIDAD:
-                browser.close()
+            if intentos >= LIMITE_INTENTOS_CAPTCHA:
+                crono.terminar()
                 raise RuntimeError(
                     "Se superó el límite de intentos de CAPTCHA (seguridad). "
                     "Revisa si cambió el mensaje de error en el sitio."
                 )
 
             # 1) Capturamos y resolvemos el captcha actual
-            try_capture_and_solve_captcha(
-                page,
-                resolver_captcha=resolver_captcha,
-                debug=debug
-            )
+            if recapturar:
+                grafo.ejecutar(hechos=PASOS_FORMULARIO, tiempos=crono.tiempos, log=log)
+            recapturar = True
+
+            # 2) Nunca enviamos la respuesta de un captcha que el portal ya reemplazó.
+            #    No cuenta como intento (no se envió), pero tiene su propio límite.
+            if not captcha_vigente(page, formulario, log=log):
+                descartados += 1
+                METRICAS.incrementar("captcha.intentos_desperdiciados")
+                log.warning("⚠ El CAPTCHA cambió mientras se resolvía; se descarta la respuesta y se pide otro.")
+                if descartados > LIMITE_CAPTCHAS_DESCARTADOS:
+                    crono.terminar()
+                    raise RuntimeError(
+                        f"El portal reemplazó el CAPTCHA antes de enviarlo {descartados} veces; "
+                        "revisa si se está regenerando solo."
+                    )
+                continue
+
+            intentos += 1
+            log.debug("🔁 Envío de CAPTCHA #%d…", intentos)
 
-            # 2) Enviamos la consulta
-            click_consultar(page, debug=debug)
+            # 3) Enviamos la consulta
+            pedir_turno("envio")
+            click_consultar(page, log=log, formulario=formulario)
 
-            # 3) Esperamos un poco a que el front responda
+            # 4) Esperamos un poco a que el front responda
             page.wait_for_timeout(1500)
 
-            # 4) ¿Apareció el popup 'El captcha no es valido.'?
-            if check_and_handle_captcha_error(page, debug=debug):
+            # 5) ¿Apareció el popup 'El captcha no es valido.'?
+            if check_and_handle_captcha_error(page, log=log, formulario=formulario):
                 # Ya clickeamos 'Aceptar'; se generará un nuevo captcha.
                 # Volvemos al inicio del while: te pedirá uno nuevo.
                 continue
 
             # Si llegamos aquí, asumimos que NO hubo error de captcha
-            if debug:
-                print("✅ No se detectó error de CAPTCHA; continuando flujo.")
+            log.debug("✅ No se detectó error de CAPTCHA; continuando flujo.")
             break
 
         # ----------------------------------------------------
         # Después de un CAPTCHA válido verificamos si el RUNT
         # respondió "persona no encontrada / sin registro"
         # ----------------------------------------------------
-        if check_and_handle_person_not_found(page, debug=debug):
+        crono.fase("resultado")
+        sin_registro = check_and_handle_person_not_found(page, log=log)
+        if html_resultado is not None:
+            html_resultado["html"] = page.content()
+        if sin_registro:
             # No hay resultados para ese documento
-            if debug:
-                print("⚠ La persona no tiene registro ACTIVO en RUNT (o SIN REGISTRO).")
+            log.info("⚠ La persona no tiene registro ACTIVO en RUNT (o SIN REGISTRO).")
+            crono.terminar()  # la espera del ENTER no cuenta como tiempo de flujo
             if hold_after and debug:
                 input("⏸ Documento sin registro. Presiona ENTER para cerrar el navegador…")
-            browser.close()
             return False  # flujo terminó pero sin datos
 
         # ----------------------------------------------------
         # Aquí ya asumimos que la consulta se realizó bien
         # (pendiente: parseo del panel de resultados)
         # ----------------------------------------------------
-        if debug:
-            print("⏳ Consulta enviada satisfactoriamente. (Pendiente: parseo de resultados)")
+        log.info("⏳ Consulta enviada satisfactoriamente. (Pendiente: parseo de resultados)")
+        crono.terminar()
 
         if hold_after:
             if debug:
                 input("⏸ Deja que carguen los resultados.\n   Presiona ENTER cuando quieras cerrar el navegador…")
 
-        browser.close()
         return True
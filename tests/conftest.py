@@ -0,0 +1,41 @@
+# tests/conftest.py
+# Permite importar controllers/, services/, models/ y views/ desde la raíz del repo.
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def _chromium_disponible() -> bool:
+    try:
+        from playwright.sync_api import sync_playwright
+    except ImportError:
+        return False
+    try:
+        with sync_playwright() as p:
+            p.chromium.launch(headless=True).close()
+    except Exception:
+        return False
+    return True
+
+
+@pytest.fixture(scope="session")
+def chromium():
+    """Omite la prueba si no hay navegador Chromium instalado en la máquina."""
+    if not _chromium_disponible():
+        pytest.skip("Chromium de Playwright no está instalado (playwright install chromium)")
+
+
+@pytest.fixture
+def portal_local(tmp_path):
+    """Portal determinista (benchmarks/portal_local.py) y un gobernador privado sin límite."""
+    from benchmarks.portal_local import iniciar_portal_local
+    from services.gobernador_tasa import GobernadorTasa
+
+    url, servidor = iniciar_portal_local(0)
+    gobernador = GobernadorTasa(ruta=str(tmp_path / "tasa.sqlite3"), tasa_por_min=10**6, rafaga=10**4)
+    yield url, gobernador
+    servidor.shutdown()
+    servidor.server_close()
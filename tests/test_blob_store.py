@@ -0,0 +1,114 @@
+# tests/test_blob_store.py
+import threading
+
+import pytest
+
+from models.runt_models import ResultadoRunt
+from services.blob_store import AlmacenBlobs
+
+
+def _pagina(i):
+    # Mismo boilerplate en todas, sólo cambia el dato de la persona
+    cabecera = "".join(f"<div class='menu'>opción {n}</div>\n" for n in range(40))
+    return f"<html>\n{cabecera}<p>PERSONA {i}</p>\n</html>\n"
+
+
+@pytest.fixture
+def ruta(tmp_path):
+    return str(tmp_path / "blobs.sqlite3")
+
+
+@pytest.fixture
+def sin_almacen_global():
+    # ResultadoRunt.almacen es compartido: cada prueba lo deja como estaba
+    anterior = ResultadoRunt.almacen
+    yield
+    ResultadoRunt.almacen = anterior
+
+
+def test_mismo_texto_se_guarda_una_vez(ruta):
+    almacen = AlmacenBlobs(ruta, auto_diccionario=0)
+    ref = almacen.guardar(_pagina(1))
+
+    assert almacen.guardar(_pagina(1)) == ref
+    assert almacen.guardar(_pagina(2)) != ref
+    assert almacen.estadisticas()["blobs"] == 2
+
+
+def test_ida_y_vuelta_con_diccionario_entrenado(ruta):
+    almacen = AlmacenBlobs(ruta, auto_diccionario=4)
+    refs = [almacen.guardar(_pagina(i)) for i in range(8)]
+
+    assert almacen._dict_actual is not None
+    # Las primeras se guardaron antes de entrenar, las últimas con el diccionario
+    dict_ids = [almacen._db.execute("SELECT dict_id FROM blobs WHERE hash = ?", (r,)).fetchone()[0] for r in refs]
+    assert dict_ids[:3] == [None] * 3 and set(dict_ids[4:]) == {almacen._dict_actual}
+    assert [almacen.leer(r) for r in refs] == [_pagina(i) for i in range(8)]
+    assert almacen.leer("no-existe") is None
+
+
+def test_otra_instancia_lee_blobs_con_diccionario_nuevo(ruta):
+    lector = AlmacenBlobs(ruta, auto_diccionario=0)
+    escritor = AlmacenBlobs(ruta, auto_diccionario=4)
+    refs = [escritor.guardar(_pagina(i)) for i in range(6)]
+
+    # El lector abrió el archivo antes de que existiera el diccionario
+    assert lector._diccionarios == {}
+    assert [lector.leer(r) for r in refs] == [_pagina(i) for i in range(6)]
+
+
+def test_hilos_entrenan_un_solo_diccionario(ruta):
+    almacen = AlmacenBlobs(ruta, auto_diccionario=8)
+    barrera = threading.Barrier(8)
+
+    def guardar(base):
+        barrera.wait()
+        for i in range(base, base + 4):
+            almacen.guardar(_pagina(i))
+
+    hilos = [threading.Thread(target=guardar, args=(n * 4,)) for n in range(8)]
+    for h in hilos:
+        h.start()
+    for h in hilos:
+        h.join()
+
+    assert almacen._db.execute("SELECT COUNT(*) FROM diccionarios").fetchone()[0] == 1
+    assert almacen.estadisticas()["blobs"] == 32
+
+
+def test_resultado_sin_almacen_conserva_el_html(sin_almacen_global):
+    ResultadoRunt.almacen = None
+    resultado = ResultadoRunt(raw_html="<html/>")
+
+    assert resultado.raw_html == "<html/>"
+    assert resultado.raw_ref is None
+    assert not hasattr(resultado, "__dict__")
+
+
+def test_resultado_con_almacen_guarda_sólo_la_referencia(ruta, sin_almacen_global):
+    ResultadoRunt.almacen = AlmacenBlobs(ruta)
+    resultado = ResultadoRunt(nombre="X", raw_html=_pagina(1))
+
+    assert resultado.raw_ref is not None
+    assert resultado._raw_html is None
+    assert resultado.raw_html == _pagina(1)
+    assert ResultadoRunt(raw_ref=resultado.raw_ref).raw_html == _pagina(1)
+
+
+def test_controller_guarda_el_html_del_resultado(ruta, portal_local, chromium, sin_almacen_global):
+    from controllers.runt_controller import RuntController
+    from models.runt_models import ConsultaRuntParams
+
+    url, gobernador = portal_local
+    almacen = AlmacenBlobs(ruta)
+    controller = RuntController(
+        headless=True, slow_mo=0, hold_after=False, almacen=almacen, url=url, gobernador=gobernador
+    )
+
+    resultado = controller.consultar_ciudadano(
+        ConsultaRuntParams("CC", "1017259440"), resolver_captcha=lambda _img: "12345"
+    )
+
+    assert not resultado.sin_registro
+    assert resultado.raw_ref is not None
+    assert "PERSONA 1017259440" in resultado.raw_html
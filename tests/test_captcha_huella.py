@@ -0,0 +1,174 @@
+# tests/test_captcha_huella.py
+# Huella del captcha, espera del captcha nuevo y descarte de respuestas
+# obsoletas, sobre páginas reales de Chromium (HTML en memoria y el portal local).
+import functools
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from playwright.sync_api import sync_playwright
+
+from models.runt_models import ConsultaRuntParams
+from services import runt_playwright
+from services.runt_metrics import METRICAS
+from services.runt_playwright import (
+    FormularioRunt,
+    capturar_captcha,
+    captcha_vigente,
+    esperar_captcha_nuevo,
+    huella_captcha,
+)
+
+HTML = """<div class="divCaptcha"><img id="captcha" alt="captcha" width="60" height="20"></div>
+<script>
+  function dibujar(texto) {
+    const svg = `<svg xmlns='http://www.w3.org/2000/svg' width='60' height='20'>` +
+      `<text x='2' y='15' font-size='12'>${texto}</text></svg>`;
+    return "data:image/svg+xml;base64," + btoa(svg);
+  }
+  function cambiar(texto, ms) { setTimeout(() => { document.getElementById("captcha").src = dibujar(texto); }, ms); }
+  function reemplazar(texto, ms) {
+    setTimeout(() => {
+      document.querySelector(".divCaptcha").innerHTML = `<img alt="captcha" width="60" height="20" src="${dibujar(texto)}">`;
+    }, ms);
+  }
+  document.getElementById("captcha").src = dibujar("AAA");
+</script>"""
+
+
+@pytest.fixture
+def pagina(chromium):
+    # Playwright propio por prueba: run_runt_flow abre el suyo y no se pueden anidar
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(HTML)
+        page.wait_for_function("document.getElementById('captcha').complete")
+        yield page
+        browser.close()
+
+
+@pytest.fixture
+def espera_corta(monkeypatch):
+    # capturar_captcha espera 8 s al captcha nuevo; en las pruebas basta con menos
+    monkeypatch.setattr(
+        runt_playwright, "esperar_captcha_nuevo", functools.partial(esperar_captcha_nuevo, timeout_ms=1500)
+    )
+
+
+def test_huella_de_data_uri_sin_screenshot(pagina):
+    huella, src = huella_captcha(pagina)
+    assert huella.startswith("src:") and src.startswith("data:image/svg+xml")
+    assert huella_captcha(pagina)[0] == huella
+
+    pagina.evaluate("cambiar('BBB', 0)")
+    pagina.wait_for_function(f"document.getElementById('captcha').src !== {src!r}")
+    assert huella_captcha(pagina)[0] != huella
+
+
+def test_captcha_vigente(pagina):
+    formulario = FormularioRunt(pagina)
+    # Sin captura previa no hay con qué comparar
+    assert captcha_vigente(pagina, formulario)
+
+    capturar_captcha(pagina, formulario=formulario)
+    assert captcha_vigente(pagina, formulario)
+
+    pagina.evaluate("cambiar('BBB', 0)")
+    pagina.wait_for_timeout(100)
+    assert not captcha_vigente(pagina, formulario)
+
+
+def test_esperar_captcha_nuevo(pagina):
+    formulario = FormularioRunt(pagina)
+    capturar_captcha(pagina, formulario=formulario)
+
+    assert not esperar_captcha_nuevo(pagina, formulario, timeout_ms=300)
+    pagina.evaluate("cambiar('BBB', 200)")
+    assert esperar_captcha_nuevo(pagina, formulario, timeout_ms=3000)
+
+
+def test_captura_repetida_espera_el_captcha_nuevo(pagina, espera_corta):
+    formulario = FormularioRunt(pagina)
+    capturar_captcha(pagina, formulario=formulario)
+    primera = formulario.huella_captcha
+    obsoletas = METRICAS.contador("captcha.capturas_obsoletas")
+
+    pagina.evaluate("cambiar('BBB', 300)")
+    capturar_captcha(pagina, formulario=formulario)
+
+    assert METRICAS.contador("captcha.capturas_obsoletas") == obsoletas + 1
+    assert formulario.huella_captcha not in (None, primera)
+    assert captcha_vigente(pagina, formulario)
+
+
+def test_captura_con_el_nodo_reemplazado(pagina, espera_corta):
+    formulario = FormularioRunt(pagina)
+    capturar_captcha(pagina, formulario=formulario)
+    primera = formulario.huella_captcha
+
+    # Angular cambia el <img> completo, no sólo su src
+    pagina.evaluate("reemplazar('CCC', 300)")
+    capturar_captcha(pagina, formulario=formulario)
+
+    assert formulario.huella_captcha != primera
+    assert pagina.locator(".divCaptcha img").evaluate("e => e.src") == formulario.src_captcha
+
+
+def test_captcha_que_no_cambia_no_se_entrega(pagina, espera_corta):
+    formulario = FormularioRunt(pagina)
+    capturar_captcha(pagina, formulario=formulario)
+    obsoletas = METRICAS.contador("captcha.capturas_obsoletas")
+
+    with pytest.raises(RuntimeError, match="no generó un CAPTCHA nuevo"):
+        capturar_captcha(pagina, formulario=formulario)
+    assert METRICAS.contador("captcha.capturas_obsoletas") == obsoletas + 1
+
+
+def _vigente_que_cambia(veces):
+    """captcha_vigente que, las primeras 'veces', simula que el portal regeneró el captcha."""
+    real = runt_playwright.captcha_vigente
+    llamadas = []
+
+    def vigente(page, formulario, **kwargs):
+        llamadas.append(1)
+        if len(llamadas) <= veces:
+            page.evaluate("nuevoCaptcha()")
+            page.wait_for_timeout(50)
+        return real(page, formulario, **kwargs)
+
+    return vigente
+
+
+def _consultar(url, gobernador):
+    return runt_playwright.run_runt_flow(
+        "CC",
+        "1017259440",
+        headless=True,
+        slow_mo=0,
+        resolver_captcha=lambda _img: "12345",
+        debug=False,
+        url=url,
+        gobernador=gobernador,
+    )
+
+
+def test_descartes_no_cuentan_como_intentos(monkeypatch, portal_local, chromium):
+    url, gobernador = portal_local
+    monkeypatch.setattr(runt_playwright, "captcha_vigente", _vigente_que_cambia(3))
+    monkeypatch.setattr(runt_playwright, "LIMITE_INTENTOS_CAPTCHA", 1)
+    desperdiciados = METRICAS.contador("captcha.intentos_desperdiciados")
+
+    # Tres respuestas descartadas y un solo envío: cabe en un límite de 1 intento
+    assert _consultar(url, gobernador) is True
+    assert METRICAS.contador("captcha.intentos_desperdiciados") == desperdiciados + 3
+
+
+def test_demasiados_descartes_abortan(monkeypatch, portal_local, chromium):
+    url, gobernador = portal_local
+    monkeypatch.setattr(runt_playwright, "captcha_vigente", _vigente_que_cambia(10))
+    monkeypatch.setattr(runt_playwright, "LIMITE_CAPTCHAS_DESCARTADOS", 2)
+
+    with pytest.raises(RuntimeError, match="reemplazó el CAPTCHA antes de enviarlo 3 veces"):
+        _consultar(url, gobernador)
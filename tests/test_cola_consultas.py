@@ -0,0 +1,174 @@
+# tests/test_cola_consultas.py
+import threading
+import time
+
+import pytest
+
+from controllers.bandeja_captcha import BandejaCaptcha, CaptchaCancelado
+from controllers.cola_consultas import ColaCarriles, ColaConsultas, TrabajoConsulta
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+
+
+class ControllerFalso:
+    """Hace las veces de RuntController: pide un captcha y devuelve lo que se respondió."""
+
+    def __init__(self):
+        self.respuestas = {}
+        self.liberados = 0
+        self._lock = threading.Lock()
+
+    def consultar_ciudadano(self, params, resolver_captcha=None, debug=False, query_id=None, prioridad=1):
+        respuesta = resolver_captcha(b"imagen")
+        with self._lock:
+            self.respuestas[query_id] = respuesta
+        return ResultadoRunt(nombre=respuesta, sin_registro=params.numero_documento.startswith("0"))
+
+    def mantener_hilo(self, hay_trabajo=None) -> bool:
+        return False
+
+    def liberar_hilo(self):
+        with self._lock:
+            self.liberados += 1
+
+
+def esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return
+        time.sleep(0.01)
+    raise AssertionError("la condición no se cumplió a tiempo")
+
+
+@pytest.fixture
+def cola():
+    controller = ControllerFalso()
+    bandeja = BandejaCaptcha(timeout_s=5)
+    cola = ColaConsultas(controller, bandeja, workers=2)
+    cola.iniciar()
+    yield cola
+    cola.detener()
+
+
+def test_responder_captcha_completa_la_consulta(cola):
+    trabajo = cola.encolar(ConsultaRuntParams("CC", "1017259440"))
+    esperar(lambda: cola.bandeja.siguiente() is not None)
+
+    pendiente = cola.bandeja.siguiente()
+    assert pendiente.query_id == trabajo.query_id
+    cola.bandeja.responder(pendiente.id, "12345")
+
+    esperar(lambda: trabajo.estado == "ok")
+    assert cola.controller.respuestas[trabajo.query_id] == "12345"
+    assert trabajo.resultado.nombre == "12345"
+    assert cola.bandeja.pendientes() == []
+
+
+def test_sin_registro(cola):
+    trabajo = cola.encolar(ConsultaRuntParams("CC", "0123"))
+    esperar(lambda: cola.bandeja.siguiente() is not None)
+    cola.bandeja.responder(cola.bandeja.siguiente().id, "12345")
+    esperar(lambda: trabajo.estado == "sin_registro")
+
+
+def test_posponer_manda_el_captcha_al_final(cola):
+    primero = cola.encolar(ConsultaRuntParams("CC", "1"))
+    segundo = cola.encolar(ConsultaRuntParams("CC", "2"))
+    esperar(lambda: len(cola.bandeja.pendientes()) == 2)
+
+    assert cola.bandeja.siguiente().query_id == primero.query_id
+    cola.bandeja.posponer(cola.bandeja.siguiente().id)
+    assert [p.query_id for p in cola.bandeja.pendientes()] == [segundo.query_id, primero.query_id]
+
+    cola.bandeja.responder(cola.bandeja.siguiente().id, "b")
+    esperar(lambda: segundo.estado == "ok")
+    assert primero.estado == "en_curso"
+    cola.bandeja.responder(cola.bandeja.siguiente().id, "a")
+    esperar(lambda: primero.estado == "ok")
+
+
+def test_descartar_marca_error(cola):
+    trabajo = cola.encolar(ConsultaRuntParams("CC", "1"))
+    esperar(lambda: cola.bandeja.siguiente() is not None)
+    cola.bandeja.descartar(cola.bandeja.siguiente().id)
+
+    esperar(lambda: trabajo.estado == "error")
+    assert "descartado" in trabajo.error
+    assert trabajo.query_id not in cola.controller.respuestas
+
+
+def test_interactiva_va_primero_en_la_bandeja(cola):
+    masiva = cola.encolar(ConsultaRuntParams("CC", "1"), carril="masiva")
+    esperar(lambda: len(cola.bandeja.pendientes()) == 1)
+    interactiva = cola.encolar(ConsultaRuntParams("CC", "2"), carril="interactiva")
+    esperar(lambda: len(cola.bandeja.pendientes()) == 2)
+
+    assert [p.query_id for p in cola.bandeja.pendientes()] == [interactiva.query_id, masiva.query_id]
+
+
+def test_carril_desconocido(cola):
+    with pytest.raises(ValueError):
+        cola.encolar(ConsultaRuntParams("CC", "1"), carril="urgente")
+
+
+def test_detener_cancela_pendientes_y_libera_hilos():
+    controller = ControllerFalso()
+    bandeja = BandejaCaptcha(timeout_s=5)
+    cola = ColaConsultas(controller, bandeja, workers=2)
+    cola.iniciar()
+    trabajos = [cola.encolar(ConsultaRuntParams("CC", str(i))) for i in range(2)]
+    esperar(lambda: len(bandeja.pendientes()) == 2)
+
+    cola.detener()
+
+    assert [t.estado for t in trabajos] == ["error", "error"]
+    assert controller.liberados == 2
+
+
+def test_bandeja_cerrada_rechaza_captchas_nuevos():
+    bandeja = BandejaCaptcha(timeout_s=5)
+    bandeja.cerrar()
+    with pytest.raises(CaptchaCancelado):
+        bandeja.solicitar("q1", "CC 1", b"imagen")
+
+
+def test_bandeja_vence_sin_operador():
+    bandeja = BandejaCaptcha(timeout_s=0.05)
+    with pytest.raises(CaptchaCancelado):
+        bandeja.solicitar("q1", "CC 1", b"imagen")
+    assert bandeja.pendientes() == []
+
+
+def _trabajo(i, carril, edad_s=0.0):
+    return TrabajoConsulta(
+        id=i, params=ConsultaRuntParams("CC", str(i)), carril=carril, encolado=time.monotonic() - edad_s
+    )
+
+
+def test_masiva_vieja_no_pasa_a_la_interactiva():
+    cola = ColaCarriles(max_espera_s={"masiva": 10})
+    cola.poner(_trabajo(1, "masiva", edad_s=3600))
+    cola.poner(_trabajo(2, "interactiva"))
+    cola.poner(_trabajo(3, "interactiva"))
+
+    assert [cola.tomar(timeout=0).carril for _ in range(3)] == ["interactiva", "interactiva", "masiva"]
+
+
+def test_promociones_acotadas():
+    cola = ColaCarriles(max_espera_s={"masiva": 10}, tomas_entre_promociones=3)
+    for i in range(10):
+        cola.poner(_trabajo(i, "masiva", edad_s=3600))
+    for i in range(10, 20):
+        cola.poner(_trabajo(i, "normal"))
+
+    carriles = [cola.tomar(timeout=0).carril for _ in range(8)]
+    assert carriles == ["masiva", "normal", "normal", "normal"] * 2
+
+
+def test_sin_atraso_se_respeta_el_orden_de_carriles():
+    cola = ColaCarriles(max_espera_s={"masiva": 10})
+    cola.poner(_trabajo(1, "masiva"))
+    cola.poner(_trabajo(2, "normal"))
+    cola.poner(_trabajo(3, "interactiva"))
+
+    assert [cola.tomar(timeout=0).id for _ in range(3)] == [3, 2, 1]
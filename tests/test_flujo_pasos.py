@@ -0,0 +1,142 @@
+# tests/test_flujo_pasos.py
+import threading
+import time
+
+import pytest
+
+from controllers.bandeja_captcha import BandejaCaptcha, CaptchaCancelado
+from services.flujo_pasos import GrafoFlujo, Paso
+
+
+def esperar(condicion, timeout=5.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicion():
+            return
+        time.sleep(0.01)
+    raise AssertionError("la condición no se cumplió a tiempo")
+
+
+def test_paso_de_fondo_corre_mientras_los_de_pagina_avanzan():
+    orden = []
+    listo = threading.Event()
+
+    def fondo(r):
+        listo.wait(2)
+        orden.append("fondo")
+        return "texto"
+
+    def pagina(r):
+        orden.append("pagina")
+        listo.set()
+
+    grafo = GrafoFlujo([
+        Paso("fondo", fondo, en_pagina=False),
+        Paso("pagina", pagina),
+        Paso("final", lambda r: r["fondo"], depende_de=("fondo", "pagina")),
+    ])
+    resultados = grafo.ejecutar()
+    assert orden == ["pagina", "fondo"]
+    assert resultados["final"] == "texto"
+
+
+def test_fallo_de_pagina_retira_el_captcha_de_la_bandeja():
+    bandeja = BandejaCaptcha(timeout_s=10)
+    resolver = bandeja.resolver_para("q1", "CC 1")
+    errores = []
+
+    def resolver_captcha(r):
+        try:
+            return resolver(b"imagen")
+        except CaptchaCancelado as e:
+            errores.append(e)
+            raise
+
+    def llenar(r):
+        esperar(lambda: bandeja.pendientes())
+        raise RuntimeError("no apareció el campo de número")
+
+    grafo = GrafoFlujo([
+        Paso("resolver_captcha", resolver_captcha, en_pagina=False, cancelar=resolver.cancelar),
+        Paso("llenar_numero", llenar),
+    ])
+    with pytest.raises(RuntimeError, match="campo de número"):
+        grafo.ejecutar()
+
+    assert bandeja.pendientes() == []
+    esperar(lambda: errores)
+
+
+def test_resolver_cancelado_antes_de_pedir_no_entra_a_la_bandeja():
+    bandeja = BandejaCaptcha(timeout_s=10)
+    resolver = bandeja.resolver_para("q1")
+    resolver.cancelar()
+    with pytest.raises(CaptchaCancelado):
+        resolver(b"imagen")
+    assert bandeja.pendientes() == []
+
+
+def test_grafo_con_ciclo():
+    with pytest.raises(ValueError, match="Ciclo"):
+        GrafoFlujo([Paso("a", lambda r: 1, depende_de=("b",)), Paso("b", lambda r: 1, depende_de=("a",))])
+
+
+@pytest.fixture
+def pasos_de_pagina(monkeypatch):
+    """Reemplaza las funciones de página del grafo de consulta y anota orden e hilo de cada una."""
+    from services import runt_playwright
+
+    llamadas = []
+
+    def anotar(nombre, valor=None):
+        def funcion(*args, **kwargs):
+            llamadas.append((nombre, threading.get_ident()))
+            return valor
+        return funcion
+
+    monkeypatch.setattr(runt_playwright, "select_tipo_documento", anotar("seleccionar_tipo"))
+    monkeypatch.setattr(runt_playwright, "fill_numero_documento", anotar("llenar_numero"))
+    monkeypatch.setattr(runt_playwright, "dismiss_autocomplete_popup", anotar("cerrar_popup"))
+    monkeypatch.setattr(runt_playwright, "capturar_captcha", anotar("capturar_captcha", b"imagen"))
+    monkeypatch.setattr(runt_playwright, "escribir_captcha", anotar("escribir_captcha"))
+    return llamadas
+
+
+def test_captcha_se_captura_con_el_popup_cerrado(pasos_de_pagina):
+    from services.runt_playwright import construir_grafo_consulta
+
+    construir_grafo_consulta(None, "CC", "1", resolver_captcha=lambda img: "12345").ejecutar()
+
+    orden = [nombre for nombre, _ in pasos_de_pagina]
+    assert orden.index("cerrar_popup") < orden.index("capturar_captcha")
+
+
+def test_resolver_interactivo_corre_en_el_hilo_que_llama(pasos_de_pagina):
+    from services.runt_playwright import construir_grafo_consulta
+
+    hilos = []
+
+    def resolver(img):
+        hilos.append(threading.get_ident())
+        return "12345"
+
+    construir_grafo_consulta(None, "CC", "1", resolver_captcha=resolver).ejecutar()
+    assert hilos == [threading.get_ident()]
+
+
+def test_resolver_de_bandeja_corre_en_el_fondo(pasos_de_pagina):
+    from services.runt_playwright import construir_grafo_consulta
+
+    bandeja = BandejaCaptcha(timeout_s=5)
+    resolver = bandeja.resolver_para("q1", "CC 1")
+    grafo = construir_grafo_consulta(None, "CC", "1", resolver_captcha=resolver)
+
+    hilo = threading.Thread(target=grafo.ejecutar)
+    hilo.start()
+    esperar(lambda: bandeja.siguiente() is not None)
+    bandeja.responder(bandeja.siguiente().id, "12345")
+    hilo.join(5)
+
+    paso = next(p for p in grafo.pasos if p.nombre == "resolver_captcha")
+    assert not paso.en_pagina and paso.cancelar == resolver.cancelar
+    assert [nombre for nombre, _ in pasos_de_pagina][-1] == "escribir_captcha"
@@ -0,0 +1,82 @@
+# tests/test_formulario_runt.py
+# Caché de locators de FormularioRunt sobre una página real de Chromium.
+import pytest
+
+pytest.importorskip("playwright")
+
+from playwright.sync_api import sync_playwright
+
+from services import runt_playwright
+from services.runt_metrics import METRICAS
+from services.runt_playwright import FormularioRunt
+
+HTML = """<input formcontrolname="documento" placeholder="Nro. documento">
+<script>
+  function reemplazar() {
+    document.body.innerHTML = '<input formcontrolname="documento" placeholder="nuevo">';
+  }
+</script>"""
+CANDIDATOS = ["input[formcontrolname='documento']"]
+
+
+@pytest.fixture
+def pagina(chromium):
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        page = browser.new_page()
+        page.set_content(HTML)
+        yield page
+        browser.close()
+
+
+@pytest.fixture
+def busquedas(monkeypatch):
+    """Cuenta las búsquedas completas por la lista de candidatos."""
+    llamadas = []
+    original = runt_playwright.pick_first_working_locator
+
+    def contar(page, candidatos, descripcion="elemento"):
+        llamadas.append(descripcion)
+        return original(page, candidatos, descripcion)
+
+    monkeypatch.setattr(runt_playwright, "pick_first_working_locator", contar)
+    return llamadas
+
+
+def test_repetir_la_busqueda_usa_la_cache(pagina, busquedas):
+    formulario = FormularioRunt(pagina)
+    aciertos = METRICAS.contador("formulario.cache.aciertos")
+
+    primero = formulario.localizar("numero", CANDIDATOS, "número")
+    for _ in range(3):
+        assert formulario.localizar("numero", CANDIDATOS, "número") is primero
+
+    assert busquedas == ["número"]
+    assert METRICAS.contador("formulario.cache.aciertos") == aciertos + 3
+
+
+def test_nodo_reemplazado_se_vuelve_a_buscar(pagina, busquedas):
+    formulario = FormularioRunt(pagina)
+    formulario.localizar("numero", CANDIDATOS, "número")
+    invalidaciones = METRICAS.contador("formulario.cache.invalidaciones")
+
+    # Angular re-renderiza: mismo selector, nodo distinto
+    pagina.evaluate("reemplazar()")
+    loc = formulario.localizar("numero", CANDIDATOS, "número")
+
+    assert busquedas == ["número", "número"]
+    assert METRICAS.contador("formulario.cache.invalidaciones") == invalidaciones + 1
+    assert loc.get_attribute("placeholder") == "nuevo"
+    # El nodo nuevo queda en caché
+    formulario.localizar("numero", CANDIDATOS, "número")
+    assert len(busquedas) == 2
+
+
+def test_invalidar_olvida_los_elementos(pagina, busquedas):
+    formulario = FormularioRunt(pagina)
+    formulario.localizar("numero", CANDIDATOS, "número")
+    formulario.invalidar()
+
+    formulario.localizar("numero", CANDIDATOS, "número")
+    assert len(busquedas) == 2
+
@@ -0,0 +1,220 @@
+# tests/test_gestor_navegador.py
+import builtins
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from services import gestor_navegador
+from services.gestor_navegador import memoria_arbol_mb
+
+pytestmark = pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="requiere smaps_rollup")
+
+
+def _rss_bytes(pid):
+    with open(f"/proc/{pid}/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+# Reserva 200 MB, los toca y se bifurca: padre e hijo comparten esas páginas
+# (copy-on-write), como los procesos de Chromium comparten sus bibliotecas
+_COMPARTIDO = """
+import os, sys, time
+datos = bytearray(200 * 1024 * 1024)
+for i in range(0, len(datos), 4096):
+    datos[i] = 1
+if os.fork() == 0:
+    time.sleep(30)
+    os._exit(0)
+print("listo", flush=True)
+time.sleep(30)
+"""
+
+
+@pytest.fixture
+def arbol_compartido():
+    proceso = subprocess.Popen([sys.executable, "-c", _COMPARTIDO], stdout=subprocess.PIPE, text=True)
+    assert proceso.stdout.readline().strip() == "listo"
+    yield proceso.pid
+    for pid in gestor_navegador._descendientes(proceso.pid):
+        try:
+            os.kill(pid, 9)
+        except OSError:
+            pass
+    proceso.wait()
+
+
+def test_pss_no_cuenta_dos_veces_lo_compartido(arbol_compartido):
+    pids = gestor_navegador._descendientes(arbol_compartido)
+    assert len(pids) == 2
+    suma_rss = sum(_rss_bytes(p) for p in pids) / (1024 * 1024)
+    pss = memoria_arbol_mb(arbol_compartido)
+
+    # Sumando RSS los 200 MB aparecen dos veces; con PSS, una
+    assert suma_rss > 400
+    assert 200 <= pss < suma_rss - 150
+
+
+def test_sin_smaps_rollup_usa_rss(monkeypatch):
+    abrir = builtins.open
+
+    def sin_rollup(ruta, *args, **kwargs):
+        if str(ruta).endswith("smaps_rollup"):
+            raise FileNotFoundError(ruta)
+        return abrir(ruta, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", sin_rollup)
+    assert gestor_navegador._memoria_proceso_bytes(os.getpid()) == _rss_bytes(os.getpid())
+
+
+def test_proceso_terminado():
+    proceso = subprocess.Popen([sys.executable, "-c", "pass"])
+    proceso.wait()
+    assert gestor_navegador._memoria_proceso_bytes(proceso.pid) is None
+
+
+class PaginaFalsa:
+    def __init__(self, contexto):
+        self.contexto = contexto
+        self.cerrada = False
+
+    def close(self):
+        self.cerrada = True
+
+
+class ContextoFalso:
+    def __init__(self):
+        self.cerrado = False
+        self.paginas = []
+
+    def new_page(self):
+        pagina = PaginaFalsa(self)
+        self.paginas.append(pagina)
+        return pagina
+
+    def close(self):
+        self.cerrado = True
+        for p in self.paginas:
+            p.cerrada = True
+
+
+class NavegadorFalso:
+    def __init__(self):
+        self.cerrado = False
+        self.contextos = []
+
+    def new_context(self):
+        self.contextos.append(ContextoFalso())
+        return self.contextos[-1]
+
+    def close(self):
+        self.cerrado = True
+
+
+class PlaywrightFalso:
+    def __init__(self):
+        self.navegadores = []
+        self.chromium = self
+
+    def launch(self, headless=True, slow_mo=0):
+        self.navegadores.append(NavegadorFalso())
+        return self.navegadores[-1]
+
+    def stop(self):
+        pass
+
+
+def _gestor(monkeypatch, memoria_mb=100.0, **politica):
+    from services.gestor_navegador import GestorNavegador, PoliticaReciclaje
+
+    lectura = {"mb": memoria_mb}
+    monkeypatch.setattr(gestor_navegador, "memoria_arbol_mb", lambda pid: lectura["mb"])
+    gestor = GestorNavegador(politica=PoliticaReciclaje(**politica))
+    # Sin Playwright real: _asegurar_playwright no hace nada si ya hay uno
+    gestor._pw = PlaywrightFalso()
+    gestor._pid_driver = 4321
+    return gestor, lectura
+
+
+def _usar(gestor, veces=1):
+    for _ in range(veces):
+        with gestor.pagina():
+            pass
+
+
+def test_recicla_contexto_por_consultas(monkeypatch):
+    gestor, _ = _gestor(monkeypatch, max_consultas_contexto=2)
+    _usar(gestor, 2)
+
+    navegador = gestor._pw.navegadores[0]
+    assert navegador.contextos[0].cerrado and not navegador.cerrado
+    assert gestor.generacion == 1
+
+    _usar(gestor)
+    assert len(navegador.contextos) == 2 and len(gestor._pw.navegadores) == 1
+
+
+def test_recicla_navegador_por_consultas(monkeypatch):
+    gestor, _ = _gestor(monkeypatch, max_consultas_navegador=3)
+    _usar(gestor, 3)
+    assert gestor._pw.navegadores[0].cerrado
+
+    _usar(gestor)
+    assert len(gestor._pw.navegadores) == 2
+
+
+def test_recicla_por_edad(monkeypatch):
+    gestor, _ = _gestor(monkeypatch, max_edad_navegador_s=60)
+    _usar(gestor)
+    assert not gestor._pw.navegadores[0].cerrado
+
+    gestor._navegador_desde -= 61
+    gestor.revisar()
+    assert gestor._pw.navegadores[0].cerrado
+
+
+def test_recicla_por_memoria(monkeypatch):
+    gestor, lectura = _gestor(monkeypatch, max_rss_mb=1500)
+    _usar(gestor)
+    assert not gestor._pw.navegadores[0].cerrado
+
+    lectura["mb"] = 1600
+    _usar(gestor)
+    assert gestor._pw.navegadores[0].cerrado
+
+
+def test_no_recicla_con_una_pagina_en_uso(monkeypatch):
+    gestor, lectura = _gestor(monkeypatch, max_rss_mb=1500)
+    lectura["mb"] = 1600
+
+    with gestor.pagina() as pagina:
+        gestor.revisar()
+        assert not pagina.cerrada
+        assert not gestor._pw.navegadores[0].cerrado
+
+    # Al soltarla sí se aplica la política
+    assert gestor._pw.navegadores[0].cerrado
+
+
+def test_pid_driver_es_el_proceso_lanzado():
+    from playwright.sync_api import sync_playwright
+
+    with gestor_navegador._lock_arranque:
+        antes = gestor_navegador._hijos_directos(os.getpid())
+        pw = sync_playwright().start()
+        nuevos = gestor_navegador._hijos_directos(os.getpid()) - antes
+    try:
+        pid = gestor_navegador._pid_driver(pw, nuevos)
+        assert pid in nuevos
+        assert pid == pw._impl_obj._connection._transport._proc.pid
+    finally:
+        pw.stop()
+
+
+def test_pid_driver_sin_transporte_no_adivina():
+    assert gestor_navegador._pid_driver(object(), {10}) == 10
+    assert gestor_navegador._pid_driver(object(), {10, 11}) is None
+    assert gestor_navegador._pid_driver(object(), set()) is None
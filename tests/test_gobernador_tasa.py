@@ -0,0 +1,89 @@
+# tests/test_gobernador_tasa.py
+import os
+import time
+
+import pytest
+
+from services.gobernador_tasa import ENVEJECIMIENTO_S, TTL_TURNO_S, GobernadorTasa
+
+
+@pytest.fixture
+def gobernador(tmp_path):
+    return GobernadorTasa(ruta=str(tmp_path / "tasa.sqlite3"), tasa_por_min=60, rafaga=1)
+
+
+def _sacar_turno(gob, cuando, prioridad=1, pid=None, creado=None):
+    db = gob._db()
+    return db.execute(
+        "INSERT INTO turnos (nombre, pid, latido, creado, prioridad) VALUES (?, ?, ?, ?, ?)",
+        (gob.nombre, pid or os.getpid(), cuando, cuando if creado is None else creado, prioridad),
+    ).lastrowid
+
+
+def _intentar(gob, turno, ahora, creado, prioridad=1):
+    db = gob._db()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        return gob._intentar(db, turno, ahora, creado, prioridad)
+    finally:
+        db.execute("COMMIT")
+
+
+def _ids(gob):
+    return [fila[0] for fila in gob._db().execute("SELECT id FROM turnos ORDER BY id")]
+
+
+def test_adquirir_toma_token(gobernador):
+    assert gobernador.adquirir(timeout_s=5) < 1
+    assert _ids(gobernador) == []
+
+
+def test_turno_propio_vencido_no_se_purga(gobernador):
+    inicio = time.time()
+    turno = _sacar_turno(gobernador, inicio)
+
+    # Dormimos más que el TTL (proceso suspendido): antes esto borraba
+    # nuestro propio turno y fetchone() devolvía None
+    espera = _intentar(gobernador, turno, inicio + TTL_TURNO_S + 5, inicio)
+    assert espera == 0
+    assert _ids(gobernador) == []
+
+
+def test_turno_purgado_por_otro_proceso_se_repone(gobernador):
+    inicio = time.time()
+    ajeno = _sacar_turno(gobernador, inicio + 1, pid=os.getpid() + 1)
+    turno = _sacar_turno(gobernador, inicio)
+    gobernador._db().execute("DELETE FROM turnos WHERE id = ?", (turno,))
+
+    espera = _intentar(gobernador, turno, inicio + 2, inicio)
+
+    # Vuelve con su id y antigüedad, así que sigue delante del turno ajeno
+    assert espera == 0
+    assert _ids(gobernador) == [ajeno]
+
+
+def test_turnos_ajenos_vencidos_se_purgan(gobernador):
+    inicio = time.time()
+    muerto = _sacar_turno(gobernador, inicio - TTL_TURNO_S - 5, pid=os.getpid() + 1)
+    turno = _sacar_turno(gobernador, inicio)
+
+    _intentar(gobernador, turno, inicio, inicio)
+    assert muerto not in _ids(gobernador)
+
+
+def test_masivo_envejecido_no_pasa_a_uno_interactivo(gobernador):
+    ahora = time.time()
+    viejo = _sacar_turno(gobernador, ahora, prioridad=2, creado=ahora - 100 * ENVEJECIMIENTO_S)
+    interactivo = _sacar_turno(gobernador, ahora, prioridad=0)
+
+    assert _intentar(gobernador, viejo, ahora, ahora - 100 * ENVEJECIMIENTO_S, 2) > 0
+    assert _intentar(gobernador, interactivo, ahora, ahora, 0) == 0
+
+
+def test_masivo_envejecido_pasa_a_uno_normal(gobernador):
+    ahora = time.time()
+    normal = _sacar_turno(gobernador, ahora, prioridad=1)
+    viejo = _sacar_turno(gobernador, ahora, prioridad=2, creado=ahora - 3 * ENVEJECIMIENTO_S)
+
+    assert _intentar(gobernador, normal, ahora, ahora, 1) > 0
+    assert _intentar(gobernador, viejo, ahora, ahora - 3 * ENVEJECIMIENTO_S, 2) == 0
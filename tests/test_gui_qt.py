@@ -0,0 +1,161 @@
+# tests/test_gui_qt.py
+# Prueba de humo de la interfaz sin pantalla (QT_QPA_PLATFORM=offscreen):
+# cientos de trabajos en la tabla y un captcha resuelto sólo con el teclado.
+import os
+import time
+
+import pytest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+pytest.importorskip("PyQt6.QtWidgets")
+
+from PyQt6.QtCore import Qt
+from PyQt6.QtTest import QTest
+from PyQt6.QtWidgets import QApplication
+
+from controllers.bandeja_captcha import BandejaCaptcha
+from controllers.cola_consultas import ColaConsultas
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+from views.gui_qt import VentanaPrincipal
+
+LOTE = 300
+
+
+class ControllerFalso:
+    """Los documentos que empiezan por 9 piden captcha; el resto termina al instante."""
+
+    def __init__(self):
+        self.respuestas = {}
+
+    def consultar_ciudadano(self, params, resolver_captcha=None, debug=False, query_id=None, prioridad=1):
+        if params.numero_documento.startswith("9"):
+            self.respuestas[query_id] = resolver_captcha(b"imagen")
+        return ResultadoRunt()
+
+    def mantener_hilo(self, hay_trabajo=None) -> bool:
+        return False
+
+    def liberar_hilo(self):
+        pass
+
+
+def esperar(condicion, timeout=10.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        QApplication.processEvents()
+        if condicion():
+            return
+        QTest.qWait(10)
+    raise AssertionError("la condición no se cumplió a tiempo")
+
+
+@pytest.fixture
+def ventana():
+    app = QApplication.instance() or QApplication([])
+    referencia = {}
+
+    def captchas_cambiaron():
+        if "ventana" in referencia:
+            referencia["ventana"].captchas_cambiaron.emit()
+
+    def trabajo_cambio(_trabajo):
+        if "ventana" in referencia:
+            referencia["ventana"].trabajos_cambiaron.emit()
+
+    bandeja = BandejaCaptcha(timeout_s=10, al_cambiar=captchas_cambiaron)
+    cola = ColaConsultas(ControllerFalso(), bandeja, workers=4, al_cambiar=trabajo_cambio)
+    ventana = VentanaPrincipal(cola, bandeja)
+    referencia["ventana"] = ventana
+    cola.iniciar()
+    ventana.show()
+    yield ventana
+    # Primero los workers: después de cerrar, la ventana ya no recibe señales
+    cola.detener()
+    referencia.clear()
+    ventana.close()
+    app.processEvents()
+
+
+def test_lote_grande_y_captcha_por_teclado(ventana):
+    cola = ventana.cola
+
+    ventana.txt_lote.setPlainText("\n".join(f"CC {1000 + i}" for i in range(LOTE)))
+    ventana.encolar_lote()
+
+    # Consulta del mostrador, escrita y encolada con ENTER
+    ventana.cmb_carril.setCurrentText("interactiva")
+    QTest.keyClicks(ventana.txt_numero, "91017259440")
+    QTest.keyClick(ventana.txt_numero, Qt.Key.Key_Return)
+    assert ventana.txt_numero.text() == ""
+
+    esperar(lambda: ventana.panel_captcha._actual is not None)
+    assert ventana.panel_captcha.txt_respuesta.isEnabled()
+    assert "⚡" in ventana.panel_captcha.lbl_info.text()
+
+    QTest.keyClicks(ventana.panel_captcha.txt_respuesta, "12345")
+    QTest.keyClick(ventana.panel_captcha.txt_respuesta, Qt.Key.Key_Return)
+
+    esperar(lambda: all(t.estado == "ok" for t in cola.trabajos()))
+    interactiva = next(t for t in cola.trabajos() if t.carril == "interactiva")
+    assert cola.controller.respuestas[interactiva.query_id] == "12345"
+
+    esperar(lambda: ventana.modelo.rowCount() == LOTE + 1)
+    esperar(lambda: ventana.panel_captcha._actual is None)
+    assert "En cola: 0" in ventana.lbl_estado.text()
+
+
+def test_esc_pospone_y_ctrl_d_descarta(ventana):
+    cola = ventana.cola
+    ventana.cmb_carril.setCurrentText("interactiva")
+    for numero in ("91", "92"):
+        QTest.keyClicks(ventana.txt_numero, numero)
+        QTest.keyClick(ventana.txt_numero, Qt.Key.Key_Return)
+    esperar(lambda: len(ventana.bandeja.pendientes()) == 2)
+    esperar(lambda: ventana.panel_captcha._actual is not None)
+    ventana.activateWindow()
+
+    primero = ventana.panel_captcha._actual.query_id
+    QTest.keyClick(ventana.panel_captcha.txt_respuesta, Qt.Key.Key_Escape)
+    esperar(lambda: ventana.panel_captcha._actual.query_id != primero)
+
+    QTest.keyClick(ventana.panel_captcha.txt_respuesta, Qt.Key.Key_D, Qt.KeyboardModifier.ControlModifier)
+    esperar(lambda: ventana.panel_captcha._actual.query_id == primero)
+    descartado = next(t for t in cola.trabajos() if t.query_id != primero)
+    esperar(lambda: descartado.estado == "error")
+
+
+def test_esc_fuera_del_panel_no_pospone(ventana):
+    ventana.cmb_carril.setCurrentText("interactiva")
+    for numero in ("91", "92"):
+        QTest.keyClicks(ventana.txt_numero, numero)
+        QTest.keyClick(ventana.txt_numero, Qt.Key.Key_Return)
+    esperar(lambda: len(ventana.bandeja.pendientes()) == 2)
+    esperar(lambda: ventana.panel_captcha._actual is not None)
+    ventana.activateWindow()
+
+    actual = ventana.panel_captcha._actual.query_id
+    ventana.txt_numero.setFocus()
+    esperar(lambda: ventana.focusWidget() is ventana.txt_numero)
+    QTest.keyClick(ventana.txt_numero, Qt.Key.Key_Escape)
+    QTest.keyClick(ventana.txt_numero, Qt.Key.Key_D, Qt.KeyboardModifier.ControlModifier)
+    QTest.qWait(100)
+    QApplication.processEvents()
+
+    assert ventana.bandeja.siguiente().query_id == actual
+    assert len(ventana.bandeja.pendientes()) == 2
+
+
+def test_filas_nuevas_se_insertan_sin_resetear(ventana):
+    modelo = ventana.modelo
+    eventos = []
+    modelo.modelReset.connect(lambda: eventos.append("reset"))
+    modelo.rowsInserted.connect(lambda _padre, primera, ultima: eventos.append((primera, ultima)))
+
+    for numero in ("1", "2"):
+        ventana.cola.encolar(ConsultaRuntParams("CC", numero))
+    modelo.refrescar()
+    ventana.cola.encolar(ConsultaRuntParams("CC", "3"))
+    modelo.refrescar()
+
+    assert eventos == [(0, 1), (2, 2)]
+    assert modelo.rowCount() == 3
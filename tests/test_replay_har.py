@@ -0,0 +1,87 @@
+# tests/test_replay_har.py
+# Regresión de rendimiento con las sesiones grabadas en benchmarks/har/.
+# Una sesión sin su HAR falla; sólo se omite la reproducción si no hay
+# navegador Chromium instalado en la máquina.
+import json
+from urllib.parse import urlsplit
+
+import pytest
+
+from benchmarks import replay_har
+
+SESIONES = replay_har.sesiones()
+IDS = [s["nombre"] for s in SESIONES]
+
+
+def _entradas(sesion):
+    ruta = replay_har.CARPETA_HAR / sesion["har"]
+    return json.loads(ruta.read_text(encoding="utf-8"))["log"]["entries"]
+
+
+def test_hay_sesiones_grabadas():
+    assert {"encontrado", "sin_registro", "captcha_rechazado"} <= set(IDS)
+
+
+@pytest.mark.parametrize("sesion", SESIONES, ids=IDS)
+def test_cada_sesion_tiene_su_har(sesion):
+    ruta = replay_har.CARPETA_HAR / sesion["har"]
+    assert ruta.exists(), f"falta el HAR {ruta.name}"
+
+    entradas = _entradas(sesion)
+    url = sesion.get("url", replay_har.RUNT_URL)
+    # La página de inicio del flujo tiene que estar grabada, o la reproducción aborta
+    assert any(urlsplit(e["request"]["url"])[:3] == urlsplit(url)[:3] for e in entradas)
+
+
+@pytest.mark.parametrize("sesion", SESIONES, ids=IDS)
+def test_cada_sesion_graba_un_envio_por_captcha(sesion):
+    assert sesion["captchas"], "sin respuestas de captcha la sesión no se puede reproducir"
+    envios = [e for e in _entradas(sesion) if e["request"]["method"] == "POST"]
+    enviados = [json.loads(e["request"]["postData"]["text"])["captcha"] for e in envios]
+    assert enviados == sesion["captchas"]
+
+
+def test_las_sesiones_graban_respuestas_distintas():
+    estados = {
+        s["nombre"]: [
+            json.loads(e["response"]["content"]["text"])["estado"]
+            for e in _entradas(s)
+            if e["request"]["method"] == "POST"
+        ]
+        for s in SESIONES
+    }
+    assert estados["encontrado"] == ["ok"]
+    assert estados["sin_registro"] == ["sin_registro"]
+    assert estados["captcha_rechazado"] == ["captcha_invalido", "ok"]
+
+
+def test_falta_de_har_es_un_fallo():
+    problemas, tiempos = replay_har.verificar_sesion(
+        {"nombre": "x", "har": "no_existe.har", "tipo": "CC", "numero": "1", "captchas": ["1"],
+         "esperado": True, "presupuesto_s": {}}
+    )
+    assert problemas == ["falta el HAR no_existe.har"]
+    assert tiempos == {}
+
+
+@pytest.mark.parametrize("sesion", SESIONES, ids=IDS)
+def test_sesion_dentro_del_presupuesto(sesion, chromium):
+    latencia = replay_har._cargar_manifiesto().get("latencia_ms", 0)
+    problemas, tiempos = replay_har.verificar_sesion(sesion, latencia)
+    assert not problemas, f"{sesion['nombre']}: {problemas} {tiempos}"
+
+
+def test_grabar_y_reproducir_contra_el_portal_local(tmp_path, chromium):
+    sesion = replay_har.grabar_local(
+        "rechazo", "CC", "1017259440", ["00000", "12345"], carpeta=tmp_path, puerto=0
+    )
+    assert sesion["esperado"] is True
+    assert set(sesion["presupuesto_s"]) == set(replay_har.FASES)
+
+    entradas = json.loads((tmp_path / "rechazo.har").read_text(encoding="utf-8"))["log"]["entries"]
+    envios = [e for e in entradas if e["request"]["method"] == "POST"]
+    assert len(envios) == 2
+
+    # Lo grabado se reproduce sin el portal (el servidor ya se detuvo)
+    problemas, tiempos = replay_har.verificar_sesion(sesion, carpeta=tmp_path)
+    assert not problemas, f"{problemas} {tiempos}"
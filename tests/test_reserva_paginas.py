@@ -0,0 +1,179 @@
+# tests/test_reserva_paginas.py
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("playwright")
+
+from services import reserva_paginas
+from services.reserva_paginas import PAUSA_SIN_TURNO_S, TIMEOUT_TURNO_S, PaginaPreparada, ReservaPaginas
+
+
+class GobernadorSinTurno:
+    def __init__(self):
+        self.llamadas = []
+
+    def adquirir(self, motivo="peticion", timeout_s=None, prioridad=1):
+        self.llamadas.append((motivo, timeout_s, prioridad))
+        raise TimeoutError("sin turno")
+
+
+class PaginaFalsa:
+    def __init__(self):
+        self.cerrada = False
+
+    def is_closed(self):
+        return self.cerrada
+
+    def close(self):
+        self.cerrada = True
+
+
+class GestorFalso:
+    generacion = 1
+
+    def __init__(self):
+        self.paginas = 0
+
+    def nueva_pagina(self):
+        self.paginas += 1
+        return PaginaFalsa()
+
+
+def test_sin_turno_no_bloquea_ni_abre_paginas():
+    gobernador, gestor = GobernadorSinTurno(), GestorFalso()
+    reserva = ReservaPaginas(gestor, cantidad=1, gobernador=gobernador)
+
+    assert reserva.reponer() is True
+    assert gobernador.llamadas == [("preparacion", TIMEOUT_TURNO_S, reserva_paginas.PRIORIDAD_PREPARACION)]
+    assert gestor.paginas == 0
+    assert reserva.disponibles() == 0
+
+    # Pausa corta: el siguiente ciclo ocioso no vuelve a pedir turno
+    assert reserva.reponer() is False
+    assert len(gobernador.llamadas) == 1
+    assert reserva._pausa_hasta - time.monotonic() <= PAUSA_SIN_TURNO_S
+
+
+def test_sin_turno_conserva_la_pagina_a_refrescar():
+    gestor = GestorFalso()
+    reserva = ReservaPaginas(gestor, cantidad=1, max_edad_s=100, gobernador=GobernadorSinTurno())
+    pagina = PaginaFalsa()
+    reserva._stock.append(
+        PaginaPreparada(pagina, None, "CC", reserva.url, time.monotonic() - 90, gestor.generacion)
+    )
+
+    assert reserva.reponer() is True
+    assert not pagina.cerrada
+    assert reserva.disponibles() == 1
+
+
+class GobernadorLibre:
+    def adquirir(self, motivo="peticion", timeout_s=None, prioridad=1):
+        return 0.0
+
+
+class PaginaLenta(PaginaFalsa):
+    """Navegar tarda 'navegar_s'; avisa en 'navegando' cuando empieza."""
+
+    def __init__(self, navegar_s, navegando):
+        super().__init__()
+        self.navegar_s = navegar_s
+        self.navegando = navegando
+
+    def goto(self, url, timeout=None):
+        self.navegando.set()
+        time.sleep(self.navegar_s)
+
+    def wait_for_load_state(self, estado, timeout=None):
+        pass
+
+
+@pytest.fixture
+def formulario_lento(monkeypatch):
+    """El popup de Autocompletar se demora 3 s (lo que espera el flujo real si no aparece)."""
+    from services import runt_playwright
+
+    etapas = []
+
+    def popup(page, log=None):
+        etapas.append("popup")
+        time.sleep(3)
+
+    monkeypatch.setattr(runt_playwright, "dismiss_autocomplete_popup", popup)
+    monkeypatch.setattr(runt_playwright, "select_tipo_documento", lambda *a, **k: etapas.append("tipo"))
+    monkeypatch.setattr(runt_playwright, "_localizar", lambda *a, **k: etapas.append("captcha"))
+    return etapas
+
+
+def test_consulta_interrumpe_la_preparacion(formulario_lento):
+    navegando = threading.Event()
+    pagina = PaginaLenta(0.05, navegando)
+    gestor = GestorFalso()
+    gestor.nueva_pagina = lambda: pagina
+    reserva = ReservaPaginas(gestor, cantidad=1, gobernador=GobernadorLibre())
+
+    # La consulta "llega" apenas empieza la navegación
+    assert reserva.reponer(hay_trabajo=navegando.is_set) is True
+
+    assert formulario_lento == []
+    assert pagina.cerrada
+    assert reserva.disponibles() == 0
+    # No es un error: el próximo rato ocioso vuelve a intentar sin pausa
+    assert reserva._pausa_hasta <= time.monotonic()
+
+
+def test_sin_trabajo_la_preparacion_termina(formulario_lento, monkeypatch):
+    monkeypatch.setattr(time, "sleep", lambda s: None)
+    pagina = PaginaLenta(0, threading.Event())
+    gestor = GestorFalso()
+    gestor.nueva_pagina = lambda: pagina
+    reserva = ReservaPaginas(gestor, cantidad=1, gobernador=GobernadorLibre())
+
+    assert reserva.reponer(hay_trabajo=lambda: False) is True
+    assert formulario_lento == ["popup", "tipo", "captcha"]
+    assert reserva.disponibles() == 1
+
+
+def test_worker_atiende_la_consulta_mientras_prepara(formulario_lento):
+    from controllers.bandeja_captcha import BandejaCaptcha
+    from controllers.cola_consultas import ColaConsultas
+    from models.runt_models import ConsultaRuntParams, ResultadoRunt
+
+    navegando = threading.Event()
+    gestor = GestorFalso()
+    gestor.nueva_pagina = lambda: PaginaLenta(0.3, navegando)
+
+    class ControllerConReserva:
+        def __init__(self):
+            self.reserva = ReservaPaginas(gestor, cantidad=1, gobernador=GobernadorLibre())
+            self.inicio = None
+
+        def consultar_ciudadano(self, params, **kwargs):
+            self.inicio = time.monotonic()
+            return ResultadoRunt()
+
+        def mantener_hilo(self, hay_trabajo=None):
+            return self.reserva.reponer(hay_trabajo)
+
+        def liberar_hilo(self):
+            self.reserva.vaciar()
+
+    controller = ControllerConReserva()
+    cola = ColaConsultas(controller, BandejaCaptcha(timeout_s=5), workers=1)
+    cola.iniciar()
+    try:
+        assert navegando.wait(5), "el worker ocioso no empezó a preparar"
+        encolado = time.monotonic()
+        trabajo = cola.encolar(ConsultaRuntParams("CC", "1"))
+
+        limite = time.monotonic() + 5
+        while trabajo.estado != "ok" and time.monotonic() < limite:
+            time.sleep(0.01)
+        assert trabajo.estado == "ok"
+        # Sin interrupción habría esperado también los 3 s del popup
+        assert controller.inicio - encolado < 1.5
+        assert "popup" not in formulario_lento
+    finally:
+        cola.detener()
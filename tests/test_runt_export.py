@@ -0,0 +1,56 @@
+# tests/test_runt_export.py
+from datetime import datetime, timezone
+
+import pytest
+
+pytest.importorskip("pyarrow")
+pytest.importorskip("pandas")
+
+from models.runt_models import ConsultaRuntParams, ResultadoRunt
+from services.runt_export import ExportadorParquet, esquema_resultados, leer_resultados
+
+CUANDO = datetime(2025, 1, 31, 12, 0, tzinfo=timezone.utc)
+
+
+def _exportar(ruta, n, particion=None, prefijo="", filas_por_grupo=2):
+    with ExportadorParquet(ruta, filas_por_grupo=filas_por_grupo, particion=particion) as exp:
+        for i in range(n):
+            tipo = "CE" if i % 3 == 0 else "CC"
+            exp.agregar(ConsultaRuntParams(tipo, f"{prefijo}{i}"), ResultadoRunt(sin_registro=bool(i % 2)), CUANDO)
+
+
+def test_dos_exportadores_en_el_mismo_dataset_no_se_pisan(tmp_path):
+    _exportar(tmp_path, 5, prefijo="a")
+    _exportar(tmp_path, 5, prefijo="b")
+
+    df = leer_resultados(str(tmp_path))
+    assert sorted(df["numero_documento"]) == sorted([f"a{i}" for i in range(5)] + [f"b{i}" for i in range(5)])
+
+
+def test_borrar_una_parte_no_hace_que_se_sobrescriba_otra(tmp_path):
+    _exportar(tmp_path, 6, prefijo="a")
+    partes = sorted(tmp_path.glob("part-*.parquet"))
+    partes[0].unlink()
+    restantes = len(leer_resultados(str(tmp_path)))
+
+    _exportar(tmp_path, 2, prefijo="b")
+    assert len(leer_resultados(str(tmp_path))) == restantes + 2
+
+
+@pytest.mark.parametrize("particion", [None, "tipo_documento", "fecha"])
+def test_mismo_esquema_con_o_sin_particion(tmp_path, particion):
+    _exportar(tmp_path, 4, particion=particion)
+
+    df = leer_resultados(str(tmp_path))
+    assert list(df.columns) == esquema_resultados().names
+    assert set(df["fecha"]) == {"2025-01-31"}  # texto, no fecha inferida de la carpeta
+    assert sorted(df["tipo_documento"]) == ["CC", "CC", "CE", "CE"]
+
+
+def test_lectura_de_columnas_y_filtro(tmp_path):
+    import pyarrow.dataset as ds
+
+    _exportar(tmp_path, 6, particion="tipo_documento")
+    df = leer_resultados(str(tmp_path), columnas=["numero_documento"], filtro=ds.field("tipo_documento") == "CE")
+    assert list(df.columns) == ["numero_documento"]
+    assert sorted(df["numero_documento"]) == ["0", "3"]
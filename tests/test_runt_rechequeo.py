@@ -0,0 +1,108 @@
+# tests/test_runt_rechequeo.py
+from datetime import datetime
+
+import pytest
+
+from controllers.runt_rechequeo import (
+    DIA_S,
+    REINTENTO_FALLO_S,
+    TTL_POR_RESULTADO,
+    ProgramadorRechequeo,
+)
+from models.runt_models import ResultadoRunt
+
+
+class Reloj:
+    def __init__(self):
+        # Mediodía: avanzar unas horas no cambia de día (ni reinicia el presupuesto)
+        self.ahora = datetime(2024, 3, 1, 12, 0).timestamp()
+
+    def __call__(self):
+        return self.ahora
+
+
+@pytest.fixture
+def reloj():
+    return Reloj()
+
+
+def _numeros(lote):
+    return [p.numero_documento for p in lote]
+
+
+def test_los_mas_vencidos_salen_primero(reloj):
+    prog = ProgramadorRechequeo(presupuesto_diario=100, reloj=reloj)
+    ahora = reloj()
+    prog.agregar("CC", "multas", ahora - 10 * DIA_S, ResultadoRunt(tiene_multas=True))
+    prog.agregar("CC", "activo", ahora - 40 * DIA_S, ResultadoRunt())
+    prog.agregar("CC", "nuevo")
+    prog.agregar("CC", "fresco", ahora - DIA_S, ResultadoRunt(sin_registro=True))
+
+    # nuevo vence en 0; activo venció hace 10 días; multas hace 3
+    assert _numeros(prog.siguientes(10)) == ["nuevo", "activo", "multas"]
+
+
+def test_entregado_no_cuenta_como_fresco(reloj):
+    prog = ProgramadorRechequeo(reloj=reloj)
+    prog.agregar("CC", "1", reloj() - 40 * DIA_S, ResultadoRunt())
+    assert prog.reporte_frescura().frescos == 0
+
+    assert _numeros(prog.siguientes(1)) == ["1"]
+
+    # Prestado, pero su resultado sigue vencido
+    reporte = prog.reporte_frescura()
+    assert (reporte.frescos, reporte.vencidos) == (0, 1)
+
+    prog.registrar_resultado("CC", "1", ResultadoRunt())
+    assert prog.reporte_frescura().frescos == 1
+
+
+def test_prestamo_vence_y_vuelve_a_salir(reloj):
+    prog = ProgramadorRechequeo(reloj=reloj)
+    prog.agregar("CC", "1")
+
+    assert _numeros(prog.siguientes(5)) == ["1"]
+    # Mientras dura el préstamo no se entrega otra vez
+    assert prog.siguientes(5) == []
+
+    reloj.ahora += REINTENTO_FALLO_S + 1
+    assert _numeros(prog.siguientes(5)) == ["1"]
+
+
+def test_resultado_reportado_reemplaza_el_prestamo(reloj):
+    prog = ProgramadorRechequeo(reloj=reloj)
+    prog.agregar("CC", "1")
+    prog.siguientes(1)
+    prog.registrar_resultado("CC", "1", ResultadoRunt(sin_registro=True))
+
+    # Ya no sale al vencer el préstamo, sino cuando vence el resultado
+    reloj.ahora += REINTENTO_FALLO_S + 1
+    assert prog.siguientes(5) == []
+    reloj.ahora += TTL_POR_RESULTADO["sin_registro"]
+    assert _numeros(prog.siguientes(5)) == ["1"]
+
+
+def test_presupuesto_diario(reloj):
+    prog = ProgramadorRechequeo(presupuesto_diario=3, reloj=reloj)
+    for i in range(5):
+        prog.agregar("CC", str(i))
+
+    assert len(prog.siguientes(2)) == 2
+    assert len(prog.siguientes(10)) == 1
+    assert prog.siguientes(10) == []
+    assert prog.reporte_frescura().presupuesto_restante == 0
+
+    # Al día siguiente se renueva; los ya entregados también volvieron a vencer
+    reloj.ahora += DIA_S
+    assert len(prog.siguientes(10)) == 3
+
+
+def test_fallo_no_marca_fresco(reloj):
+    prog = ProgramadorRechequeo(reloj=reloj)
+    prog.agregar("CC", "1", reloj() - 40 * DIA_S, ResultadoRunt())
+    prog.siguientes(1)
+    prog.registrar_fallo("CC", "1")
+
+    assert prog.reporte_frescura().frescos == 0
+    reloj.ahora += REINTENTO_FALLO_S + 1
+    assert _numeros(prog.siguientes(1)) == ["1"]
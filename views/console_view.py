@@ -1,10 +1,13 @@
 # views/console_view.py
 
 import argparse
+import logging
 from pathlib import Path
 
 from models.runt_models import ConsultaRuntParams
 from controllers.runt_controller import RuntController
+from services.blob_store import AlmacenBlobs
+from services.runt_logging import configurar_logging
 
 def resolver_captcha_consola(image_bytes: bytes) -> str:
     """
@@ -21,9 +24,12 @@ def main():
     parser.add_argument("--tipo", required=True, help="Tipo de documento (CC, CE, NIT, etc.)")
     parser.add_argument("--numero", required=True, help="Número de documento")
     parser.add_argument("--no-debug", dest="debug", action="store_false", help="Desactivar mensajes de depuración.")
+    parser.add_argument("--blobs", default="blobs.sqlite3", help="Archivo donde se guarda el HTML del resultado.")
     args = parser.parse_args()
 
-    controller = RuntController()
+    configurar_logging(logging.DEBUG if args.debug else logging.INFO)
+
+    controller = RuntController(almacen=AlmacenBlobs(args.blobs))
 
     params = ConsultaRuntParams(
         tipo_documento=args.tipo,
@@ -34,6 +40,7 @@ def main():
         params=params,
         resolver_captcha=resolver_captcha_consola,
         debug=args.debug,
+        prioridad=0,  # consulta puntual: no espera detrás de los barridos
     )
 
     print("✅ Consulta completada (resultado aún sin parsear):")
@@ -0,0 +1,350 @@
+# views/gui_qt.py
+# ------------------------------------------------------------
+# Interfaz gráfica (PyQt6).
+#
+# - Izquierda: formulario para encolar uno o muchos documentos y la tabla
+#   de trabajos (modelo Qt, aguanta cientos de filas sin congelarse).
+#   Una consulta suelta va por el carril elegido (interactiva por defecto) y
+#   los lotes por el masivo, así la consulta del mostrador no espera al lote.
+# - Derecha: bandeja de captchas. ENTER envía y pasa al siguiente,
+#   ESC lo manda al final, Ctrl+D lo descarta.
+# - Abajo: throughput, latencia y profundidad de la cola.
+#
+# Las consultas corren en el pool de ColaConsultas; la interfaz sólo recibe
+# señales. Se puede probar sin pantalla con QT_QPA_PLATFORM=offscreen.
+# ------------------------------------------------------------
+from typing import Optional
+
+from PyQt6.QtCore import QAbstractTableModel, QModelIndex, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import QKeySequence, QPixmap, QShortcut
+from PyQt6.QtWidgets import (
+    QComboBox,
+    QGroupBox,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QLineEdit,
+    QMainWindow,
+    QMessageBox,
+    QPlainTextEdit,
+    QPushButton,
+    QTableView,
+    QVBoxLayout,
+    QWidget,
+)
+
+from controllers.bandeja_captcha import BandejaCaptcha
+from controllers.cola_consultas import CARRILES, ColaConsultas
+from models.runt_models import ConsultaRuntParams
+
+TIPOS_DOCUMENTO = ["CC", "CE", "TI", "PA", "RC", "CD", "PPT"]
+# Cada cuánto refrescamos tabla y estadísticas (ms). Agrupar cambios así
+# evita repintar por cada evento cuando hay cientos de consultas.
+REFRESCO_MS = 300
+
+
+class ModeloTrabajos(QAbstractTableModel):
+    COLUMNAS = ["#", "Tipo", "Número", "Carril", "Estado", "Tiempo (s)", "Detalle"]
+
+    def __init__(self, cola: ColaConsultas):
+        super().__init__()
+        self.cola = cola
+        self._filas = []
+
+    def refrescar(self):
+        nuevas = self.cola.trabajos()
+        antes = len(self._filas)
+        if len(nuevas) < antes:
+            # La cola sólo agrega trabajos; si algún día quita, recargamos todo
+            self.beginResetModel()
+            self._filas = nuevas
+            self.endResetModel()
+            return
+        if len(nuevas) > antes:
+            # Insertar (no resetear) conserva selección y scroll de la tabla
+            self.beginInsertRows(QModelIndex(), antes, len(nuevas) - 1)
+            self._filas = nuevas
+            self.endInsertRows()
+        if antes:
+            self.dataChanged.emit(
+                self.index(0, 0),
+                self.index(antes - 1, len(self.COLUMNAS) - 1),
+            )
+
+    def rowCount(self, parent=QModelIndex()):
+        return len(self._filas)
+
+    def columnCount(self, parent=QModelIndex()):
+        return len(self.COLUMNAS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.COLUMNAS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if role != Qt.ItemDataRole.DisplayRole:
+            return None
+        t = self._filas[index.row()]
+        col = index.column()
+        if col == 0:
+            return t.id
+        if col == 1:
+            return t.params.tipo_documento
+        if col == 2:
+            return t.params.numero_documento
+        if col == 3:
+            return t.carril
+        if col == 4:
+            return t.estado
+        if col == 5:
+            duracion = t.duracion()
+            return f"{duracion:.1f}" if duracion is not None else ""
+        if col == 6:
+            return t.error or ""
+        return None
+
+
+class PanelCaptcha(QGroupBox):
+    """Bandeja de captchas pensada para resolverse sólo con el teclado."""
+
+    def __init__(self, bandeja: BandejaCaptcha):
+        super().__init__("Captchas pendientes")
+        self.bandeja = bandeja
+        self._actual = None
+
+        self.lbl_info = QLabel("Sin captchas pendientes.")
+        self.lbl_imagen = QLabel()
+        self.lbl_imagen.setMinimumHeight(80)
+        self.lbl_imagen.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.txt_respuesta = QLineEdit()
+        self.txt_respuesta.setPlaceholderText("Texto del captcha + ENTER (ESC = después)")
+        self.txt_respuesta.returnPressed.connect(self.enviar)
+
+        # Sólo con el foco dentro del panel: ESC o Ctrl+D en el formulario o
+        # en la tabla no deben posponer ni descartar el captcha de nadie
+        for tecla, accion in (
+            (QKeySequence(Qt.Key.Key_Escape), self.posponer),
+            (QKeySequence("Ctrl+D"), self.descartar),
+        ):
+            atajo = QShortcut(tecla, self, activated=accion)
+            atajo.setContext(Qt.ShortcutContext.WidgetWithChildrenShortcut)
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self.lbl_info)
+        layout.addWidget(self.lbl_imagen)
+        layout.addWidget(self.txt_respuesta)
+        layout.addStretch()
+
+    def refrescar(self):
+        pendientes = self.bandeja.pendientes()
+        siguiente = pendientes[0] if pendientes else None
+
+        if siguiente is None:
+            self._actual = None
+            self.lbl_info.setText("Sin captchas pendientes.")
+            self.lbl_imagen.clear()
+            self.txt_respuesta.setEnabled(False)
+            return
+
+        urgente = " ⚡" if siguiente.prioridad == 0 else ""
+        self.lbl_info.setText(
+            f"{siguiente.etiqueta} ({siguiente.query_id}){urgente} — {len(pendientes)} en bandeja"
+        )
+        if self._actual is None or self._actual.id != siguiente.id:
+            self._actual = siguiente
+            pixmap = QPixmap()
+            pixmap.loadFromData(siguiente.imagen)
+            self.lbl_imagen.setPixmap(pixmap)
+            self.txt_respuesta.clear()
+            self.txt_respuesta.setEnabled(True)
+            # No robamos el foco si el operador está escribiendo en otro campo
+            enfocado = self.window().focusWidget()
+            if enfocado is None or enfocado is self.txt_respuesta or not isinstance(enfocado, (QLineEdit, QPlainTextEdit)):
+                self.txt_respuesta.setFocus()
+
+    def enviar(self):
+        texto = self.txt_respuesta.text().strip()
+        if self._actual is None or not texto:
+            return
+        self.bandeja.responder(self._actual.id, texto)
+
+    def posponer(self):
+        if self._actual is not None:
+            self.bandeja.posponer(self._actual.id)
+
+    def descartar(self):
+        if self._actual is not None:
+            self.bandeja.descartar(self._actual.id)
+
+
+class VentanaPrincipal(QMainWindow):
+    # Se emiten desde hilos de worker; Qt las entrega en el hilo de la interfaz
+    captchas_cambiaron = pyqtSignal()
+    trabajos_cambiaron = pyqtSignal()
+
+    def __init__(self, cola: ColaConsultas, bandeja: BandejaCaptcha):
+        super().__init__()
+        self.setWindowTitle("Turn Dispenser – Consulta Ciudadana RUNT")
+        self.cola = cola
+        self.bandeja = bandeja
+        self._tabla_sucia = False
+
+        # --- Formulario ---
+        self.cmb_tipo = QComboBox()
+        self.cmb_tipo.addItems(TIPOS_DOCUMENTO)
+        self.txt_numero = QLineEdit()
+        self.txt_numero.setPlaceholderText("Número de documento")
+        self.txt_numero.returnPressed.connect(self.encolar_uno)
+        self.cmb_carril = QComboBox()
+        self.cmb_carril.addItems(CARRILES)
+        btn_encolar = QPushButton("Encolar")
+        btn_encolar.clicked.connect(self.encolar_uno)
+
+        fila = QHBoxLayout()
+        fila.addWidget(self.cmb_tipo)
+        fila.addWidget(self.txt_numero)
+        fila.addWidget(self.cmb_carril)
+        fila.addWidget(btn_encolar)
+
+        self.txt_lote = QPlainTextEdit()
+        self.txt_lote.setPlaceholderText("Lote: una línea por documento, p. ej.\nCC 1017259440\nCE 123456")
+        self.txt_lote.setMaximumHeight(90)
+        btn_lote = QPushButton("Encolar lote (carril masivo)")
+        btn_lote.clicked.connect(self.encolar_lote)
+
+        # --- Tabla de trabajos ---
+        self.modelo = ModeloTrabajos(cola)
+        self.tabla = QTableView()
+        self.tabla.setModel(self.modelo)
+        # ResizeToContents recalcula todas las filas en cada refresco: con cientos es lento
+        self.tabla.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        self.tabla.horizontalHeader().setStretchLastSection(True)
+
+        izquierda = QVBoxLayout()
+        izquierda.addLayout(fila)
+        izquierda.addWidget(self.txt_lote)
+        izquierda.addWidget(btn_lote)
+        izquierda.addWidget(self.tabla)
+
+        # --- Bandeja de captchas ---
+        self.panel_captcha = PanelCaptcha(bandeja)
+
+        principal = QHBoxLayout()
+        principal.addLayout(izquierda, 3)
+        principal.addWidget(self.panel_captcha, 2)
+        central = QWidget()
+        central.setLayout(principal)
+        self.setCentralWidget(central)
+
+        self.lbl_estado = QLabel()
+        self.statusBar().addPermanentWidget(self.lbl_estado)
+
+        # --- Señales y refresco periódico ---
+        self.captchas_cambiaron.connect(self.panel_captcha.refrescar)
+        self.trabajos_cambiaron.connect(self._marcar_tabla)
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.refrescar)
+        self._timer.start(REFRESCO_MS)
+
+        self.panel_captcha.refrescar()
+        self.refrescar()
+
+    # ------------------------------------------------------------
+    # Acciones
+    # ------------------------------------------------------------
+    def encolar_uno(self):
+        numero = self.txt_numero.text().strip()
+        if not numero:
+            return
+        self.cola.encolar(
+            ConsultaRuntParams(tipo_documento=self.cmb_tipo.currentText(), numero_documento=numero),
+            carril=self.cmb_carril.currentText(),
+        )
+        self.txt_numero.clear()
+
+    def encolar_lote(self):
+        invalidas = []
+        for linea in self.txt_lote.toPlainText().splitlines():
+            partes = linea.split()
+            if not partes:
+                continue
+            if len(partes) != 2:
+                invalidas.append(linea)
+                continue
+            self.cola.encolar(
+                ConsultaRuntParams(tipo_documento=partes[0].upper(), numero_documento=partes[1]),
+                carril="masiva",
+            )
+        self.txt_lote.clear()
+        if invalidas:
+            QMessageBox.warning(self, "Líneas ignoradas", "Formato esperado 'TIPO NUMERO':\n" + "\n".join(invalidas[:20]))
+
+    # ------------------------------------------------------------
+    # Refresco
+    # ------------------------------------------------------------
+    def _marcar_tabla(self):
+        self._tabla_sucia = True
+
+    def refrescar(self):
+        est = self.cola.estadisticas()
+        if self._tabla_sucia or est["en_curso"]:
+            # Con consultas en curso la columna de tiempo cambia sola
+            self._tabla_sucia = False
+            self.modelo.refrescar()
+
+        texto = (
+            f"En cola: {est['profundidad']} | En curso: {est['en_curso']} | "
+            f"Captchas: {est['captchas_pendientes']} | {est['por_minuto']:.1f}/min"
+        )
+        if est["latencia_p50"] is not None:
+            texto += f" | Latencia p50 {est['latencia_p50']:.1f}s p95 {est['latencia_p95']:.1f}s"
+        interactiva = self.cola.estadisticas_carriles()["interactiva"]
+        if interactiva["latencia_p95"] is not None:
+            marca = "✅" if interactiva["cumple_slo"] else "⚠"
+            texto += f" | Interactiva p95 {interactiva['latencia_p95']:.1f}s {marca}"
+        self.lbl_estado.setText(texto)
+
+    def closeEvent(self, event):
+        self._timer.stop()
+        self.cola.detener(esperar=False)
+        super().closeEvent(event)
+
+
+def crear_ventana(
+    workers: int = 2,
+    headless: bool = True,
+    debug: bool = False,
+    preparadas: int = 1,
+    ruta_blobs: Optional[str] = "blobs.sqlite3",
+) -> VentanaPrincipal:
+    """
+    Arma cola + bandeja + ventana. Requiere un QApplication ya creado.
+    ruta_blobs: almacén del HTML de los resultados (None = no guardarlo).
+    """
+    from controllers.runt_controller import RuntController
+    from services.blob_store import AlmacenBlobs
+
+    ventana = None
+
+    def captchas_cambiaron():
+        if ventana is not None:
+            ventana.captchas_cambiaron.emit()
+
+    def trabajo_cambio(_trabajo):
+        if ventana is not None:
+            ventana.trabajos_cambiaron.emit()
+
+    bandeja = BandejaCaptcha(al_cambiar=captchas_cambiaron)
+    controller = RuntController(
+        headless=headless,
+        slow_mo=0,
+        hold_after=False,
+        reutilizar_navegador=True,
+        paginas_preparadas=preparadas,
+        almacen=AlmacenBlobs(ruta_blobs) if ruta_blobs else None,
+    )
+    cola = ColaConsultas(controller, bandeja, workers=workers, al_cambiar=trabajo_cambio, debug=debug)
+    ventana = VentanaPrincipal(cola, bandeja)
+    cola.iniciar()
+    return ventana